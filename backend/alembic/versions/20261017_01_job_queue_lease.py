@@ -0,0 +1,42 @@
+"""add lease columns to generation_jobs for the persisted job queue"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261017_01_job_queue_lease"
+down_revision = "20260224_01_rooms_pg17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+
+    if "attempts" not in columns:
+        op.add_column(
+            "generation_jobs",
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        )
+    if "lease_owner" not in columns:
+        op.add_column("generation_jobs", sa.Column("lease_owner", sa.String(length=120), nullable=True))
+    if "lease_expires_at" not in columns:
+        op.add_column("generation_jobs", sa.Column("lease_expires_at", sa.Float(), nullable=True))
+
+    bind.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_generation_jobs_status_lease ON generation_jobs (status, lease_expires_at)"
+        )
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    bind.execute(sa.text("DROP INDEX IF EXISTS ix_generation_jobs_status_lease"))
+
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+    for column_name in ("lease_expires_at", "lease_owner", "attempts"):
+        if column_name in columns:
+            op.drop_column("generation_jobs", column_name)
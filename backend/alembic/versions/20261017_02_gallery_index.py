@@ -0,0 +1,82 @@
+"""record result metadata on generation_jobs and index the room gallery"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.storage import get_storage
+
+revision = "20261017_02_gallery_index"
+down_revision = "20261017_01_job_queue_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+
+    if "created_at" not in columns:
+        op.add_column("generation_jobs", sa.Column("created_at", sa.Float(), nullable=True))
+    if "completed_at" not in columns:
+        op.add_column("generation_jobs", sa.Column("completed_at", sa.Float(), nullable=True))
+    if "result_size" not in columns:
+        op.add_column("generation_jobs", sa.Column("result_size", sa.Integer(), nullable=True))
+    if "result_media_type" not in columns:
+        op.add_column("generation_jobs", sa.Column("result_media_type", sa.String(length=64), nullable=True))
+
+    bind.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_generation_jobs_room_gallery "
+            "ON generation_jobs (room_id, status, completed_at)"
+        )
+    )
+    _backfill_completed_results(bind)
+
+
+def _backfill_completed_results(bind) -> None:
+    # Results written before the gallery moved to the database only exist on disk; record their completion time
+    # and size once so the gallery lists them. Databases first started by init_db may already hold storage keys.
+    rows = bind.execute(
+        sa.text(
+            "SELECT id, result_path FROM generation_jobs "
+            "WHERE status = 'completed' AND completed_at IS NULL AND result_path IS NOT NULL"
+        )
+    ).fetchall()
+    for job_id, result_path in rows:
+        path = _resolve_result_file(result_path)
+        if path is None:
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        bind.execute(
+            sa.text(
+                "UPDATE generation_jobs SET completed_at = :completed_at, result_size = :result_size WHERE id = :id"
+            ),
+            {"completed_at": stat.st_mtime, "result_size": stat.st_size, "id": job_id},
+        )
+
+
+def _resolve_result_file(result_path: str) -> Path | None:
+    path = Path(result_path)
+    if path.is_absolute():
+        return path
+    try:
+        return get_storage().local_path(result_path)
+    except ValueError:
+        return None
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    bind.execute(sa.text("DROP INDEX IF EXISTS ix_generation_jobs_room_gallery"))
+
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+    for column_name in ("result_media_type", "result_size", "completed_at", "created_at"):
+        if column_name in columns:
+            op.drop_column("generation_jobs", column_name)
@@ -0,0 +1,30 @@
+"""add an indexed result expiry to generation_jobs for the retention sweeper"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261017_03_result_expiry"
+down_revision = "20261017_02_gallery_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+
+    if "expires_at" not in columns:
+        op.add_column("generation_jobs", sa.Column("expires_at", sa.Float(), nullable=True))
+
+    bind.execute(sa.text("CREATE INDEX IF NOT EXISTS ix_generation_jobs_expires_at ON generation_jobs (expires_at)"))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    bind.execute(sa.text("DROP INDEX IF EXISTS ix_generation_jobs_expires_at"))
+
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+    if "expires_at" in columns:
+        op.drop_column("generation_jobs", "expires_at")
@@ -0,0 +1,38 @@
+"""add stored_blobs for the content-addressed blob store"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261017_04_stored_blobs"
+down_revision = "20261017_03_result_expiry"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if "stored_blobs" in sa.inspect(bind).get_table_names():
+        return
+
+    op.create_table(
+        "stored_blobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("namespace", sa.String(length=120), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.UniqueConstraint("namespace", "key", name="uq_stored_blobs_namespace_key"),
+    )
+    op.create_index("ix_stored_blobs_unreferenced", "stored_blobs", ["ref_count", "updated_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if "stored_blobs" not in sa.inspect(bind).get_table_names():
+        return
+
+    op.drop_index("ix_stored_blobs_unreferenced", table_name="stored_blobs")
+    op.drop_table("stored_blobs")
@@ -0,0 +1,38 @@
+"""add per-room model fallback chains and record the model on generation_jobs"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261017_05_model_fallback"
+down_revision = "20261017_04_stored_blobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    room_columns = {column["name"] for column in sa.inspect(bind).get_columns("rooms")}
+    if "fallback_models" not in room_columns:
+        op.add_column("rooms", sa.Column("fallback_models", sa.JSON(), nullable=False, server_default="[]"))
+    if "slo_p95_seconds" not in room_columns:
+        op.add_column("rooms", sa.Column("slo_p95_seconds", sa.Float(), nullable=True))
+    if "slo_error_rate" not in room_columns:
+        op.add_column("rooms", sa.Column("slo_error_rate", sa.Float(), nullable=True))
+
+    job_columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+    if "model_name" not in job_columns:
+        op.add_column("generation_jobs", sa.Column("model_name", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    job_columns = {column["name"] for column in sa.inspect(bind).get_columns("generation_jobs")}
+    if "model_name" in job_columns:
+        op.drop_column("generation_jobs", "model_name")
+
+    room_columns = {column["name"] for column in sa.inspect(bind).get_columns("rooms")}
+    for column_name in ("slo_error_rate", "slo_p95_seconds", "fallback_models"):
+        if column_name in room_columns:
+            op.drop_column("rooms", column_name)
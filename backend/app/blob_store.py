@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import mimetypes
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import StoredBlob
+from app.storage import StorageBackend, media_url
+from app.uploads import UPLOAD_CHUNK_SIZE, LimitedReader
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_BLOB_KEY_PATTERN = re.compile(r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]+)?")
+_BLOB_NAME_PATTERN = re.compile(r"[0-9a-f]{64}(?:\.[a-z0-9]+)?")
+_BLOB_URL_PATTERN = re.compile(r"/media/(?P<namespace>.+?)/(?P<key>[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]+)?)")
+# Originals and their derivatives (`<digest>.thumb.webp`) never change once written.
+_IMMUTABLE_FILE_PATTERN = re.compile(r"(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[a-z0-9]+)+$")
+logger = logging.getLogger(__name__)
+
+
+def _change_references(db: Session, namespace: str, key: str, delta: int, *, size: int | None = None) -> None:
+    now = time.time()
+    changed = db.execute(
+        update(StoredBlob)
+        .where(StoredBlob.namespace == namespace, StoredBlob.key == key)
+        .values(ref_count=StoredBlob.ref_count + delta, updated_at=now)
+    )
+    if changed.rowcount or size is None:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(StoredBlob(namespace=namespace, key=key, size=size, ref_count=max(delta, 0), updated_at=now))
+    except IntegrityError:
+        # Another writer stored the same content first; count our reference on its row.
+        db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.namespace == namespace, StoredBlob.key == key)
+            .values(ref_count=StoredBlob.ref_count + delta, updated_at=now)
+        )
+
+
+def _build_key(digest: str, suffix: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{suffix.lower()}"
+
+
+@dataclass(frozen=True)
+class BlobStore:
+    namespace: str
+    storage: StorageBackend
+
+    def storage_key(self, key: str) -> str:
+        return f"{self.namespace}/{key}"
+
+    def url(self, key: str) -> str:
+        return media_url(self.storage_key(key))
+
+    def key_from_storage_key(self, storage_key: str) -> str | None:
+        prefix = f"{self.namespace}/"
+        if not storage_key.startswith(prefix):
+            return None
+        key = storage_key[len(prefix) :]
+        return key if _BLOB_KEY_PATTERN.fullmatch(key) else None
+
+    def key_from_name(self, name: str) -> str | None:
+        if not _BLOB_NAME_PATTERN.fullmatch(name):
+            return None
+        return f"{name[:2]}/{name[2:4]}/{name}"
+
+    def put(self, db: Session, content: bytes, suffix: str, *, retain: bool = True) -> str:
+        key = _build_key(hashlib.sha256(content).hexdigest(), suffix)
+        _change_references(db, self.namespace, key, 1 if retain else 0, size=len(content))
+
+        # The row is registered before the object so garbage collection never races a fresh write.
+        storage_key = self.storage_key(key)
+        if not self.storage.exists(storage_key):
+            self.storage.put(storage_key, content, content_type=mimetypes.guess_type(key)[0])
+        return key
+
+    def put_file(self, db: Session, source: BinaryIO, suffix: str, *, retain: bool = True, max_bytes: int) -> str:
+        # Two chunked passes over a seekable source: hash it, then copy it only when the content is new.
+        start = source.tell()
+        hasher = hashlib.sha256()
+        reader = LimitedReader(source, max_bytes)
+        while chunk := reader.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+        key = _build_key(hasher.hexdigest(), suffix)
+        _change_references(db, self.namespace, key, 1 if retain else 0, size=reader.bytes_read)
+
+        storage_key = self.storage_key(key)
+        if not self.storage.exists(storage_key):
+            source.seek(start)
+            self.storage.put_file(storage_key, source, content_type=mimetypes.guess_type(key)[0])
+        return key
+
+    def put_path(self, db: Session, path: Path, suffix: str, *, retain: bool = True) -> str:
+        # Consumes the file: on local storage a new blob is renamed into place instead of copied.
+        hasher = hashlib.sha256()
+        with path.open("rb") as handle:
+            while chunk := handle.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+        key = _build_key(hasher.hexdigest(), suffix)
+        _change_references(db, self.namespace, key, 1 if retain else 0, size=path.stat().st_size)
+
+        storage_key = self.storage_key(key)
+        if self.storage.exists(storage_key):
+            path.unlink(missing_ok=True)
+        else:
+            self.storage.put_path(storage_key, path, content_type=mimetypes.guess_type(key)[0])
+        return key
+
+    def retain(self, db: Session, key: str) -> None:
+        _change_references(db, self.namespace, key, 1)
+
+    def release(self, db: Session, key: str) -> None:
+        _change_references(db, self.namespace, key, -1)
+
+
+def parse_blob_url(url: str) -> tuple[str, str] | None:
+    match = _BLOB_URL_PATTERN.fullmatch(url)
+    if match is None:
+        return None
+    return match.group("namespace"), match.group("key")
+
+
+def collect_unreferenced_blobs(
+    db: Session,
+    *,
+    resolve_store: Callable[[str], BlobStore | None],
+    released_before: float,
+    batch_size: int,
+) -> list[str]:
+    rows = db.execute(
+        select(StoredBlob.id, StoredBlob.namespace, StoredBlob.key)
+        .where(StoredBlob.ref_count <= 0, StoredBlob.updated_at < released_before)
+        .order_by(StoredBlob.updated_at.asc())
+        .limit(batch_size)
+    ).all()
+
+    removed: list[str] = []
+    for blob_id, namespace, key in rows:
+        store = resolve_store(namespace)
+        if store is None:
+            continue
+        # Only the writer that deletes a still-unreferenced row removes the object.
+        deleted = db.execute(delete(StoredBlob).where(StoredBlob.id == blob_id, StoredBlob.ref_count <= 0))
+        db.commit()
+        if deleted.rowcount != 1:
+            continue
+        storage_key = store.storage_key(key)
+        try:
+            store.storage.delete(storage_key)
+        except OSError:
+            logger.warning("Could not remove unreferenced blob %s", storage_key)
+            continue
+        removed.append(storage_key)
+    return removed
+
+
+class ContentAddressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _IMMUTABLE_FILE_PATTERN.search(Path(full_path).as_posix()):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.models import ModelSetting, Prompt, Room
+from app.runtime_config import DEFAULT_CATALOG_CACHE_TTL_SECONDS, get_runtime_config
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RoomSnapshot:
+    id: int
+    slug: str
+    name: str
+    model_name: str
+    is_active: bool
+    fallback_models: tuple[str, ...]
+    slo_p95_seconds: float | None
+    slo_error_rate: float | None
+
+    @classmethod
+    def from_row(cls, room: Room) -> "RoomSnapshot":
+        return cls(
+            id=room.id,
+            slug=room.slug,
+            name=room.name,
+            model_name=room.model_name,
+            is_active=room.is_active,
+            fallback_models=tuple(room.fallback_models or ()),
+            slo_p95_seconds=room.slo_p95_seconds,
+            slo_error_rate=room.slo_error_rate,
+        )
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    id: int
+    room_id: int
+    name: str
+    description: str
+    prompt: str
+    preview_image_url: str
+    icon_image_url: str
+
+    @classmethod
+    def from_row(cls, prompt: Prompt) -> "PromptSnapshot":
+        return cls(
+            id=prompt.id,
+            room_id=prompt.room_id,
+            name=prompt.name,
+            description=prompt.description,
+            prompt=prompt.prompt,
+            preview_image_url=prompt.preview_image_url,
+            icon_image_url=prompt.icon_image_url,
+        )
+
+
+class CatalogCache:
+    # Read-through cache of rooms, their prompts and the legacy model setting, held as immutable snapshots so
+    # they are safe to share across sessions and threads. Admin writes invalidate it in this process; other API
+    # processes pick changes up once their entries are `ttl_seconds` old. Misses are not cached.
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = DEFAULT_CATALOG_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, Hashable], tuple[float, Any]] = {}
+        # Bumped by every invalidation, so a load that raced one is not stored.
+        self._generation = 0
+
+    def _read_through(self, key: tuple[str, Hashable], load: Callable[[], T | None]) -> T | None:
+        if self.ttl_seconds <= 0:
+            return load()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = self._generation
+        value = load()
+        if value is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (now + self.ttl_seconds, value)
+        return value
+
+    def room_by_slug(self, db: Session, slug: str) -> RoomSnapshot | None:
+        def load() -> RoomSnapshot | None:
+            room = db.query(Room).filter(Room.slug == slug).first()
+            return RoomSnapshot.from_row(room) if room is not None else None
+
+        return self._read_through(("room_slug", slug), load)
+
+    def room_by_id(self, db: Session, room_id: int) -> RoomSnapshot | None:
+        def load() -> RoomSnapshot | None:
+            room = db.get(Room, room_id)
+            return RoomSnapshot.from_row(room) if room is not None else None
+
+        return self._read_through(("room_id", room_id), load)
+
+    def active_rooms(self, db: Session) -> tuple[RoomSnapshot, ...]:
+        def load() -> tuple[RoomSnapshot, ...]:
+            rows = db.query(Room).filter(Room.is_active.is_(True)).order_by(Room.id.asc()).all()
+            return tuple(RoomSnapshot.from_row(row) for row in rows)
+
+        return self._read_through(("room_list", "active"), load)
+
+    def room_prompts(self, db: Session, room_id: int) -> tuple[PromptSnapshot, ...]:
+        def load() -> tuple[PromptSnapshot, ...]:
+            rows = db.query(Prompt).filter(Prompt.room_id == room_id).order_by(Prompt.id.asc()).all()
+            return tuple(PromptSnapshot.from_row(row) for row in rows)
+
+        return self._read_through(("room_prompts", room_id), load)
+
+    def model_setting(self, db: Session) -> str | None:
+        def load() -> str | None:
+            setting = db.get(ModelSetting, 1)
+            return setting.model_name if setting is not None else None
+
+        return self._read_through(("model_setting", 1), load)
+
+    def _invalidate(self, kinds: set[str], *, room_id: int | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in list(self._entries):
+                kind, value = key
+                if kind in kinds and (room_id is None or value == room_id):
+                    del self._entries[key]
+
+    def invalidate_rooms(self) -> None:
+        # Slugs can change, so every room entry goes.
+        self._invalidate({"room_slug", "room_id", "room_list"})
+
+    def invalidate_prompts(self, room_id: int | None = None) -> None:
+        self._invalidate({"room_prompts"}, room_id=room_id)
+
+    def invalidate_model_setting(self) -> None:
+        self._invalidate({"model_setting"})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+_cache = CatalogCache()
+
+
+def get_catalog_cache() -> CatalogCache:
+    # The TTL follows the runtime configuration, so a reload applies without dropping cached entries.
+    _cache.ttl_seconds = get_runtime_config().catalog_cache_ttl_seconds
+    return _cache
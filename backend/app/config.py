@@ -1,4 +1,5 @@
 import logging
+import math
 import os
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
@@ -13,7 +14,11 @@ _DEFAULT_LOG_BACKUP_COUNT = 3
 _DEFAULT_LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
 
 
-def load_local_env(env_path: Path | None = None) -> None:
+# Keys this process took from backend/.env; a reload may update these but never real environment variables.
+_env_file_keys: set[str] = set()
+
+
+def load_local_env(env_path: Path | None = None, *, override_file_values: bool = False) -> None:
     path = env_path or (_BASE_DIR / ".env")
     if not path.exists():
         return
@@ -32,12 +37,45 @@ def load_local_env(env_path: Path | None = None) -> None:
         if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
             value = value[1:-1]
 
-        os.environ.setdefault(key, value)
+        if key in os.environ and not (override_file_values and key in _env_file_keys):
+            continue
+        os.environ[key] = value
+        _env_file_keys.add(key)
 
 
 load_local_env()
 
 
+# Shared readers for numeric and boolean settings: malformed or out-of-range values fall back to the default.
+def env_int(name: str, default: int, *, minimum: int = 0) -> int:
+    raw_value = os.getenv(name, str(default)).strip()
+    try:
+        value = int(raw_value)
+    except ValueError:
+        return default
+    return value if value >= minimum else default
+
+
+def env_float(name: str, default: float, *, positive: bool = False) -> float:
+    raw_value = os.getenv(name, str(default)).strip()
+    try:
+        value = float(raw_value)
+    except ValueError:
+        return default
+    if not math.isfinite(value) or value < 0 or (positive and value == 0):
+        return default
+    return value
+
+
+def env_flag(name: str, default: bool) -> bool:
+    raw_value = os.getenv(name, "").strip().lower()
+    if raw_value in {"1", "true", "yes", "on"}:
+        return True
+    if raw_value in {"0", "false", "no", "off"}:
+        return False
+    return default
+
+
 def _resolve_log_file_path() -> Path:
     raw_path = os.getenv("LOG_FILE_PATH")
     if not raw_path:
@@ -5,11 +5,36 @@ from pathlib import Path
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
+from app.storage import get_storage
+
 _BASE_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_ROOM_ID = 1
 DEFAULT_ROOM_SLUG = "main"
 DEFAULT_ROOM_NAME = "Main"
 DEFAULT_ROOM_MODEL = "openai/gpt-5-image"
+_GENERATION_JOB_QUEUE_COLUMNS = {
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "lease_owner": "VARCHAR(120)",
+    "lease_expires_at": "FLOAT",
+}
+_GENERATION_JOB_GALLERY_COLUMNS = {
+    "created_at": "FLOAT",
+    "completed_at": "FLOAT",
+    "result_size": "INTEGER",
+    "result_media_type": "VARCHAR(64)",
+}
+_GENERATION_JOB_RETENTION_COLUMNS = {
+    "expires_at": "FLOAT",
+}
+_GENERATION_JOB_MODEL_COLUMNS = {
+    "model_name": "VARCHAR(255)",
+}
+_ROOM_FALLBACK_COLUMNS = {
+    "fallback_models": "JSON NOT NULL DEFAULT '[]'",
+    "slo_p95_seconds": "FLOAT",
+    "slo_error_rate": "FLOAT",
+}
+_LEGACY_STORAGE_ROOT = _BASE_DIR / "storage"
 
 
 def _resolve_database_url(raw_url: str | None) -> str:
@@ -59,6 +84,11 @@ def init_db() -> None:
     Base.metadata.create_all(bind=engine)
     _migrate_rooms_schema()
     _migrate_generation_jobs_qr_hash()
+    _migrate_generation_jobs_queue_columns()
+    _migrate_generation_jobs_gallery_columns()
+    _migrate_generation_jobs_retention_columns()
+    _migrate_generation_jobs_storage_keys()
+    _migrate_model_fallback_columns()
 
 
 def _migrate_rooms_schema() -> None:
@@ -143,3 +173,112 @@ def _migrate_generation_jobs_qr_hash() -> None:
         connection.execute(
             text("CREATE UNIQUE INDEX IF NOT EXISTS ix_generation_jobs_qr_hash ON generation_jobs (qr_hash)")
         )
+
+
+def _add_missing_columns(connection, table_name: str, columns: dict[str, str]) -> None:
+    existing_columns = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    for column_name, column_ddl in columns.items():
+        if column_name not in existing_columns:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}"))
+
+
+def _migrate_generation_jobs_queue_columns() -> None:
+    with engine.begin() as connection:
+        if "generation_jobs" not in set(inspect(connection).get_table_names()):
+            return
+
+        _add_missing_columns(connection, "generation_jobs", _GENERATION_JOB_QUEUE_COLUMNS)
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_generation_jobs_status_lease "
+                "ON generation_jobs (status, lease_expires_at)"
+            )
+        )
+
+
+def _migrate_generation_jobs_gallery_columns() -> None:
+    with engine.begin() as connection:
+        if "generation_jobs" not in set(inspect(connection).get_table_names()):
+            return
+
+        _add_missing_columns(connection, "generation_jobs", _GENERATION_JOB_GALLERY_COLUMNS)
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_generation_jobs_room_gallery "
+                "ON generation_jobs (room_id, status, completed_at)"
+            )
+        )
+        _backfill_completed_results(connection)
+
+
+def _resolve_result_file(result_path: str) -> Path | None:
+    # Legacy rows hold absolute paths; rows already rewritten to storage keys resolve through local storage.
+    path = Path(result_path)
+    if path.is_absolute():
+        return path
+    try:
+        return get_storage().local_path(result_path)
+    except ValueError:
+        return None
+
+
+def _backfill_completed_results(connection) -> None:
+    # Results written before the gallery moved to the database only exist on disk.
+    rows = connection.execute(
+        text(
+            "SELECT id, result_path FROM generation_jobs "
+            "WHERE status = 'completed' AND completed_at IS NULL AND result_path IS NOT NULL"
+        )
+    ).fetchall()
+    for job_id, result_path in rows:
+        path = _resolve_result_file(result_path)
+        if path is None:
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        connection.execute(
+            text("UPDATE generation_jobs SET completed_at = :completed_at, result_size = :result_size WHERE id = :id"),
+            {"completed_at": stat.st_mtime, "result_size": stat.st_size, "id": job_id},
+        )
+
+
+def _migrate_generation_jobs_retention_columns() -> None:
+    with engine.begin() as connection:
+        if "generation_jobs" not in set(inspect(connection).get_table_names()):
+            return
+
+        _add_missing_columns(connection, "generation_jobs", _GENERATION_JOB_RETENTION_COLUMNS)
+        connection.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_generation_jobs_expires_at ON generation_jobs (expires_at)")
+        )
+
+
+def _migrate_model_fallback_columns() -> None:
+    with engine.begin() as connection:
+        tables = set(inspect(connection).get_table_names())
+        if "rooms" in tables:
+            _add_missing_columns(connection, "rooms", _ROOM_FALLBACK_COLUMNS)
+        if "generation_jobs" in tables:
+            _add_missing_columns(connection, "generation_jobs", _GENERATION_JOB_MODEL_COLUMNS)
+
+
+def _migrate_generation_jobs_storage_keys() -> None:
+    # Paths used to be absolute filesystem paths under backend/storage; storage backends address objects by key.
+    prefix = f"{_LEGACY_STORAGE_ROOT.as_posix()}/"
+    with engine.begin() as connection:
+        if "generation_jobs" not in set(inspect(connection).get_table_names()):
+            return
+
+        for column in ("result_path", "source_path"):
+            rows = connection.execute(
+                text(f"SELECT id, {column} FROM generation_jobs WHERE {column} LIKE '/%'")
+            ).fetchall()
+            for job_id, path in rows:
+                if not path.startswith(prefix):
+                    continue
+                connection.execute(
+                    text(f"UPDATE generation_jobs SET {column} = :key WHERE id = :id"),
+                    {"key": path[len(prefix) :], "id": job_id},
+                )
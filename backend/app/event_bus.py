@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import threading
+from typing import Any
+
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 100
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", topic: str, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.topic = topic
+        self.queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+        self._bus = bus
+        self._loop = loop
+
+    def _deliver(self, event: Any) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping event for slow subscriber on %s", self.topic)
+
+    def deliver_threadsafe(self, event: Any) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Subscriber loop is closed; the subscription is about to be dropped.
+            self.close()
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, *, maxsize: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription(self, topic, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic)
+            if not subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.topic]
+
+    def publish(self, topic: str, event: Any) -> None:
+        # Safe to call from any thread: delivery is scheduled onto each subscriber's loop.
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.deliver_threadsafe(event)
+
+
+event_bus = EventBus()
+
+
+def job_topic(job_id: int) -> str:
+    return f"job:{job_id}"
+
+
+def gallery_topic(room_slug: str) -> str:
+    return f"gallery:{room_slug}"
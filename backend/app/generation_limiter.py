@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import GenerationJob
+from app.runtime_config import DEFAULT_MODEL_HEALTH_WINDOW_SECONDS, get_runtime_config
+
+DEFAULT_ESTIMATED_GENERATION_SECONDS = 30.0
+_MAX_SAMPLES_PER_MODEL = 500
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, *, rate_per_second: float, capacity: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def reserve(self) -> float:
+        # Takes one token and returns how long the caller must wait before using it.
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate_per_second
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class LatencyTracker:
+    # Rolling record of outcomes per model over the last `window_seconds`. Two series exist: end-to-end
+    # generations (model health and the Retry-After estimate) and single upstream attempts (request hedging).
+    def __init__(
+        self,
+        *,
+        window_seconds: float = DEFAULT_MODEL_HEALTH_WINDOW_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: dict[str, deque[tuple[float, float, bool]]] = {}
+
+    def record(self, model: str, *, seconds: float, ok: bool) -> None:
+        with self._lock:
+            outcomes = self._outcomes.setdefault(model, deque(maxlen=_MAX_SAMPLES_PER_MODEL))
+            outcomes.append((self._clock(), seconds, ok))
+
+    def outcomes(self, model: str) -> list[tuple[float, bool]]:
+        # (seconds, ok) pairs still inside the window, oldest first.
+        cutoff = self._clock() - self.window_seconds
+        with self._lock:
+            outcomes = self._outcomes.get(model)
+            while outcomes and outcomes[0][0] < cutoff:
+                outcomes.popleft()
+            return [(seconds, ok) for _, seconds, ok in outcomes or ()]
+
+    def percentile(self, model: str, percentile: float, *, min_samples: int = 1) -> float | None:
+        latencies = sorted(seconds for seconds, ok in self.outcomes(model) if ok)
+        if not latencies or len(latencies) < min_samples:
+            return None
+        # Nearest-rank percentile of successful generations.
+        rank = max(1, math.ceil(percentile / 100 * len(latencies)))
+        return latencies[rank - 1]
+
+    def average_seconds(self, *, default: float) -> float:
+        with self._lock:
+            models = list(self._outcomes)
+        latencies = [seconds for model in models for seconds, ok in self.outcomes(model) if ok]
+        return sum(latencies) / len(latencies) if latencies else default
+
+    def reset(self) -> None:
+        with self._lock:
+            self._outcomes.clear()
+
+
+_latency_tracker = LatencyTracker()
+
+
+# Per upstream request, so the hedge delay does not include retries, backoff or result encoding.
+_attempt_latency_tracker = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    # The window follows the runtime configuration, so a reload applies without dropping recorded outcomes.
+    _latency_tracker.window_seconds = get_runtime_config().model_health_window_seconds
+    return _latency_tracker
+
+
+def get_attempt_latency_tracker() -> LatencyTracker:
+    _attempt_latency_tracker.window_seconds = get_runtime_config().model_health_window_seconds
+    return _attempt_latency_tracker
+
+
+class GenerationGovernor:
+    def __init__(
+        self,
+        *,
+        max_in_flight_per_model: int,
+        max_in_flight_per_room: int,
+        model_requests_per_minute: int,
+    ) -> None:
+        self.max_in_flight_per_model = max_in_flight_per_model
+        self.max_in_flight_per_room = max_in_flight_per_room
+        self.model_requests_per_minute = model_requests_per_minute
+        self._model_slots: dict[str, asyncio.Semaphore] = {}
+        self._room_slots: dict[int, asyncio.Semaphore] = {}
+        self._model_buckets: dict[str, TokenBucket] = {}
+
+    def _model_slot(self, model: str) -> asyncio.Semaphore | None:
+        if self.max_in_flight_per_model == 0:
+            return None
+        return self._model_slots.setdefault(model, asyncio.Semaphore(self.max_in_flight_per_model))
+
+    def _room_slot(self, room_id: int) -> asyncio.Semaphore | None:
+        if self.max_in_flight_per_room == 0:
+            return None
+        return self._room_slots.setdefault(room_id, asyncio.Semaphore(self.max_in_flight_per_room))
+
+    def _model_bucket(self, model: str) -> TokenBucket | None:
+        if self.model_requests_per_minute == 0:
+            return None
+        bucket = self._model_buckets.get(model)
+        if bucket is None:
+            rate = self.model_requests_per_minute / 60.0
+            bucket = TokenBucket(rate_per_second=rate, capacity=max(1.0, float(self.max_in_flight_per_model or 1)))
+            self._model_buckets[model] = bucket
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, *, model: str, room_id: int) -> AsyncIterator[None]:
+        room_slot = self._room_slot(room_id)
+        model_slot = self._model_slot(model)
+        if room_slot is not None:
+            await room_slot.acquire()
+        try:
+            if model_slot is not None:
+                await model_slot.acquire()
+            try:
+                bucket = self._model_bucket(model)
+                if bucket is not None:
+                    await bucket.acquire()
+                yield
+            finally:
+                if model_slot is not None:
+                    model_slot.release()
+        finally:
+            if room_slot is not None:
+                room_slot.release()
+
+
+def build_governor() -> GenerationGovernor:
+    config = get_runtime_config()
+    return GenerationGovernor(
+        max_in_flight_per_model=config.max_in_flight_per_model,
+        max_in_flight_per_room=config.max_in_flight_per_room,
+        model_requests_per_minute=config.model_requests_per_minute,
+    )
+
+
+def _governor_limits() -> tuple[int, int, int]:
+    config = get_runtime_config()
+    return config.max_in_flight_per_model, config.max_in_flight_per_room, config.model_requests_per_minute
+
+
+_governor: GenerationGovernor | None = None
+_governor_key: tuple[asyncio.AbstractEventLoop, tuple[int, int, int]] | None = None
+
+
+def get_governor() -> GenerationGovernor:
+    global _governor, _governor_key
+
+    # asyncio primitives belong to one event loop, so the governor follows the job runner loop. A reload that
+    # changes the limits builds a new one; jobs already holding a slot release it on the old governor.
+    key = (asyncio.get_running_loop(), _governor_limits())
+    if _governor is None or _governor_key != key:
+        _governor = build_governor()
+        _governor_key = key
+    return _governor
+
+
+@dataclass(frozen=True)
+class AdmissionRejection:
+    status_code: int
+    detail: str
+    retry_after_seconds: int
+
+
+def _count_pending_jobs(db: Session, *, room_id: int | None = None) -> int:
+    query = select(func.count(GenerationJob.id)).where(GenerationJob.status == "processing")
+    if room_id is not None:
+        query = query.where(GenerationJob.room_id == room_id)
+    return int(db.execute(query).scalar() or 0)
+
+
+def _estimate_retry_after(pending: int, parallelism: int) -> int:
+    batches = math.ceil((pending + 1) / max(1, parallelism))
+    average_seconds = get_latency_tracker().average_seconds(default=DEFAULT_ESTIMATED_GENERATION_SECONDS)
+    return max(1, math.ceil(batches * average_seconds))
+
+
+def check_admission(db: Session, *, room_id: int) -> AdmissionRejection | None:
+    config = get_runtime_config()
+    if config.room_max_pending:
+        room_pending = _count_pending_jobs(db, room_id=room_id)
+        if room_pending >= config.room_max_pending:
+            return AdmissionRejection(
+                status_code=429,
+                detail="room generation queue is full",
+                retry_after_seconds=_estimate_retry_after(room_pending, config.max_in_flight_per_room),
+            )
+
+    # Jobs can fall over to another model mid-flight, so the whole backlog is counted against the provider.
+    if config.model_max_pending:
+        model_pending = _count_pending_jobs(db)
+        if model_pending >= config.model_max_pending:
+            logger.warning("Rejecting job: %d jobs already pending for the model", model_pending)
+            return AdmissionRejection(
+                status_code=503,
+                detail="generation service is saturated",
+                retry_after_seconds=_estimate_retry_after(model_pending, config.max_in_flight_per_model),
+            )
+
+    return None
@@ -0,0 +1,30 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+# Shared caches and browsers may reuse a listing for a few seconds, then must revalidate with If-None-Match.
+LIST_CACHE_CONTROL = "public, max-age=5, must-revalidate"
+
+
+def strong_etag(*parts: object) -> str:
+    # Built from the data behind a response (snapshots, gallery version), never from the serialized body.
+    return '"' + hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def matches_if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches.
+    return etag in {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+
+
+def not_modified(etag: str, *, cache_control: str = LIST_CACHE_CONTROL) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_validators(response: Response, etag: str, *, cache_control: str = LIST_CACHE_CONTROL) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
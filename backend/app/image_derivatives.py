@@ -0,0 +1,101 @@
+import logging
+import os
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from app.config import env_int
+from app.image_executor import run_image_task
+from app.image_ops import draft_to_fit, resize_to_fit
+from app.storage import get_storage
+
+DERIVATIVE_MAX_SIDES = {"thumb": 480, "medium": 1280}
+DEFAULT_DERIVATIVE_FORMAT = "webp"
+DEFAULT_DERIVATIVE_QUALITY = 80
+_FORMAT_SUFFIXES = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg"}
+_FORMAT_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+logger = logging.getLogger(__name__)
+
+
+def resolve_derivative_format() -> str:
+    requested = os.getenv("IMAGE_DERIVATIVE_FORMAT", DEFAULT_DERIVATIVE_FORMAT).strip().lower()
+    # Fall back along avif -> webp -> jpeg depending on what this Pillow build can encode.
+    if requested == "avif" and features.check("avif"):
+        return "avif"
+    if requested in {"avif", "webp"} and features.check("webp"):
+        return "webp"
+    return "jpeg"
+
+
+def _resolve_derivative_quality() -> int:
+    value = env_int("IMAGE_DERIVATIVE_QUALITY", DEFAULT_DERIVATIVE_QUALITY, minimum=1)
+    return value if value <= 100 else DEFAULT_DERIVATIVE_QUALITY
+
+
+def derivative_media_type(key: str) -> str:
+    suffix = PurePosixPath(key).suffix
+    for image_format, format_suffix in _FORMAT_SUFFIXES.items():
+        if suffix == format_suffix:
+            return _FORMAT_MEDIA_TYPES[image_format]
+    return "application/octet-stream"
+
+
+def derivative_key(result_key: str, variant: str, image_format: str) -> str:
+    result = PurePosixPath(result_key)
+    return result.with_name(f"{result.stem}.{variant}{_FORMAT_SUFFIXES[image_format]}").as_posix()
+
+
+def build_derivative(
+    image_bytes: bytes,
+    *,
+    max_side: int,
+    image_format: str,
+    quality: int = DEFAULT_DERIVATIVE_QUALITY,
+) -> bytes:
+    with Image.open(BytesIO(image_bytes)) as image:
+        draft_to_fit(image, max_side)
+        normalized = resize_to_fit(ImageOps.exif_transpose(image), max_side)
+        if image_format == "jpeg" or normalized.mode not in {"RGB", "RGBA"}:
+            normalized = normalized.convert("RGB")
+        output = BytesIO()
+        normalized.save(output, format=image_format.upper(), quality=quality)
+        return output.getvalue()
+
+
+def ensure_derivative(result_key: str, variant: str) -> str | None:
+    max_side = DERIVATIVE_MAX_SIDES.get(variant)
+    if max_side is None:
+        return None
+
+    storage = get_storage()
+    image_format = resolve_derivative_format()
+    target = derivative_key(result_key, variant, image_format)
+    try:
+        if storage.exists(target):
+            return target
+        content = run_image_task(
+            build_derivative,
+            storage.get(result_key),
+            max_side=max_side,
+            image_format=image_format,
+            quality=_resolve_derivative_quality(),
+        )
+        storage.put(target, content, content_type=_FORMAT_MEDIA_TYPES[image_format])
+    except (UnidentifiedImageError, OSError, ValueError) as exc:
+        name = PurePosixPath(result_key).name
+        logger.warning("Failed to build %s derivative for %s (%s)", variant, name, exc.__class__.__name__)
+        return None
+    return target
+
+
+def write_derivatives(result_key: str) -> None:
+    for variant in DERIVATIVE_MAX_SIDES:
+        ensure_derivative(result_key, variant)
+
+
+def remove_derivatives(result_key: str) -> None:
+    storage = get_storage()
+    for variant in DERIVATIVE_MAX_SIDES:
+        for image_format in _FORMAT_SUFFIXES:
+            storage.delete(derivative_key(result_key, variant, image_format))
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from app.config import env_int
+
+DEFAULT_IMAGE_PROCESS_WORKERS = min(4, os.cpu_count() or 1)
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+_executor: ProcessPoolExecutor | None = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _resolve_worker_count() -> int:
+    return env_int("IMAGE_PROCESS_WORKERS", DEFAULT_IMAGE_PROCESS_WORKERS)
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor, _executor_workers
+
+    worker_count = _resolve_worker_count()
+    if worker_count == 0:
+        # Image work runs in the calling thread (or a loop helper thread); useful for tests and tiny hosts.
+        return None
+
+    with _executor_lock:
+        if _executor is None or _executor_workers != worker_count:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # Spawned, not forked: the API process runs threads (job runner, sweeper) that fork would copy mid-state.
+            _executor = ProcessPoolExecutor(
+                max_workers=worker_count,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_workers = worker_count
+            logger.info("Started image processing pool with %d worker process(es)", worker_count)
+        return _executor
+
+
+def _discard_broken_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+
+    # A worker died (e.g. killed on a huge image); the next task gets a fresh pool.
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_image_task(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    # Blocking variant for threadpool endpoints and worker threads; the GIL is free while the child works.
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args, **kwargs)
+    try:
+        return executor.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        _discard_broken_executor(executor)
+        raise
+
+
+async def run_image_task_async(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    executor = _get_executor()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    try:
+        return await asyncio.wrap_future(executor.submit(fn, *args, **kwargs))
+    except BrokenProcessPool:
+        _discard_broken_executor(executor)
+        raise
+
+
+def shutdown_image_executor() -> None:
+    global _executor
+
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,49 @@
+from PIL import Image
+
+# Resize via reduce() down to this multiple of the target first; past ~3x LANCZOS output is indistinguishable.
+RESIZE_REDUCING_GAP = 3.0
+
+
+def fit_size(size: tuple[int, int], max_side: int) -> tuple[int, int]:
+    longest_side = max(size)
+    if longest_side <= max_side:
+        return size
+    scale = max_side / float(longest_side)
+    return max(1, int(round(size[0] * scale))), max(1, int(round(size[1] * scale)))
+
+
+def draft_to_fit(image: Image.Image, max_side: int) -> None:
+    # JPEG only: libjpeg decodes at 1/2, 1/4 or 1/8 scale in the DCT domain, never below the target size,
+    # so pixels the final resize would throw away are never materialized. Must run before load().
+    if image.format != "JPEG" or max(image.size) <= max_side:
+        return
+    image.draft(None, fit_size(image.size, max_side))
+
+
+def resize_to_fit(image: Image.Image, max_side: int) -> Image.Image:
+    target_size = fit_size(image.size, max_side)
+    if target_size == image.size:
+        return image
+    return image.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP)
+
+
+IMAGE_FORMAT_SUFFIXES = {"jpeg": ".jpg", "png": ".png", "webp": ".webp", "avif": ".avif", "gif": ".gif"}
+
+
+def detect_image_format(content: bytes) -> str | None:
+    # Magic-byte sniffing only; cheap enough to run on every generated payload without decoding it.
+    if content.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if content.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "webp"
+    if content[4:8] == b"ftyp" and content[8:12] in {b"avif", b"avis"}:
+        return "avif"
+    if content[:6] in {b"GIF87a", b"GIF89a"}:
+        return "gif"
+    return None
+
+
+def has_alpha(image: Image.Image) -> bool:
+    return image.mode in {"RGBA", "LA", "PA"} or "transparency" in image.info
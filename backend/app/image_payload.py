@@ -0,0 +1,145 @@
+import binascii
+import re
+from typing import BinaryIO
+
+# Everything but the image payload is kept to recover errors and text parts; real responses stay far below this.
+MAX_SKELETON_BYTES = 1024 * 1024
+IMAGE_HEAD_BYTES = 16
+# Some JSON encoders escape "/" as "\/".
+_DATA_URL_MARKERS = (b'"data:image/', b'"data:image\\/')
+_DATA_URL_BASE64 = b";base64,"
+_B64_JSON_MARKER = b'"b64_json"'
+_B64_JSON_PREFIX = re.compile(rb'"b64_json"\s*:\s*"')
+# A data URL header ("data:image/svg+xml;base64,") or the b64_json key with its separator fits well within this.
+_MAX_HEADER_BYTES = 256
+_MARKER_OVERLAP = max(len(marker) for marker in (*_DATA_URL_MARKERS, _B64_JSON_MARKER)) - 1
+
+
+class StreamingImageExtractor:
+    # Splits a JSON response body fed in arbitrary chunks: the first base64 image payload (a data URL string or a
+    # b64_json value) is decoded straight into `sink`; everything else forms `skeleton`, the same JSON with image
+    # payloads emptied, so the usual dict helpers still work on it. Memory stays bounded by the chunk size.
+    def __init__(self, sink: BinaryIO) -> None:
+        self._sink = sink
+        self._buffer = bytearray()
+        self._pending = bytearray()
+        self._state = "scan"
+        self.skeleton = bytearray()
+        self.found = False
+        self.size = 0
+        self.head = b""
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        self._process(final=False)
+
+    def close(self) -> None:
+        self._process(final=True)
+        if self._state != "scan":
+            raise ValueError("image payload is truncated")
+        self._keep(self._buffer)
+        self._buffer.clear()
+
+    def _keep(self, data: bytes | bytearray) -> None:
+        self.skeleton += data
+        if len(self.skeleton) > MAX_SKELETON_BYTES:
+            raise ValueError("response has too much non-image content")
+
+    def _process(self, *, final: bool) -> None:
+        while self._buffer:
+            if self._state == "scan":
+                if not self._scan(final=final):
+                    return
+            elif self._state in {"data_url", "b64_json"}:
+                if not self._read_header(final=final):
+                    return
+            elif not self._read_payload():
+                return
+
+    def _scan(self, *, final: bool) -> bool:
+        candidates = [(marker, "data_url") for marker in _DATA_URL_MARKERS] + [(_B64_JSON_MARKER, "b64_json")]
+        positions = [
+            (position, state)
+            for position, state in ((self._buffer.find(marker), state) for marker, state in candidates)
+            if position != -1
+        ]
+        if not positions:
+            # Hold back a possible marker prefix split across chunks.
+            keep_until = len(self._buffer) if final else max(0, len(self._buffer) - _MARKER_OVERLAP)
+            self._keep(self._buffer[:keep_until])
+            del self._buffer[:keep_until]
+            return False
+        position, state = min(positions)
+        self._keep(self._buffer[:position])
+        del self._buffer[:position]
+        self._state = state
+        return True
+
+    def _read_header(self, *, final: bool) -> bool:
+        window = bytes(self._buffer[:_MAX_HEADER_BYTES])
+        header_end = -1
+        if self._state == "data_url":
+            base64_at = window.find(_DATA_URL_BASE64)
+            closing_quote = window.find(b'"', 1)
+            if base64_at != -1 and (closing_quote == -1 or base64_at < closing_quote):
+                header_end = base64_at + len(_DATA_URL_BASE64)
+            elif closing_quote != -1:
+                # A data URL that is not base64 encoded; leave it in the skeleton as plain JSON.
+                return self._skip_marker(1)
+        else:
+            match = _B64_JSON_PREFIX.match(window)
+            if match is not None:
+                header_end = match.end()
+            elif not re.fullmatch(rb'"b64_json"\s*(:\s*)?', window):
+                # b64_json is null or not a string.
+                return self._skip_marker(len(_B64_JSON_MARKER))
+
+        if header_end == -1:
+            if final or len(self._buffer) >= _MAX_HEADER_BYTES:
+                return self._skip_marker(1)
+            return False
+        self._keep(self._buffer[:header_end])
+        del self._buffer[:header_end]
+        self._state = "skip" if self.found else "payload"
+        return True
+
+    def _skip_marker(self, length: int) -> bool:
+        self._keep(self._buffer[:length])
+        del self._buffer[:length]
+        self._state = "scan"
+        return True
+
+    def _read_payload(self) -> bool:
+        # Base64 never contains a double quote, so the first one closes the JSON string.
+        end = self._buffer.find(b'"')
+        data = self._buffer if end == -1 else self._buffer[:end]
+        if self._state == "payload":
+            self._decode(data, final=end != -1)
+        if end == -1:
+            self._buffer.clear()
+            return False
+        del self._buffer[:end]
+        if self._state == "payload":
+            self.found = True
+        self._state = "scan"
+        return True
+
+    def _decode(self, data: bytes | bytearray, *, final: bool) -> None:
+        self._pending += data
+        # An escape sequence may be split across chunks; keep its backslash for the next round.
+        held = b"\\" if self._pending.endswith(b"\\") and not final else b""
+        text = bytes(self._pending[: len(self._pending) - len(held)])
+        # JSON encoders may escape "/" and wrap long base64 lines with escaped newlines.
+        text = text.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+        # Decode whole 4-character groups only; the tail waits for the next chunk unless the string has ended.
+        usable = len(text) if final else len(text) - len(text) % 4
+        try:
+            decoded = binascii.a2b_base64(text[:usable] + b"=" * (-usable % 4))
+        except binascii.Error as exc:
+            raise ValueError(f"image payload is not valid base64: {exc}") from exc
+        self._pending = bytearray(text[usable:] + held)
+        if decoded:
+            if len(self.head) < IMAGE_HEAD_BYTES:
+                self.head = (self.head + decoded)[:IMAGE_HEAD_BYTES]
+            self._sink.write(decoded)
+            self.size += len(decoded)
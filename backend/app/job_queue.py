@@ -0,0 +1,306 @@
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from uuid import uuid4
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app import openrouter_client
+from app.config import env_float, env_int
+from app.db import SessionLocal
+from app.job_service import publish_job_status, run_generation_async
+from app.models import GenerationJob
+
+DEFAULT_WORKER_COUNT = 8
+DEFAULT_LEASE_SECONDS = 900
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+# The lease is renewed this many times per JOB_LEASE_SECONDS while a job runs.
+LEASE_RENEWALS_PER_PERIOD = 3
+logger = logging.getLogger(__name__)
+
+
+def _resolve_worker_count() -> int:
+    return env_int("JOB_WORKER_COUNT", DEFAULT_WORKER_COUNT, minimum=0)
+
+
+def _resolve_lease_seconds() -> int:
+    return env_int("JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS, minimum=1)
+
+
+def _resolve_max_attempts() -> int:
+    return env_int("JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS, minimum=1)
+
+
+def _resolve_poll_interval() -> float:
+    return env_float("JOB_POLL_INTERVAL_SECONDS", DEFAULT_POLL_INTERVAL_SECONDS, positive=True)
+
+
+def _claimable_condition(now: float):
+    return (GenerationJob.status == "processing") & or_(
+        GenerationJob.lease_expires_at.is_(None),
+        GenerationJob.lease_expires_at < now,
+    )
+
+
+def claim_next_job(db: Session, *, worker_id: str, lease_seconds: int, max_attempts: int) -> int | None:
+    # Compare-and-set lease: safe across worker threads and separate worker processes.
+    # Jobs whose lease expired (crash, restart) become claimable again.
+    while True:
+        now = time.time()
+        job_id = db.execute(
+            select(GenerationJob.id).where(_claimable_condition(now)).order_by(GenerationJob.id.asc()).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+
+        claimed = db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id, _claimable_condition(now))
+            .values(
+                lease_owner=worker_id,
+                lease_expires_at=now + lease_seconds,
+                attempts=GenerationJob.attempts + 1,
+            )
+        )
+        db.commit()
+        if claimed.rowcount != 1:
+            # Another worker won the race for this job; look for the next one.
+            continue
+
+        job = db.get(GenerationJob, job_id)
+        if job is None:
+            continue
+        db.refresh(job)
+        if job.attempts > max_attempts:
+            job.status = "error"
+            job.error_message = f"job abandoned after {max_attempts} attempts"
+            db.add(job)
+            db.commit()
+            publish_job_status(job)
+            logger.warning("Job %s exceeded %d attempts, marking as error", job_id, max_attempts)
+            continue
+        return job_id
+
+
+def renew_job_lease(db: Session, *, job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    # Returns False once the lease is lost: the job finished, failed, or was re-claimed by another worker.
+    renewed = db.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.id == job_id,
+            GenerationJob.status == "processing",
+            GenerationJob.lease_owner == worker_id,
+        )
+        .values(lease_expires_at=time.time() + lease_seconds)
+    )
+    db.commit()
+    return renewed.rowcount == 1
+
+
+class JobWorkerPool:
+    def __init__(
+        self,
+        *,
+        worker_count: int,
+        lease_seconds: int,
+        poll_interval: float,
+        max_attempts: int,
+    ) -> None:
+        self.worker_count = worker_count
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._name_prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:6]}"
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stopping.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="job-runner", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+        self.notify()
+        logger.info("Started job runner with %d concurrent worker(s)", self.worker_count)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # The loop is already closed; nothing left to wake up.
+            return
+
+    def _run_loop(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._ready.set()
+        try:
+            await asyncio.gather(
+                *(self._run_worker(f"{self._name_prefix}-w{index}") for index in range(self.worker_count))
+            )
+        finally:
+            self._loop = None
+            self._wakeup = None
+            await openrouter_client.close_async_client()
+
+    async def _run_worker(self, worker_id: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._drain(worker_id)
+            except Exception:
+                logger.exception("Job worker %s failed while draining the queue", worker_id)
+
+    def _claim(self, worker_id: str) -> int | None:
+        with SessionLocal() as db:
+            return claim_next_job(
+                db,
+                worker_id=worker_id,
+                lease_seconds=self.lease_seconds,
+                max_attempts=self.max_attempts,
+            )
+
+    def _renew(self, job_id: int, worker_id: str) -> bool:
+        with SessionLocal() as db:
+            return renew_job_lease(db, job_id=job_id, worker_id=worker_id, lease_seconds=self.lease_seconds)
+
+    async def _keep_lease(self, job_id: int, worker_id: str) -> None:
+        # Retries, hedging and model fallbacks can outlast one lease period; renewing well before expiry keeps
+        # another worker from re-claiming a job that is still running.
+        interval = self.lease_seconds / LEASE_RENEWALS_PER_PERIOD
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await asyncio.to_thread(self._renew, job_id, worker_id)
+            except Exception:
+                logger.exception("Could not renew the lease on job %s", job_id)
+                continue
+            if not renewed:
+                logger.warning("Worker %s lost the lease on job %s", worker_id, job_id)
+                return
+
+    async def _drain(self, worker_id: str) -> None:
+        while not self._stopping.is_set():
+            job_id = await asyncio.to_thread(self._claim, worker_id)
+            if job_id is None:
+                return
+            heartbeat = asyncio.create_task(self._keep_lease(job_id, worker_id))
+            try:
+                await run_generation_async(job_id, lease_owner=worker_id)
+            except Exception:
+                logger.exception("Generation crashed for job %s", job_id)
+            finally:
+                heartbeat.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await heartbeat
+
+
+_pool: JobWorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _build_pool(worker_count: int) -> JobWorkerPool:
+    return JobWorkerPool(
+        worker_count=worker_count,
+        lease_seconds=_resolve_lease_seconds(),
+        poll_interval=_resolve_poll_interval(),
+        max_attempts=_resolve_max_attempts(),
+    )
+
+
+def start_worker_pool() -> JobWorkerPool | None:
+    global _pool
+
+    worker_count = _resolve_worker_count()
+    if worker_count == 0:
+        # Generation runs in dedicated `python -m app.job_queue` processes.
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = _build_pool(worker_count)
+        _pool.start()
+        return _pool
+
+
+def stop_worker_pool() -> None:
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.stop()
+
+
+def notify_job_queued() -> None:
+    pool = start_worker_pool()
+    if pool is not None:
+        pool.notify()
+
+
+def main() -> None:
+    from app.config import configure_logging
+    from app.db import init_db
+    from app.image_executor import shutdown_image_executor
+    from app.runtime_config import reload_runtime_config
+
+    configure_logging()
+    init_db()
+
+    worker_count = _resolve_worker_count() or DEFAULT_WORKER_COUNT
+    pool = _build_pool(worker_count)
+    stopped = threading.Event()
+
+    def _handle_stop(signum, frame) -> None:
+        stopped.set()
+
+    def _handle_reload(signum, frame) -> None:
+        reload_runtime_config(reread_env_file=True)
+
+    signal.signal(signal.SIGINT, _handle_stop)
+    signal.signal(signal.SIGTERM, _handle_stop)
+    # Same reload as the API process, so `kill -HUP` applies runtime settings to the workers too.
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _handle_reload)
+
+    pool.start()
+    stopped.wait()
+    pool.stop()
+    shutdown_image_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,200 +1,524 @@
+import asyncio
+import logging
+import math
 import mimetypes
 import os
+import shutil
+import tempfile
 import time
-from uuid import uuid4
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO
 from urllib.parse import quote
+from uuid import uuid4
 
-from pathlib import Path
-from typing import Any
-
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.orm import Session
 
 from app import openrouter_client
-from app.models import GenerationJob, ModelSetting, Prompt, Room
-
-BACKEND_ROOT = Path(__file__).resolve().parents[1]
-STORAGE_ROOT = BACKEND_ROOT / "storage"
-SOURCE_DIR = STORAGE_ROOT / "source"
-RESULT_DIR = STORAGE_ROOT / "results"
-DEFAULT_RESULT_RETENTION_DAYS = 7
+from app.blob_store import BlobStore
+from app.catalog_cache import PromptSnapshot, RoomSnapshot, get_catalog_cache
+from app.db import SessionLocal
+from app.event_bus import event_bus, gallery_topic, job_topic
+from app.generation_limiter import get_governor, get_latency_tracker
+from app.image_derivatives import remove_derivatives, write_derivatives
+from app.image_ops import IMAGE_FORMAT_SUFFIXES, detect_image_format
+from app.model_health import ModelSlo, order_models, resolve_model_slo
+from app.models import GenerationJob, Prompt, Room
+from app.openrouter_client import GeneratedImage
+from app.result_cache import CachedResult, get_result_cache, result_cache_key, source_digest
+from app.retry_policy import CircuitOpenError, is_transient_error
+from app.runtime_config import get_runtime_config
+from app.storage import get_storage, media_url
+from app.uploads import UPLOAD_CHUNK_SIZE
+
+SOURCE_PREFIX = "source"
+RESULT_NAMESPACE = "results"
+# Unrecognized provider payloads keep the historical suffix.
+DEFAULT_RESULT_SUFFIX = ".jpg"
+DEFAULT_RETENTION_SWEEP_BATCH_SIZE = 200
 _SECONDS_PER_DAY = 24 * 60 * 60
-
-SOURCE_DIR.mkdir(parents=True, exist_ok=True)
-RESULT_DIR.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL_NAME = "openai/gpt-5-image"
 DEFAULT_PUBLIC_ROOM_SLUG = "main"
 LEGACY_MODEL_NAME = "google/gemini-2.5-flash-image-preview"
 LEGACY_OPENAI_MODEL_NAME = "openai/gpt-image-1"
 LEGACY_MINI_MODEL_NAME = "openai/gpt-5-image-mini"
-_GALLERY_IMAGE_SUFFIXES = {
-    ".jpg",
-    ".jpeg",
-    ".png",
-    ".webp",
-    ".gif",
-    ".bmp",
-    ".tif",
-    ".tiff",
-    ".avif",
-    ".heic",
-    ".heif",
-    ".jfif",
-}
-
-
-def _resolve_result_suffix() -> str:
-    output_format = os.getenv("OPENROUTER_RESULT_FORMAT", "jpeg").strip().lower()
-    if output_format == "png":
-        return ".png"
-    return ".jpg"
-
-
-def _save_bytes(directory: Path, content: bytes, suffix: str) -> Path:
-    filename = f"{Path.cwd().name}-{len(content)}-{id(content)}{suffix}"
-    path = directory / filename
-    path.write_bytes(content)
-    return path
+DEFAULT_GALLERY_PAGE_SIZE = 100
+MAX_GALLERY_PAGE_SIZE = 500
 
 
-def _build_filename(job_id: int, suffix: str) -> str:
-    return f"job-{job_id}{suffix}"
+def _result_suffix(image_format: str | None) -> str:
+    # The suffix follows the stored bytes, so passthrough PNG/WebP results are served with the right type.
+    return IMAGE_FORMAT_SUFFIXES.get(image_format or "", DEFAULT_RESULT_SUFFIX)
 
 
-def _build_room_result_dir(room_slug: str) -> Path:
-    path = RESULT_DIR / f"room-{room_slug}"
-    path.mkdir(parents=True, exist_ok=True)
-    return path
+def _store_result(db: Session, generated: bytes | GeneratedImage | CachedResult) -> tuple[str, int]:
+    store = result_store()
+    if isinstance(generated, CachedResult):
+        # The job takes its own reference on the shared blob, so either job's result may expire first.
+        store.retain(db, store.key_from_storage_key(generated.result_key))
+        return generated.result_key, generated.size
+    if isinstance(generated, GeneratedImage):
+        key = store.put_path(db, generated.path, _result_suffix(generated.image_format))
+        return store.storage_key(key), generated.size
+    key = store.put(db, generated, _result_suffix(detect_image_format(generated)))
+    return store.storage_key(key), len(generated)
+
+
+def result_store() -> BlobStore:
+    return BlobStore(RESULT_NAMESPACE, get_storage())
 
 
 def _generate_qr_hash() -> str:
     return uuid4().hex[:16]
 
 
-def _cleanup_source_file(path: str | None) -> None:
-    if not path:
+def _cleanup_source_file(key: str | None) -> None:
+    if not key:
         return
     try:
-        Path(path).unlink(missing_ok=True)
+        get_storage().delete(key)
     except OSError:
         # Cleanup failure should not break the job lifecycle.
         return
 
 
-def _resolve_result_retention_days() -> int:
-    raw_days = os.getenv("RESULT_RETENTION_DAYS", str(DEFAULT_RESULT_RETENTION_DAYS)).strip()
-    try:
-        days = int(raw_days)
-    except ValueError:
-        return DEFAULT_RESULT_RETENTION_DAYS
-    if days <= 0:
-        return DEFAULT_RESULT_RETENTION_DAYS
-    return days
+@dataclass(frozen=True)
+class GalleryEvent:
+    kind: str
+    item: dict[str, Any]
 
 
-def _prune_result_files() -> None:
-    retention_days = _resolve_result_retention_days()
-    cutoff_timestamp = time.time() - (retention_days * _SECONDS_PER_DAY)
+def _build_gallery_item(room_slug: str, result_key: str, modified_at: float) -> dict[str, Any]:
+    name = PurePosixPath(result_key).name
+    # Results written before the blob store keep their per-room `results/room-<slug>/` keys.
+    url = media_url(result_key)
+    derivative_base = f"/api/rooms/{quote(room_slug)}/jobs/gallery/{quote(name)}"
+    return {
+        "name": name,
+        "url": url,
+        "modified_at": modified_at,
+        "thumbnail_url": f"{derivative_base}/thumb",
+        "medium_url": f"{derivative_base}/medium",
+    }
 
-    files = [path for path in RESULT_DIR.rglob("*") if path.is_file()]
-    for stale in files:
-        try:
-            if stale.stat().st_mtime < cutoff_timestamp:
-                stale.unlink(missing_ok=True)
-        except OSError:
-            continue
 
+def get_room_result_key(room_slug: str, name: str) -> str | None:
+    if not name or "/" in name or name.startswith("."):
+        return None
+    store = result_store()
+    key = store.key_from_name(name)
+    result_key = store.storage_key(key) if key else f"{RESULT_NAMESPACE}/room-{room_slug}/{name}"
+    return result_key if store.storage.exists(result_key) else None
 
-def _is_gallery_image_file(path: Path) -> bool:
-    media_type, _ = mimetypes.guess_type(path.name)
-    if media_type and media_type.startswith("image/"):
-        return True
-    return path.suffix.lower() in _GALLERY_IMAGE_SUFFIXES
 
+def _resolve_retention_seconds() -> float:
+    return get_runtime_config().result_retention_days * _SECONDS_PER_DAY
 
-def list_gallery_results(room_slug: str) -> list[dict[str, Any]]:
-    room_dir = RESULT_DIR / f"room-{room_slug}"
-    if not room_dir.exists():
-        return []
 
-    items: list[tuple[float, str]] = []
-    for path in room_dir.iterdir():
-        if not path.is_file() or not _is_gallery_image_file(path):
-            continue
+def _assign_missing_expiry(db: Session) -> None:
+    # Results completed before expiry tracking inherit the current retention window.
+    db.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.expires_at.is_(None),
+            GenerationJob.completed_at.is_not(None),
+            GenerationJob.result_path.is_not(None),
+        )
+        .values(expires_at=GenerationJob.completed_at + _resolve_retention_seconds())
+    )
+    # Rows without completed_at would otherwise never expire; age them from the stored file or the job itself.
+    rows = db.execute(
+        select(GenerationJob.id, GenerationJob.result_path, GenerationJob.created_at).where(
+            GenerationJob.expires_at.is_(None),
+            GenerationJob.completed_at.is_(None),
+            GenerationJob.result_path.is_not(None),
+        )
+    ).all()
+    for job_id, result_path, created_at in rows:
+        db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id)
+            .values(expires_at=_result_timestamp(result_path, created_at) + _resolve_retention_seconds())
+        )
+    db.commit()
+
+
+def _result_timestamp(result_path: str, created_at: float | None) -> float:
+    try:
+        path = get_storage().local_path(result_path)
+        if path is not None:
+            return path.stat().st_mtime
+    except (OSError, ValueError):
+        pass
+    return created_at if created_at is not None else time.time()
+
+
+def sweep_expired_results(
+    db: Session,
+    *,
+    now: float | None = None,
+    batch_size: int = DEFAULT_RETENTION_SWEEP_BATCH_SIZE,
+) -> int:
+    now = time.time() if now is None else now
+    _assign_missing_expiry(db)
+    store = result_store()
+
+    removed = 0
+    while True:
+        rows = db.execute(
+            select(GenerationJob.id, GenerationJob.result_path, GenerationJob.completed_at, Room.slug)
+            .join(Room, Room.id == GenerationJob.room_id)
+            .where(GenerationJob.expires_at <= now, GenerationJob.result_path.is_not(None))
+            .order_by(GenerationJob.expires_at.asc())
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return removed
+
+        cleared: list[tuple[int, str, float | None, str]] = []
+        for job_id, result_path, completed_at, room_slug in rows:
+            key = store.key_from_storage_key(result_path)
+            if key is not None:
+                # Shared blobs are only deleted once the last job releases them.
+                store.release(db, key)
+                cleared.append((job_id, result_path, completed_at, room_slug))
+                continue
+            try:
+                store.storage.delete(result_path)
+                remove_derivatives(result_path)
+            except OSError:
+                logger.warning("Could not remove expired result %s for job %s", result_path, job_id)
+                continue
+            cleared.append((job_id, result_path, completed_at, room_slug))
+
+        if cleared:
+            db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id.in_([job_id for job_id, *_ in cleared]))
+                .values(result_path=None)
+            )
+            db.commit()
+        for _, result_path, completed_at, room_slug in cleared:
+            event_bus.publish(
+                gallery_topic(room_slug),
+                GalleryEvent(
+                    kind="removed",
+                    item=_build_gallery_item(room_slug, result_path, completed_at or 0.0),
+                ),
+            )
+
+        removed += len(cleared)
+        if len(rows) < batch_size or not cleared:
+            return removed
+
+
+def _gallery_filters(room: RoomSnapshot) -> tuple[Any, ...]:
+    # Served from ix_generation_jobs_room_gallery; the cutoff hides results the retention pass is about to prune.
+    cutoff_timestamp = time.time() - _resolve_retention_seconds()
+    return (
+        GenerationJob.room_id == room.id,
+        GenerationJob.status == "completed",
+        GenerationJob.completed_at >= cutoff_timestamp,
+        GenerationJob.result_path.is_not(None),
+    )
+
+
+def gallery_version(db: Session, room: RoomSnapshot) -> tuple[Any, ...]:
+    # One aggregate over the gallery index: any result added, expired or aged out of the window changes it.
+    query = select(
+        func.count(GenerationJob.id),
+        func.max(GenerationJob.completed_at),
+        func.sum(GenerationJob.id),
+    ).where(*_gallery_filters(room))
+    return tuple(db.execute(query).one())
+
+
+@dataclass(frozen=True)
+class GalleryCursor:
+    # Keyset position in the gallery order: results sharing a completed_at are told apart by job id, so paging
+    # neither skips nor repeats them. Sent to clients as "<completed_at>:<id>".
+    completed_at: float
+    job_id: int
+
+    def encode(self) -> str:
+        return f"{self.completed_at!r}:{self.job_id}"
+
+    @classmethod
+    def parse(cls, raw: str) -> "GalleryCursor | None":
+        raw_completed_at, _, raw_job_id = raw.strip().rpartition(":")
         try:
-            modified_at = path.stat().st_mtime
-        except OSError:
-            continue
-        items.append((modified_at, path.name))
+            completed_at = float(raw_completed_at)
+            job_id = int(raw_job_id)
+        except ValueError:
+            return None
+        if not math.isfinite(completed_at):
+            return None
+        return cls(completed_at=completed_at, job_id=job_id)
+
+
+def list_gallery_results(
+    db: Session,
+    room: RoomSnapshot,
+    *,
+    before: GalleryCursor | None = None,
+    limit: int = DEFAULT_GALLERY_PAGE_SIZE,
+) -> tuple[list[dict[str, Any]], GalleryCursor | None]:
+    # Returns the page and, when it is full, the cursor of its last item for the next one.
+    query = (
+        select(GenerationJob.id, GenerationJob.result_path, GenerationJob.completed_at)
+        .where(*_gallery_filters(room))
+        .order_by(GenerationJob.completed_at.desc(), GenerationJob.id.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        query = query.where(
+            or_(
+                GenerationJob.completed_at < before.completed_at,
+                and_(GenerationJob.completed_at == before.completed_at, GenerationJob.id < before.job_id),
+            )
+        )
 
-    items.sort(key=lambda item: item[0], reverse=True)
-    return [
-        {"name": name, "url": f"/media/results/room-{room_slug}/{quote(name)}", "modified_at": modified_at}
-        for modified_at, name in items
-    ]
+    rows = db.execute(query).all()
+    items = [_build_gallery_item(room.slug, result_path, completed_at) for _, result_path, completed_at in rows]
+    next_cursor = None
+    if len(rows) == limit:
+        last_id, _, last_completed_at = rows[-1]
+        next_cursor = GalleryCursor(completed_at=last_completed_at, job_id=last_id)
+    return items, next_cursor
 
 
-def create_processing_job(db: Session, *, prompt_id: int, room_id: int, source_bytes: bytes) -> GenerationJob:
-    job = GenerationJob(prompt_id=prompt_id, room_id=room_id, status="processing")
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+def _spool_upload(source: BinaryIO) -> Path:
+    descriptor, raw_path = tempfile.mkstemp(prefix="upload-", suffix=".part")
+    path = Path(raw_path)
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            shutil.copyfileobj(source, handle, UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
 
-    source_path = SOURCE_DIR / _build_filename(job.id, ".jpg")
-    source_path.write_bytes(source_bytes)
-    job.source_path = str(source_path)
-    db.add(job)
-    db.commit()
+
+def create_processing_job(db: Session, *, prompt_id: int, room_id: int, source: BinaryIO) -> GenerationJob:
+    # Normalized (EXIF transpose, downscale, JPEG) before the job is queued, so the runner sends it as-is.
+    # The upload is copied to a temporary file in chunks and decoded from there; only the prepared file is stored.
+    source_key = f"{SOURCE_PREFIX}/{uuid4().hex}.jpg"
+    storage = get_storage()
+    upload_path = _spool_upload(source)
+    try:
+        prepared_path = openrouter_client.prepare_source_file(upload_path)
+        storage.put_path(source_key, prepared_path, content_type="image/jpeg")
+    finally:
+        upload_path.unlink(missing_ok=True)
+
+    # Inserted with the source already in place: a polling worker may claim the job right after commit.
+    job = GenerationJob(prompt_id=prompt_id, room_id=room_id, status="processing", source_path=source_key)
+    try:
+        db.add(job)
+        db.commit()
+    except Exception:
+        storage.delete(source_key)
+        raise
     db.refresh(job)
     return job
 
 
+def _normalize_model_name(raw_name: str | None) -> str | None:
+    model_name = (raw_name or "").strip()
+    if not model_name or model_name in {LEGACY_MODEL_NAME, LEGACY_OPENAI_MODEL_NAME, LEGACY_MINI_MODEL_NAME}:
+        return None
+    return model_name
+
+
 def _resolve_model_name(db: Session) -> str:
-    setting = db.get(ModelSetting, 1)
-    if setting is None:
-        return DEFAULT_MODEL_NAME
+    return _normalize_model_name(get_catalog_cache().model_setting(db)) or DEFAULT_MODEL_NAME
 
-    model_name = setting.model_name.strip()
-    if not model_name or model_name in {LEGACY_MODEL_NAME, LEGACY_OPENAI_MODEL_NAME, LEGACY_MINI_MODEL_NAME}:
-        return DEFAULT_MODEL_NAME
 
-    return model_name
+def _resolve_model_chain(db: Session, room: RoomSnapshot | None) -> tuple[str, ...]:
+    # The room's model leads (the global setting stands in when it is empty or retired), then its fallbacks.
+    primary = _normalize_model_name(room.model_name if room is not None else None) or _resolve_model_name(db)
+    fallbacks = [_normalize_model_name(name) for name in (room.fallback_models or [])] if room is not None else []
+    return tuple(dict.fromkeys([primary, *(name for name in fallbacks if name)]))
+
 
+def _should_try_next_model(exc: Exception) -> bool:
+    # Provider-side trouble moves the job down the chain; errors about the request itself would only repeat.
+    if isinstance(exc, CircuitOpenError):
+        return True
+    if is_transient_error(exc.__cause__ or exc):
+        return True
+    return "does not contain image data" in str(exc)
+
+
+@dataclass(frozen=True)
+class JobStatusEvent:
+    id: int
+    room_id: int
+    status: str
+    qr_hash: str | None
+    error_message: str | None
+
+
+def publish_job_status(job: GenerationJob) -> None:
+    event_bus.publish(
+        job_topic(job.id),
+        JobStatusEvent(
+            id=job.id,
+            room_id=job.room_id,
+            status=job.status,
+            qr_hash=job.qr_hash,
+            error_message=job.error_message,
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class _GenerationRequest:
+    job_id: int
+    room_id: int
+    models: tuple[str, ...]
+    slo: ModelSlo
+    prompt: str
+    source_path: str | None
+
+    def ordered_models(self) -> list[str]:
+        min_samples = get_runtime_config().model_health_min_samples
+        return order_models(self.models, self.slo, min_samples=min_samples)
+
+
+def _hold_lease(db: Session, job_id: int, lease_owner: str | None) -> bool:
+    # Re-asserts the lease inside the transaction that finishes the job. The UPDATE keeps the row locked until
+    # commit, so a worker that re-claimed the job after this one's lease lapsed cannot interleave; a lost lease
+    # matches no row. Callers without a lease (no queue involved) always hold it.
+    if lease_owner is None:
+        return True
+    held = db.execute(
+        update(GenerationJob)
+        .where(
+            GenerationJob.id == job_id,
+            GenerationJob.status == "processing",
+            GenerationJob.lease_owner == lease_owner,
+        )
+        .values(lease_owner=lease_owner)
+    )
+    return held.rowcount == 1
 
-def run_generation_sync(db: Session, job_id: int) -> GenerationJob:
+
+def _load_generation_request(db: Session, job_id: int, *, lease_owner: str | None = None) -> _GenerationRequest | None:
     job = db.get(GenerationJob, job_id)
     if job is None:
         raise ValueError(f"job {job_id} not found")
 
-    prompt = db.get(Prompt, job.prompt_id)
+    prompt = get_room_prompt(db, job.room_id, job.prompt_id)
     if prompt is None:
+        if not _hold_lease(db, job_id, lease_owner):
+            db.rollback()
+            return None
         job.status = "error"
         job.error_message = "prompt not found"
         db.add(job)
         db.commit()
         db.refresh(job)
-        return job
+        publish_job_status(job)
+        return None
+
+    room = get_catalog_cache().room_by_id(db, job.room_id)
+    return _GenerationRequest(
+        job_id=job.id,
+        room_id=job.room_id,
+        models=_resolve_model_chain(db, room),
+        slo=resolve_model_slo(
+            max_p95_seconds=room.slo_p95_seconds if room is not None else None,
+            max_error_rate=room.slo_error_rate if room is not None else None,
+        ),
+        prompt=prompt.prompt,
+        source_path=job.source_path,
+    )
+
+
+def _read_source_bytes(request: _GenerationRequest) -> bytes:
+    return get_storage().get(request.source_path) if request.source_path else b""
+
+
+def _find_cached_result(request: _GenerationRequest, digest: str) -> CachedResult | None:
+    cache = get_result_cache()
+    if not cache.enabled:
+        return None
+    for model in request.models:
+        key = result_cache_key(digest, request.prompt, model)
+        cached = cache.get(key)
+        if cached is None:
+            continue
+        if get_storage().exists(cached.result_key):
+            logger.info("Job %d reuses the cached %s result %s", request.job_id, model, cached.result_key)
+            return cached
+        cache.discard(key)
+    return None
+
+
+def _read_source(request: _GenerationRequest) -> tuple[bytes, str, CachedResult | None]:
+    source_bytes = _read_source_bytes(request)
+    digest = source_digest(source_bytes)
+    return source_bytes, digest, _find_cached_result(request, digest)
+
+
+def _remember_result(cache_key: str | None, job: GenerationJob) -> None:
+    # Only content-addressed results are shared, since those are reference counted per job.
+    if cache_key is None or not job.model_name or result_store().key_from_storage_key(job.result_path) is None:
+        return
+    get_result_cache().put(
+        cache_key,
+        CachedResult(result_key=job.result_path, size=job.result_size or 0, model=job.model_name),
+    )
+
+
+def _finish_generation(
+    db: Session,
+    job_id: int,
+    generated: bytes | GeneratedImage | CachedResult | Exception,
+    *,
+    model_name: str | None = None,
+    cache_key: str | None = None,
+    lease_owner: str | None = None,
+) -> GenerationJob | None:
+    if not _hold_lease(db, job_id, lease_owner):
+        # Another worker re-claimed the job after this lease lapsed; its run owns the source and the result.
+        db.rollback()
+        if isinstance(generated, GeneratedImage):
+            generated.path.unlink(missing_ok=True)
+        logger.warning("Job %d is no longer leased by %s; discarding its result", job_id, lease_owner)
+        return None
+
+    job = db.get(GenerationJob, job_id)
+    if job is None:
+        raise ValueError(f"job {job_id} not found")
+
+    job.model_name = model_name
 
     source_path = job.source_path
+    gallery_event: GalleryEvent | None = None
     try:
-        source_bytes = Path(source_path).read_bytes() if source_path else b""
-        model_name = _resolve_model_name(db)
-        generated = openrouter_client.generate_image(
-            model=model_name,
-            prompt=prompt.prompt,
-            image_bytes=source_bytes,
-        )
+        if isinstance(generated, Exception):
+            raise generated
 
         room = db.get(Room, job.room_id)
         if room is None:
             raise ValueError("room not found")
 
-        result_dir = _build_room_result_dir(room.slug)
-        result_path = result_dir / _build_filename(job.id, _resolve_result_suffix())
-        result_path.write_bytes(generated)
-        _prune_result_files()
+        result_key, result_size = _store_result(db, generated)
 
-        job.result_path = str(result_path)
+        job.result_path = result_key
+        job.completed_at = time.time()
+        job.expires_at = job.completed_at + _resolve_retention_seconds()
+        job.result_size = result_size
+        job.result_media_type = mimetypes.guess_type(result_key)[0]
+        gallery_event = GalleryEvent(
+            kind="added",
+            item=_build_gallery_item(room.slug, result_key, job.completed_at),
+        )
         if not job.qr_hash:
             job.qr_hash = _generate_qr_hash()
         job.status = "completed"
@@ -205,13 +529,99 @@ def run_generation_sync(db: Session, job_id: int) -> GenerationJob:
     finally:
         _cleanup_source_file(source_path)
         job.source_path = None
+        if isinstance(generated, GeneratedImage):
+            # Already moved into storage on success; removed here on any failure.
+            generated.path.unlink(missing_ok=True)
 
     db.add(job)
     db.commit()
     db.refresh(job)
+    if job.status == "completed":
+        # Encoded after the commit so the write lock is not held through image work; the derivative route builds
+        # any variant still missing when it is first requested.
+        write_derivatives(job.result_path)
+    if job.status == "completed" and not isinstance(generated, CachedResult):
+        _remember_result(cache_key, job)
+    publish_job_status(job)
+    if gallery_event is not None and job.status == "completed":
+        event_bus.publish(gallery_topic(room.slug), gallery_event)
     return job
 
 
+def _record_model_outcome(request: _GenerationRequest, model: str, started: float, exc: Exception | None) -> bool:
+    # Returns whether the job should move on to the next model in its chain.
+    elapsed = time.monotonic() - started
+    if exc is None:
+        get_latency_tracker().record(model, seconds=elapsed, ok=True)
+        return False
+    if not _should_try_next_model(exc):
+        return False
+    get_latency_tracker().record(model, seconds=elapsed, ok=False)
+    logger.warning("Job %d: model %s failed (%s)", request.job_id, model, exc)
+    return True
+
+
+def _load_generation_request_in_session(job_id: int, lease_owner: str | None) -> _GenerationRequest | None:
+    with SessionLocal() as db:
+        return _load_generation_request(db, job_id, lease_owner=lease_owner)
+
+
+def _finish_generation_in_session(
+    job_id: int,
+    generated: bytes | GeneratedImage | CachedResult | Exception,
+    model_name: str | None,
+    cache_key: str | None,
+    lease_owner: str | None,
+) -> None:
+    with SessionLocal() as db:
+        _finish_generation(db, job_id, generated, model_name=model_name, cache_key=cache_key, lease_owner=lease_owner)
+
+
+async def _generate_with_model(
+    request: _GenerationRequest,
+    model: str,
+    source_bytes: bytes,
+) -> tuple[bytes | GeneratedImage | Exception, bool]:
+    # Returns the outcome and whether the next model in the chain should be tried.
+    async with get_governor().slot(model=model, room_id=request.room_id):
+        # Timed inside the slot so queueing behind other jobs does not count against the model's latency.
+        started = time.monotonic()
+        try:
+            generated = await openrouter_client.generate_image_async(
+                model=model,
+                prompt=request.prompt,
+                image_bytes=source_bytes,
+            )
+        except Exception as exc:
+            return exc, _record_model_outcome(request, model, started, exc)
+    _record_model_outcome(request, model, started, None)
+    return generated, False
+
+
+async def run_generation_async(job_id: int, *, lease_owner: str | None = None) -> None:
+    # Database and storage work runs in threads; only the OpenRouter call is awaited on the loop.
+    # With a lease_owner the result is only recorded while that worker still holds the job's lease.
+    request = await asyncio.to_thread(_load_generation_request_in_session, job_id, lease_owner)
+    if request is None:
+        return
+
+    generated: bytes | GeneratedImage | CachedResult | Exception = RuntimeError("no model configured")
+    model = cache_key = None
+    try:
+        source_bytes, digest, cached = await asyncio.to_thread(_read_source, request)
+        if cached is not None:
+            generated, model = cached, cached.model
+        else:
+            for model in request.ordered_models():
+                generated, try_next_model = await _generate_with_model(request, model, source_bytes)
+                if not try_next_model:
+                    break
+            cache_key = result_cache_key(digest, request.prompt, model) if model else None
+    except Exception as exc:
+        generated = exc
+    await asyncio.to_thread(_finish_generation_in_session, job_id, generated, model, cache_key, lease_owner)
+
+
 def get_job_or_404(db: Session, job_id: int) -> GenerationJob | None:
     return db.get(GenerationJob, job_id)
 
@@ -236,21 +646,39 @@ def resolve_default_room_slug() -> str:
     return value or DEFAULT_PUBLIC_ROOM_SLUG
 
 
-def get_room_by_slug(db: Session, room_slug: str, *, active_only: bool) -> Room | None:
-    query = db.query(Room).filter(Room.slug == room_slug)
-    if active_only:
-        query = query.filter(Room.is_active.is_(True))
-    return query.first()
+def get_room_by_slug(db: Session, room_slug: str, *, active_only: bool) -> RoomSnapshot | None:
+    room = get_catalog_cache().room_by_slug(db, room_slug)
+    if room is None or (active_only and not room.is_active):
+        return None
+    return room
 
 
-def get_or_create_default_room(db: Session) -> Room:
+def get_or_create_default_room(db: Session) -> RoomSnapshot:
     default_slug = resolve_default_room_slug()
-    room = db.query(Room).filter(Room.slug == default_slug).first()
+    room = get_catalog_cache().room_by_slug(db, default_slug)
     if room is not None:
         return room
 
-    room = Room(slug=default_slug, name="Main", model_name=DEFAULT_MODEL_NAME, is_active=True)
-    db.add(room)
+    row = Room(slug=default_slug, name="Main", model_name=DEFAULT_MODEL_NAME, is_active=True)
+    db.add(row)
     db.commit()
-    db.refresh(room)
-    return room
+    db.refresh(row)
+    get_catalog_cache().invalidate_rooms()
+    return RoomSnapshot.from_row(row)
+
+
+def get_room_prompts(db: Session, room_id: int) -> tuple[PromptSnapshot, ...]:
+    return get_catalog_cache().room_prompts(db, room_id)
+
+
+def get_room_prompt(db: Session, room_id: int, prompt_id: int) -> PromptSnapshot | None:
+    cached = next((prompt for prompt in get_room_prompts(db, room_id) if prompt.id == prompt_id), None)
+    if cached is not None:
+        return cached
+    # Only hits are trusted: the prompt may have been added by another process after this one cached the room's
+    # list, and invalidations only reach the process that made the write (dedicated queue workers never get any).
+    prompt = db.get(Prompt, prompt_id)
+    if prompt is None or prompt.room_id != room_id:
+        return None
+    get_catalog_cache().invalidate_prompts(room_id)
+    return PromptSnapshot.from_row(prompt)
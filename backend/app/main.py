@@ -1,20 +1,51 @@
-from pathlib import Path
+import asyncio
+import signal
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
 from app.auth import router as admin_auth_router
+from app.blob_store import ContentAddressedStaticFiles
 from app.config import configure_logging, settings
 from app.db import init_db
+from app.image_executor import shutdown_image_executor
+from app.job_queue import start_worker_pool, stop_worker_pool
+from app.retention import start_retention_sweeper, stop_retention_sweeper
 from app.routers import admin, jobs, media, prompts, rooms, settings as settings_router
+from app.runtime_config import get_runtime_config, reload_runtime_config
+from app.storage import LocalStorage, get_storage
+from app.uploads import UploadSizeLimitMiddleware
 
 app = FastAPI(title=settings.app_name)
+app.add_middleware(UploadSizeLimitMiddleware)
+
+
+def _reload_runtime_config_on_signal() -> None:
+    reload_runtime_config(reread_env_file=True)
+
+
+def _install_reload_signal_handler() -> None:
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_runtime_config_on_signal)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on this platform or no running loop; the admin reload endpoint still works.
+        return
 
 
 @app.on_event("startup")
 def on_startup() -> None:
     configure_logging()
+    get_runtime_config()
+    _install_reload_signal_handler()
     init_db()
+    start_worker_pool()
+    start_retention_sweeper()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    stop_retention_sweeper()
+    stop_worker_pool()
+    shutdown_image_executor()
 
 
 @app.get("/api/health")
@@ -32,4 +63,9 @@ app.include_router(media.router)
 app.include_router(jobs.router)
 app.include_router(jobs.room_router)
 app.include_router(jobs.public_router)
-app.mount("/media", StaticFiles(directory=str(Path(__file__).resolve().parents[1] / "storage")), name="media")
+
+storage = get_storage()
+if isinstance(storage, LocalStorage):
+    app.mount("/media", ContentAddressedStaticFiles(directory=str(storage.root)), name="media")
+else:
+    app.include_router(media.presigned_router)
@@ -0,0 +1,64 @@
+import math
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from app.generation_limiter import LatencyTracker, get_latency_tracker
+from app.runtime_config import get_runtime_config
+
+
+@dataclass(frozen=True)
+class ModelSlo:
+    max_p95_seconds: float
+    max_error_rate: float
+
+
+def resolve_model_slo(*, max_p95_seconds: float | None = None, max_error_rate: float | None = None) -> ModelSlo:
+    # Per-room thresholds win; the runtime configuration supplies the defaults.
+    config = get_runtime_config()
+    if max_p95_seconds is None:
+        max_p95_seconds = config.model_slo_p95_seconds
+    if max_error_rate is None:
+        max_error_rate = config.model_slo_error_rate
+    return ModelSlo(max_p95_seconds=max_p95_seconds, max_error_rate=max_error_rate)
+
+
+@dataclass(frozen=True)
+class ModelHealth:
+    samples: int
+    p95_seconds: float | None
+    error_rate: float | None
+
+
+def model_health(model: str, tracker: LatencyTracker | None = None) -> ModelHealth:
+    # Read from the shared latency window the generation governor keeps; model health has no window of its own.
+    outcomes = (tracker or get_latency_tracker()).outcomes(model)
+    if not outcomes:
+        return ModelHealth(samples=0, p95_seconds=None, error_rate=None)
+    latencies = sorted(seconds for seconds, ok in outcomes if ok)
+    p95 = latencies[max(1, math.ceil(0.95 * len(latencies))) - 1] if latencies else None
+    failures = sum(1 for _, ok in outcomes if not ok)
+    return ModelHealth(samples=len(outcomes), p95_seconds=p95, error_rate=failures / len(outcomes))
+
+
+def is_within_slo(model: str, slo: ModelSlo, *, min_samples: int, tracker: LatencyTracker | None = None) -> bool:
+    health = model_health(model, tracker)
+    if health.samples < min_samples:
+        # Too little recent traffic to judge; assume healthy.
+        return True
+    if health.error_rate is not None and health.error_rate > slo.max_error_rate:
+        return False
+    return health.p95_seconds is None or health.p95_seconds <= slo.max_p95_seconds
+
+
+def order_models(
+    models: Iterable[str],
+    slo: ModelSlo,
+    *,
+    min_samples: int,
+    tracker: LatencyTracker | None = None,
+) -> list[str]:
+    # Models within budget keep their configured order; degraded ones move to the back as a last resort.
+    tracker = tracker or get_latency_tracker()
+    chain = list(dict.fromkeys(models))
+    healthy = [model for model in chain if is_within_slo(model, slo, min_samples=min_samples, tracker=tracker)]
+    return healthy + [model for model in chain if model not in healthy]
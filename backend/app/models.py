@@ -1,4 +1,6 @@
-from sqlalchemy import Boolean, ForeignKey, String, Text
+import time
+
+from sqlalchemy import JSON, Boolean, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db import Base
@@ -12,6 +14,10 @@ class Room(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     model_name: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    # Ordered models tried after model_name when it is over its latency/error budget or failing.
+    fallback_models: Mapped[list[str]] = mapped_column(JSON, nullable=False, default=list, server_default="[]")
+    slo_p95_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    slo_error_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
 
 
 class ModelSetting(Base):
@@ -35,6 +41,11 @@ class Prompt(Base):
 
 class GenerationJob(Base):
     __tablename__ = "generation_jobs"
+    __table_args__ = (
+        Index("ix_generation_jobs_status_lease", "status", "lease_expires_at"),
+        Index("ix_generation_jobs_room_gallery", "room_id", "status", "completed_at"),
+        Index("ix_generation_jobs_expires_at", "expires_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     prompt_id: Mapped[int] = mapped_column(ForeignKey("prompts.id"), nullable=False)
@@ -44,3 +55,27 @@ class GenerationJob(Base):
     source_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
     result_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lease_owner: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    lease_expires_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    created_at: Mapped[float | None] = mapped_column(Float, nullable=True, default=time.time)
+    completed_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    expires_at: Mapped[float | None] = mapped_column(Float, nullable=True)
+    result_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    result_media_type: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    model_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+    __table_args__ = (
+        UniqueConstraint("namespace", "key", name="uq_stored_blobs_namespace_key"),
+        Index("ix_stored_blobs_unreferenced", "ref_count", "updated_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    namespace: Mapped[str] = mapped_column(String(120), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[float] = mapped_column(Float, nullable=False, default=time.time)
@@ -1,36 +1,44 @@
+import asyncio
 import base64
 import importlib
+import json
 import logging
 import os
 import sys
+import tempfile
 import time
+from dataclasses import dataclass
 from io import BytesIO
-from typing import Any
+from pathlib import Path
+from typing import Any, BinaryIO
 
-from PIL import Image, ImageOps, UnidentifiedImageError
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
 
-OpenAI = None
+from app.generation_limiter import get_attempt_latency_tracker
+from app.image_executor import run_image_task, run_image_task_async
+from app.image_ops import detect_image_format, draft_to_fit, has_alpha, resize_to_fit
+from app.image_payload import StreamingImageExtractor
+from app.request_hedging import run_hedged
+from app.retry_policy import CircuitBreaker, CircuitBreakerRegistry, RetryBudget, is_transient_error
+from app.runtime_config import RuntimeConfig, get_runtime_config
+
+AsyncOpenAI = None
 
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
-DEFAULT_PROVIDER_SORT = "throughput"
-DEFAULT_PREFERRED_MAX_LATENCY_SECONDS = 25
-DEFAULT_RESULT_FORMAT = "jpeg"
-DEFAULT_JPEG_QUALITY = 85
-DEFAULT_SOURCE_MAX_SIDE = 1280
-DEFAULT_SOURCE_JPEG_QUALITY = 85
-DEFAULT_MISSING_IMAGE_RETRIES = 3
+OPENROUTER_TIMEOUT_SECONDS = 120.0
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 60
 logger = logging.getLogger(__name__)
 
+_async_client: Any = None
+_async_client_key: tuple[Any, ...] | None = None
+_closing_tasks: set[asyncio.Task] = set()
+_circuit_breakers = CircuitBreakerRegistry()
 
-def _load_openai_client_class():
-    global OpenAI
-
-    if OpenAI is not None:
-        return OpenAI
 
+def _import_openai_class(name: str):
     try:
         module = importlib.import_module("openai")
-        openai_cls = getattr(module, "OpenAI")
+        return getattr(module, name)
     except Exception as exc:
         details = str(exc).strip()
         suffix = f": {details}" if details else ""
@@ -39,8 +47,16 @@ def _load_openai_client_class():
             f"({sys.executable}). Run backend with `cd backend && uv run uvicorn app.main:app --reload`{suffix}"
         ) from exc
 
-    OpenAI = openai_cls
-    return openai_cls
+
+def _load_async_openai_client_class():
+    global AsyncOpenAI
+
+    if AsyncOpenAI is not None:
+        return AsyncOpenAI
+
+    async_openai_cls = _import_openai_class("AsyncOpenAI")
+    AsyncOpenAI = async_openai_cls
+    return async_openai_cls
 
 
 def _extract_image_data_url_from_choices(payload: dict[str, Any]) -> str | None:
@@ -114,25 +130,6 @@ def _extract_error_message(payload: dict[str, Any]) -> str | None:
     return None
 
 
-def _response_to_dict(response: Any) -> dict[str, Any]:
-    if isinstance(response, dict):
-        return response
-
-    model_dump = getattr(response, "model_dump", None)
-    if callable(model_dump):
-        dumped = model_dump()
-        if isinstance(dumped, dict):
-            return dumped
-
-    to_dict = getattr(response, "to_dict", None)
-    if callable(to_dict):
-        dumped = to_dict()
-        if isinstance(dumped, dict):
-            return dumped
-
-    raise RuntimeError("OpenRouter response has unsupported format")
-
-
 def _format_openrouter_error(exc: Exception) -> RuntimeError:
     status_code = getattr(exc, "status_code", None)
 
@@ -171,30 +168,15 @@ def _is_missing_image_error_message(message: str) -> bool:
     )
 
 
-def _parse_positive_int(value: str | None) -> int | None:
-    if value is None:
-        return None
-    candidate = value.strip()
-    if not candidate:
-        return None
-    try:
-        parsed = int(candidate)
-    except ValueError:
-        return None
-    return parsed if parsed > 0 else None
-
-
-def _build_extra_body() -> dict[str, Any]:
+def _build_extra_body(*, provider_sort: str | None = None) -> dict[str, Any]:
+    config = get_runtime_config()
     provider: dict[str, Any] = {}
-    provider_sort = os.getenv("OPENROUTER_PROVIDER_SORT", DEFAULT_PROVIDER_SORT).strip()
+    if provider_sort is None:
+        provider_sort = config.provider_sort
     if provider_sort:
         provider["sort"] = provider_sort
-
-    preferred_max_latency = _parse_positive_int(
-        os.getenv("OPENROUTER_PREFERRED_MAX_LATENCY", str(DEFAULT_PREFERRED_MAX_LATENCY_SECONDS))
-    )
-    if preferred_max_latency is not None:
-        provider["preferred_max_latency"] = preferred_max_latency
+    if config.preferred_max_latency is not None:
+        provider["preferred_max_latency"] = config.preferred_max_latency
 
     extra_body: dict[str, Any] = {"modalities": ["image", "text"], "stream": False}
     if provider:
@@ -202,137 +184,210 @@ def _build_extra_body() -> dict[str, Any]:
     return extra_body
 
 
-def _resolve_result_format() -> str:
-    raw_format = os.getenv("OPENROUTER_RESULT_FORMAT", DEFAULT_RESULT_FORMAT).strip().lower()
-    if raw_format in {"jpg", "jpeg"}:
-        return "jpeg"
-    if raw_format == "png":
-        return "png"
-    return DEFAULT_RESULT_FORMAT
+@dataclass(frozen=True)
+class PreparedSource:
+    content: bytes
+    original_size: tuple[int, int]
+    size: tuple[int, int]
 
 
-def _resolve_jpeg_quality() -> int:
-    parsed = _parse_positive_int(os.getenv("OPENROUTER_JPEG_QUALITY", str(DEFAULT_JPEG_QUALITY)))
-    if parsed is None:
-        return DEFAULT_JPEG_QUALITY
-    return max(1, min(parsed, 95))
-
-
-def _resolve_source_max_side() -> int | None:
-    parsed = _parse_positive_int(os.getenv("OPENROUTER_SOURCE_MAX_SIDE", str(DEFAULT_SOURCE_MAX_SIDE)))
-    return parsed if parsed is not None else DEFAULT_SOURCE_MAX_SIDE
-
-
-def _resolve_source_jpeg_quality() -> int:
-    parsed = _parse_positive_int(os.getenv("OPENROUTER_SOURCE_JPEG_QUALITY", str(DEFAULT_SOURCE_JPEG_QUALITY)))
-    if parsed is None:
-        return DEFAULT_SOURCE_JPEG_QUALITY
-    return max(1, min(parsed, 95))
+def _is_ready_source(image: Image.Image, max_side: int) -> bool:
+    # Header-only check: upright JPEGs within bounds (e.g. payloads prepared at upload) are sent untouched.
+    return (
+        image.format == "JPEG"
+        and max(image.size) <= max_side
+        and image.getexif().get(ExifTags.Base.Orientation, 1) == 1
+    )
 
 
-def _resolve_missing_image_retries() -> int:
-    raw_retries = os.getenv("OPENROUTER_MISSING_IMAGE_RETRIES", str(DEFAULT_MISSING_IMAGE_RETRIES)).strip()
+def is_ready_source(source: bytes | Path, *, max_side: int) -> bool:
     try:
-        retries = int(raw_retries)
-    except ValueError:
-        return DEFAULT_MISSING_IMAGE_RETRIES
-    return max(0, retries)
-
-
-def _prepare_source_image_for_request(image_bytes: bytes) -> bytes:
-    max_side = _resolve_source_max_side()
-    if max_side is None:
+        with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as image:
+            return _is_ready_source(image, max_side)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return False
+
+
+def _save_source_image(image: Image.Image, output: BinaryIO, *, max_side: int, quality: int) -> tuple[int, int]:
+    draft_to_fit(image, max_side)
+    normalized = resize_to_fit(ImageOps.exif_transpose(image), max_side)
+    converted = normalized.convert("RGB")
+    converted.save(output, format="JPEG", quality=quality, optimize=True)
+    return converted.size
+
+
+def encode_source_image(image_bytes: bytes, *, max_side: int, quality: int) -> PreparedSource | None:
+    # Runs in the image process pool: pure, and configured only through its arguments.
+    with Image.open(BytesIO(image_bytes)) as image:
+        if _is_ready_source(image, max_side):
+            return None
+        original_size = image.size
+        output = BytesIO()
+        size = _save_source_image(image, output, max_side=max_side, quality=quality)
+        return PreparedSource(content=output.getvalue(), original_size=original_size, size=size)
+
+
+def encode_source_file(
+    source: str,
+    destination: str,
+    *,
+    max_side: int,
+    quality: int,
+) -> tuple[tuple[int, int], tuple[int, int]] | None:
+    # File-to-file variant for uploads, so the photo is never passed to the pool (or held in memory) as bytes.
+    # Returns the original and prepared sizes, or None when the source can be sent as-is.
+    with Image.open(source) as image:
+        if _is_ready_source(image, max_side):
+            return None
+        original_size = image.size
+        with open(destination, "wb") as output:
+            size = _save_source_image(image, output, max_side=max_side, quality=quality)
+        return original_size, size
+
+
+@dataclass(frozen=True)
+class GeneratedImage:
+    # A generated result spooled to a temporary file; whoever stores it takes ownership of the file.
+    path: Path
+    size: int
+    image_format: str | None
+
+
+def _save_output_image(
+    image: Image.Image,
+    output: BinaryIO,
+    *,
+    image_format: str,
+    quality: int,
+    progressive: bool = False,
+    optimize: bool = True,
+) -> None:
+    if image_format == "jpeg":
+        image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=optimize, progressive=progressive)
+        return
+    converted = image.convert("RGBA" if has_alpha(image) else "RGB")
+    converted.save(output, format=image_format.upper(), quality=quality)
+
+
+def transcode_output_file(source: str, destination: str, **options: Any) -> None:
+    # File-to-file variant for spooled results, so neither side is held in memory as bytes.
+    with Image.open(source) as image, open(destination, "wb") as output:
+        _save_output_image(image, output, **options)
+
+
+def _source_encoding_options() -> dict[str, int]:
+    config = get_runtime_config()
+    return {"max_side": config.source_max_side, "quality": config.source_jpeg_quality}
+
+
+def _use_prepared_source(image_bytes: bytes, prepared: PreparedSource | None) -> bytes:
+    if prepared is None:
         return image_bytes
+    logger.info(
+        "Prepared source image for OpenRouter: %sx%s -> %sx%s, %d -> %d bytes",
+        prepared.original_size[0],
+        prepared.original_size[1],
+        prepared.size[0],
+        prepared.size[1],
+        len(image_bytes),
+        len(prepared.content),
+    )
+    return prepared.content
 
+
+def prepare_source_file(path: Path) -> Path:
+    # Returns the file to store: a normalized copy (the upload is then removed) or the upload itself.
+    options = _source_encoding_options()
+    if is_ready_source(path, max_side=options["max_side"]):
+        return path
+    output, output_path = _create_spool_file(prefix="source-")
+    output.close()
     try:
-        with Image.open(BytesIO(image_bytes)) as image:
-            original_size = image.size
-            normalized = ImageOps.exif_transpose(image)
-
-            longest_side = max(normalized.size)
-            needs_resize = longest_side > max_side
-            if needs_resize:
-                scale = max_side / float(longest_side)
-                target_size = (
-                    max(1, int(round(normalized.size[0] * scale))),
-                    max(1, int(round(normalized.size[1] * scale))),
-                )
-                normalized = normalized.resize(target_size, Image.Resampling.LANCZOS)
-
-            if not needs_resize and image_bytes.startswith(b"\xff\xd8\xff"):
-                return image_bytes
-
-            converted = normalized.convert("RGB")
-            output = BytesIO()
-            converted.save(
-                output,
-                format="JPEG",
-                quality=_resolve_source_jpeg_quality(),
-                optimize=True,
-            )
-            prepared = output.getvalue()
-            logger.info(
-                "Prepared source image for OpenRouter: %sx%s -> %sx%s, %d -> %d bytes",
-                original_size[0],
-                original_size[1],
-                converted.size[0],
-                converted.size[1],
-                len(image_bytes),
-                len(prepared),
-            )
-            return prepared
+        sizes = run_image_task(encode_source_file, str(path), str(output_path), **options)
     except (UnidentifiedImageError, OSError, ValueError) as exc:
+        output_path.unlink(missing_ok=True)
         logger.warning("Failed to preprocess source image (%s); sending original bytes", exc.__class__.__name__)
-        return image_bytes
+        return path
+    except BaseException:
+        output_path.unlink(missing_ok=True)
+        raise
+    if sizes is None:
+        output_path.unlink(missing_ok=True)
+        return path
+    original_size, size = sizes
+    logger.info(
+        "Prepared source image for OpenRouter: %sx%s -> %sx%s, %d -> %d bytes",
+        original_size[0],
+        original_size[1],
+        size[0],
+        size[1],
+        path.stat().st_size,
+        output_path.stat().st_size,
+    )
+    path.unlink(missing_ok=True)
+    return output_path
 
 
-def _convert_image_to_jpeg(image_bytes: bytes) -> bytes:
-    if image_bytes.startswith(b"\xff\xd8\xff"):
+async def _prepare_source_image_async(image_bytes: bytes) -> bytes:
+    options = _source_encoding_options()
+    if is_ready_source(image_bytes, max_side=options["max_side"]):
         return image_bytes
-
     try:
-        with Image.open(BytesIO(image_bytes)) as image:
-            converted = image.convert("RGB")
-            output = BytesIO()
-            converted.save(output, format="JPEG", quality=_resolve_jpeg_quality(), optimize=True)
-            return output.getvalue()
+        prepared = await run_image_task_async(encode_source_image, image_bytes, **options)
     except (UnidentifiedImageError, OSError, ValueError) as exc:
-        logger.warning("Failed to convert generated image to JPEG (%s); storing original bytes", exc.__class__.__name__)
+        logger.warning("Failed to preprocess source image (%s); sending original bytes", exc.__class__.__name__)
         return image_bytes
+    return _use_prepared_source(image_bytes, prepared)
 
 
-def _transform_output_image(image_bytes: bytes) -> bytes:
-    target_format = _resolve_result_format()
-    if target_format == "jpeg":
-        return _convert_image_to_jpeg(image_bytes)
-    return image_bytes
+def _output_encoding_options(detected_format: str | None) -> dict[str, Any] | None:
+    # None means the provider bytes are stored as-is, skipping a decode and encode on the job's critical path.
+    config = get_runtime_config()
+    image_format = config.result_format
+    if image_format == "passthrough" or detected_format == image_format:
+        return None
+    if image_format == "jpeg":
+        return {
+            "image_format": "jpeg",
+            "quality": config.jpeg_quality,
+            "progressive": config.jpeg_progressive,
+            "optimize": config.jpeg_optimize,
+        }
+    return {"image_format": image_format, "quality": config.result_quality}
 
 
-def generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENROUTER_API_KEY is not configured")
+def _log_output_transcode_failure(exc: Exception, image_format: str) -> None:
+    logger.warning(
+        "Failed to convert generated image to %s (%s); storing original bytes",
+        image_format.upper(),
+        exc.__class__.__name__,
+    )
 
-    openai_client_class = _load_openai_client_class()
 
-    headers: dict[str, str] = {}
-    http_referer = os.getenv("OPENROUTER_HTTP_REFERER")
-    if http_referer:
-        headers["HTTP-Referer"] = http_referer
-    x_title = os.getenv("OPENROUTER_X_TITLE")
-    if x_title:
-        headers["X-Title"] = x_title
+def _create_spool_file(prefix: str = "generated-") -> tuple[BinaryIO, Path]:
+    descriptor, raw_path = tempfile.mkstemp(prefix=prefix, suffix=".part")
+    return os.fdopen(descriptor, "wb"), Path(raw_path)
 
-    client = openai_client_class(
-        api_key=api_key,
-        base_url=OPENROUTER_BASE_URL,
-        default_headers=headers,
-        timeout=120.0,
-    )
 
-    prepared_source = _prepare_source_image_for_request(image_bytes)
+async def _transform_output_file_async(generated: GeneratedImage) -> GeneratedImage:
+    options = _output_encoding_options(generated.image_format)
+    if options is None:
+        return generated
+    output, output_path = _create_spool_file()
+    output.close()
+    try:
+        await run_image_task_async(transcode_output_file, str(generated.path), str(output_path), **options)
+    except (UnidentifiedImageError, OSError, ValueError) as exc:
+        output_path.unlink(missing_ok=True)
+        _log_output_transcode_failure(exc, options["image_format"])
+        return generated
+    generated.path.unlink(missing_ok=True)
+    return GeneratedImage(path=output_path, size=output_path.stat().st_size, image_format=options["image_format"])
+
+
+def _build_messages(prompt: str, prepared_source: bytes) -> list[dict[str, Any]]:
     encoded_image = base64.b64encode(prepared_source).decode("utf-8")
-    messages = [
+    return [
         {
             "role": "user",
             "content": [
@@ -342,48 +397,271 @@ def generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
         }
     ]
 
-    missing_image_retries = _resolve_missing_image_retries()
-    for attempt in range(missing_image_retries + 1):
-        request_started = time.perf_counter()
-        try:
-            response = client.chat.completions.create(
+
+def _extract_generated_image(data: dict[str, Any]) -> bytes | None:
+    data_url_or_b64 = _extract_image_data_url_from_choices(data)
+    if not data_url_or_b64:
+        data_url_or_b64 = _extract_image_b64_from_legacy_data(data)
+    if not data_url_or_b64:
+        return None
+    return _decode_image_data(data_url_or_b64)
+
+
+def _build_async_http_client(config: RuntimeConfig):
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=config.http2,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=OPENROUTER_TIMEOUT_SECONDS,
+    )
+
+
+def _retire_async_client(client: Any, loop: asyncio.AbstractEventLoop) -> None:
+    # Close a replaced client on the loop that owns its connection pool; a closed loop already dropped it.
+    close = getattr(client, "close", None)
+    if not callable(close) or loop.is_closed():
+        return
+    if loop is asyncio.get_running_loop():
+        task = loop.create_task(close())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(close(), loop)
+
+
+def _get_async_client():
+    global _async_client, _async_client_key
+
+    config = get_runtime_config()
+    if not config.api_key:
+        raise RuntimeError("OPENROUTER_API_KEY is not configured")
+    async_openai_client_class = _load_async_openai_client_class()
+
+    # httpx connection pools are bound to the event loop that created them; a config reload that changes
+    # the key, headers or connection settings builds a new client.
+    key = (
+        asyncio.get_running_loop(),
+        async_openai_client_class,
+        config.api_key,
+        config.default_headers,
+        config.max_connections,
+        config.max_keepalive_connections,
+        config.http2,
+    )
+    if _async_client is not None and _async_client_key == key:
+        return _async_client
+    if _async_client is not None and _async_client_key is not None:
+        _retire_async_client(_async_client, _async_client_key[0])
+
+    _async_client = async_openai_client_class(
+        api_key=config.api_key,
+        base_url=OPENROUTER_BASE_URL,
+        default_headers=dict(config.default_headers),
+        timeout=OPENROUTER_TIMEOUT_SECONDS,
+        # Retries go through the app's policy, retry budget and circuit breaker only.
+        max_retries=0,
+        http_client=_build_async_http_client(config),
+    )
+    _async_client_key = key
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client, _async_client_key
+
+    client, _async_client, _async_client_key = _async_client, None, None
+    close = getattr(client, "close", None)
+    if callable(close):
+        await close()
+
+
+def _log_request_failure(request_started: float, model: str, prepared_source: bytes) -> None:
+    elapsed_ms = int((time.perf_counter() - request_started) * 1000)
+    logger.warning(
+        "OpenRouter request failed in %sms (model=%s, input_bytes=%d)",
+        elapsed_ms,
+        model,
+        len(prepared_source),
+    )
+
+
+def _log_request_completed(request_started: float, model: str, prepared_source: bytes) -> None:
+    elapsed_ms = int((time.perf_counter() - request_started) * 1000)
+    logger.info(
+        "OpenRouter request completed in %sms (model=%s, input_bytes=%d)",
+        elapsed_ms,
+        model,
+        len(prepared_source),
+    )
+
+
+def _retry_delay_after_error(
+    exc: Exception,
+    formatted_error: RuntimeError,
+    *,
+    budget: RetryBudget,
+    breaker: CircuitBreaker,
+) -> float | None:
+    # Only transient failures (429, 5xx, network) count against the circuit; any other answer proves it is up.
+    if is_transient_error(exc):
+        breaker.record_failure()
+        delay = budget.after_transient_error(exc)
+        if delay is not None:
+            logger.warning("OpenRouter transient error (%s); retrying in %.1fs", formatted_error, delay)
+        return delay
+    breaker.record_success()
+    if not _is_missing_image_error_message(str(formatted_error)):
+        return None
+    delay = budget.after_missing_image()
+    if delay is not None:
+        logger.warning("OpenRouter error indicates missing image; retrying in %.1fs", delay)
+    return delay
+
+
+def _retry_delay_after_missing_image(budget: RetryBudget) -> float | None:
+    delay = budget.after_missing_image()
+    if delay is not None:
+        logger.warning("OpenRouter response missing image data; retrying in %.1fs", delay)
+    return delay
+
+
+def _new_retry_budget() -> RetryBudget:
+    config = get_runtime_config()
+    return RetryBudget(config.retry, missing_image_retries=config.missing_image_retries)
+
+
+def _parse_response_skeleton(skeleton: bytes | bytearray) -> dict[str, Any]:
+    try:
+        data = json.loads(skeleton)
+    except ValueError as exc:
+        raise RuntimeError("OpenRouter response has unsupported format") from exc
+    if not isinstance(data, dict):
+        raise RuntimeError("OpenRouter response has unsupported format")
+    return data
+
+
+async def _stream_generated_image(
+    client: Any,
+    *,
+    model: str,
+    messages: list[dict[str, Any]],
+    extra_body: dict[str, Any],
+) -> GeneratedImage | None:
+    # The body is streamed and the image decoded chunk by chunk into a spool file, so a multi-megabyte result
+    # never exists as a JSON string, a base64 string and decoded bytes at the same time.
+    started = time.perf_counter()
+    sink, path = _create_spool_file()
+    try:
+        with sink:
+            extractor = StreamingImageExtractor(sink)
+            async with client.chat.completions.with_streaming_response.create(
                 model=model,
                 messages=messages,
-                extra_body=_build_extra_body(),
-            )
-        except Exception as exc:
-            elapsed_ms = int((time.perf_counter() - request_started) * 1000)
-            logger.warning(
-                "OpenRouter request failed in %sms (model=%s, input_bytes=%d)",
-                elapsed_ms,
-                model,
-                len(prepared_source),
-            )
-            formatted_error = _format_openrouter_error(exc)
-            if attempt < missing_image_retries and _is_missing_image_error_message(str(formatted_error)):
-                logger.warning("OpenRouter error indicates missing image (attempt %d), retrying", attempt + 1)
-                continue
-            raise formatted_error from exc
-
-        data = _response_to_dict(response)
-        elapsed_ms = int((time.perf_counter() - request_started) * 1000)
-        logger.info(
-            "OpenRouter request completed in %sms (model=%s, input_bytes=%d)",
-            elapsed_ms,
-            model,
-            len(prepared_source),
+                extra_body=extra_body,
+            ) as response:
+                async for chunk in response.iter_bytes():
+                    extractor.feed(chunk)
+            extractor.close()
+            if extractor.found:
+                generated = GeneratedImage(
+                    path=path, size=extractor.size, image_format=detect_image_format(extractor.head)
+                )
+            else:
+                # Image strings without a data: prefix are not picked up while streaming; they are small enough.
+                decoded = _extract_generated_image(_parse_response_skeleton(extractor.skeleton))
+                if decoded is None:
+                    generated = None
+                else:
+                    sink.write(decoded)
+                    generated = GeneratedImage(path=path, size=len(decoded), image_format=detect_image_format(decoded))
+    except Exception:
+        path.unlink(missing_ok=True)
+        _record_attempt_latency(model, started, ok=False)
+        raise
+    except BaseException:
+        # A cancelled hedge loser says nothing about the model's latency.
+        path.unlink(missing_ok=True)
+        raise
+
+    if generated is None:
+        path.unlink(missing_ok=True)
+    _record_attempt_latency(model, started, ok=generated is not None)
+    return generated
+
+
+def _record_attempt_latency(model: str, started: float, *, ok: bool) -> None:
+    get_attempt_latency_tracker().record(model, seconds=time.perf_counter() - started, ok=ok)
+
+
+def _discard_generated_image(generated: GeneratedImage) -> None:
+    generated.path.unlink(missing_ok=True)
+
+
+async def _request_generated_image(
+    client: Any,
+    *,
+    model: str,
+    messages: list[dict[str, Any]],
+) -> GeneratedImage | None:
+    policy = get_runtime_config().hedge
+    if policy is None:
+        return await _stream_generated_image(
+            client,
+            model=model,
+            messages=messages,
+            extra_body=_build_extra_body(),
         )
-        data_url_or_b64 = _extract_image_data_url_from_choices(data)
-        if not data_url_or_b64:
-            data_url_or_b64 = _extract_image_b64_from_legacy_data(data)
-        if data_url_or_b64:
-            decoded = _decode_image_data(data_url_or_b64)
-            return _transform_output_image(decoded)
-
-        if attempt < missing_image_retries:
-            logger.warning("OpenRouter response missing image data (attempt %d), retrying", attempt + 1)
-            continue
 
-        raise RuntimeError("OpenRouter response does not contain image data")
+    async def start(index: int) -> GeneratedImage | None:
+        # The hedge may use different provider routing so it does not land on the same slow provider.
+        extra_body = _build_extra_body(provider_sort=policy.provider_sort if index else None)
+        return await _stream_generated_image(client, model=model, messages=messages, extra_body=extra_body)
+
+    return await run_hedged(
+        start,
+        delay=policy.delay_for(
+            get_attempt_latency_tracker().percentile(model, policy.percentile, min_samples=policy.min_samples)
+        ),
+        discard=_discard_generated_image,
+    )
+
+
+async def generate_image_async(*, model: str, prompt: str, image_bytes: bytes) -> GeneratedImage:
+    client = _get_async_client()
+
+    prepared_source = await _prepare_source_image_async(image_bytes)
+    messages = _build_messages(prompt, prepared_source)
 
-    raise RuntimeError("OpenRouter response does not contain image data")
+    budget = _new_retry_budget()
+    breaker = _circuit_breakers.get(model, budget.policy)
+    while True:
+        breaker.acquire()
+        request_started = time.perf_counter()
+        try:
+            generated = await _request_generated_image(client, model=model, messages=messages)
+        except Exception as exc:
+            _log_request_failure(request_started, model, prepared_source)
+            formatted_error = _format_openrouter_error(exc)
+            delay = _retry_delay_after_error(exc, formatted_error, budget=budget, breaker=breaker)
+            if delay is None:
+                raise formatted_error from exc
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            breaker.release()
+            raise
+
+        breaker.record_success()
+        _log_request_completed(request_started, model, prepared_source)
+        if generated is not None:
+            return await _transform_output_file_async(generated)
+
+        delay = _retry_delay_after_missing_image(budget)
+        if delay is None:
+            raise RuntimeError("OpenRouter response does not contain image data")
+        await asyncio.sleep(delay)
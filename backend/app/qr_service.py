@@ -1,6 +1,13 @@
+import threading
+from collections import OrderedDict
 from io import BytesIO
 
 import qrcode
+from qrcode.image.svg import SvgPathImage
+
+from app.runtime_config import DEFAULT_QR_CACHE_MAX_ENTRIES, get_runtime_config
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
 
 
 def build_qr_png(url: str) -> bytes:
@@ -8,3 +15,54 @@ def build_qr_png(url: str) -> bytes:
     buffer = BytesIO()
     image.save(buffer, format="PNG")
     return buffer.getvalue()
+
+
+def build_qr_svg(url: str) -> bytes:
+    image = qrcode.make(url, image_factory=SvgPathImage)
+    buffer = BytesIO()
+    image.save(buffer)
+    return buffer.getvalue()
+
+
+class QrCache:
+    # Rendered QR codes by format and target URL. The target of a job never changes once its qr_hash is issued,
+    # so entries never go stale; past `max_entries` the least recently used one is dropped.
+    def __init__(self, *, max_entries: int = DEFAULT_QR_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def get(self, qr_format: str, url: str) -> bytes | None:
+        key = (qr_format, url)
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, qr_format: str, url: str, content: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (qr_format, url)
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = QrCache()
+
+
+def get_qr_cache() -> QrCache:
+    # A smaller max_entries from a config reload takes effect on the next put.
+    _cache.max_entries = get_runtime_config().qr_cache_max_entries
+    return _cache
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from app.config import env_flag, env_float, env_int
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_INITIAL_DELAY_SECONDS = 30.0
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = 5.0
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+def _resolve_hedge_percentile() -> float:
+    value = env_float("OPENROUTER_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE, positive=True)
+    return value if value < 100 else DEFAULT_HEDGE_PERCENTILE
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    percentile: float
+    min_samples: int
+    initial_delay: float
+    min_delay: float
+    provider_sort: str | None
+
+    def delay_for(self, observed: float | None) -> float:
+        # `observed` is the model's per-request latency at `percentile`, None while warming up.
+        if observed is None:
+            # Too few samples yet: hedge only requests that are clearly slow.
+            return self.initial_delay
+        return max(self.min_delay, observed)
+
+
+def resolve_hedge_policy() -> HedgePolicy | None:
+    if not env_flag("OPENROUTER_HEDGE_ENABLED", False):
+        return None
+    return HedgePolicy(
+        percentile=_resolve_hedge_percentile(),
+        min_samples=env_int("OPENROUTER_HEDGE_MIN_SAMPLES", DEFAULT_HEDGE_MIN_SAMPLES, minimum=1),
+        initial_delay=env_float(
+            "OPENROUTER_HEDGE_INITIAL_DELAY_SECONDS",
+            DEFAULT_HEDGE_INITIAL_DELAY_SECONDS,
+            positive=True,
+        ),
+        min_delay=env_float("OPENROUTER_HEDGE_MIN_DELAY_SECONDS", DEFAULT_HEDGE_MIN_DELAY_SECONDS, positive=True),
+        provider_sort=os.getenv("OPENROUTER_HEDGE_PROVIDER_SORT", "").strip() or None,
+    )
+
+
+async def run_hedged(
+    start: Callable[[int], Awaitable[T | None]],
+    *,
+    delay: float,
+    discard: Callable[[T], None],
+) -> T | None:
+    # start(0) is the primary request; start(1), the hedge, is sent only if the primary has not finished after
+    # `delay` seconds. The first non-None result wins and the other request is cancelled. Results that arrive
+    # anyway from a losing request are handed to `discard`. None means no request produced a result.
+    tasks = [asyncio.create_task(start(0))]
+    winner: asyncio.Task | None = None
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            logger.info("No response after %.1fs; sending hedged request", delay)
+            tasks.append(asyncio.create_task(start(1)))
+            pending = set(tasks)
+        while winner is None:
+            for task in tasks:
+                if task in done and task.exception() is None and task.result() is not None:
+                    winner = task
+                    break
+            if winner is not None or not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        for task, outcome in zip(tasks, outcomes):
+            if task is not winner and outcome is not None and not isinstance(outcome, BaseException):
+                discard(outcome)
+
+    if winner is not None:
+        return winner.result()
+    errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    if len(errors) == len(tasks):
+        raise errors[0]
+    return None
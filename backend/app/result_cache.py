@@ -0,0 +1,89 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.runtime_config import DEFAULT_RESULT_CACHE_MAX_ENTRIES, DEFAULT_RESULT_CACHE_TTL_SECONDS, get_runtime_config
+
+
+def source_digest(source_bytes: bytes) -> str:
+    return hashlib.sha256(source_bytes).hexdigest()
+
+
+def result_cache_key(digest: str, prompt: str, model: str) -> str:
+    # Exact match only: uploads are normalized before storage, so a resubmitted photo hashes the same.
+    return hashlib.sha256("\0".join((digest, model, prompt)).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    result_key: str
+    size: int
+    model: str
+
+
+class ResultCache:
+    # Recent generations by source, prompt and model, so repeated submissions reuse the stored result blob.
+    # Entries expire after `ttl_seconds`; past `max_entries` the least recently used entry is dropped.
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = DEFAULT_RESULT_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_RESULT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedResult]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> CachedResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    # Limits follow the runtime configuration; a smaller max_entries takes effect on the next put.
+    config = get_runtime_config()
+    _cache.ttl_seconds = config.result_cache_ttl_seconds
+    _cache.max_entries = config.result_cache_max_entries
+    return _cache
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+
+from app.blob_store import BlobStore, collect_unreferenced_blobs
+from app.config import env_float, env_int
+from app.db import SessionLocal
+from app.image_derivatives import remove_derivatives
+from app.job_service import DEFAULT_RETENTION_SWEEP_BATCH_SIZE, RESULT_NAMESPACE, result_store, sweep_expired_results
+from app.routers.media import media_store_for_namespace
+
+DEFAULT_SWEEP_INTERVAL_SECONDS = 300.0
+DEFAULT_BLOB_GRACE_SECONDS = 24 * 60 * 60
+logger = logging.getLogger(__name__)
+
+
+def _resolve_sweep_interval() -> float:
+    return env_float("RESULT_SWEEP_INTERVAL_SECONDS", DEFAULT_SWEEP_INTERVAL_SECONDS)
+
+
+def _resolve_sweep_batch_size() -> int:
+    return env_int("RESULT_SWEEP_BATCH_SIZE", DEFAULT_RETENTION_SWEEP_BATCH_SIZE, minimum=1)
+
+
+def _resolve_blob_grace_seconds() -> float:
+    return env_float("BLOB_GC_GRACE_SECONDS", DEFAULT_BLOB_GRACE_SECONDS)
+
+
+def _resolve_blob_store(namespace: str) -> BlobStore | None:
+    if namespace == RESULT_NAMESPACE:
+        return result_store()
+    return media_store_for_namespace(namespace)
+
+
+def collect_unreferenced_media(*, batch_size: int, now: float | None = None) -> int:
+    # Unreferenced blobs get a grace period: an upload is only retained once a prompt is saved with it.
+    released_before = (time.time() if now is None else now) - _resolve_blob_grace_seconds()
+    with SessionLocal() as db:
+        removed = collect_unreferenced_blobs(
+            db,
+            resolve_store=_resolve_blob_store,
+            released_before=released_before,
+            batch_size=batch_size,
+        )
+    for path in removed:
+        remove_derivatives(path)
+    return len(removed)
+
+
+class RetentionSweeper:
+    def __init__(self, *, interval_seconds: float, batch_size: int) -> None:
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def sweep_once(self) -> int:
+        with SessionLocal() as db:
+            removed = sweep_expired_results(db, batch_size=self.batch_size)
+        while True:
+            collected = collect_unreferenced_media(batch_size=self.batch_size)
+            removed += collected
+            if collected < self.batch_size:
+                return removed
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                removed = self.sweep_once()
+                if removed:
+                    logger.info("Retention sweep removed %d expired result(s)", removed)
+            except Exception:
+                logger.exception("Retention sweep failed")
+            self._stopping.wait(self.interval_seconds)
+
+
+_sweeper: RetentionSweeper | None = None
+
+
+def start_retention_sweeper() -> RetentionSweeper | None:
+    global _sweeper
+
+    interval_seconds = _resolve_sweep_interval()
+    if interval_seconds == 0:
+        # Another process owns retention; sweeps are idempotent but need not run everywhere.
+        return None
+    if _sweeper is None:
+        _sweeper = RetentionSweeper(interval_seconds=interval_seconds, batch_size=_resolve_sweep_batch_size())
+    _sweeper.start()
+    return _sweeper
+
+
+def stop_retention_sweeper() -> None:
+    global _sweeper
+
+    sweeper, _sweeper = _sweeper, None
+    if sweeper is not None:
+        sweeper.stop()
@@ -0,0 +1,205 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+from app.config import env_float, env_int
+
+DEFAULT_TRANSIENT_RETRIES = 2
+DEFAULT_RETRY_BASE_DELAY_SECONDS = 1.0
+DEFAULT_RETRY_MAX_DELAY_SECONDS = 20.0
+DEFAULT_RETRY_AFTER_MAX_SECONDS = 60.0
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+# Upstream statuses worth retrying: timeouts, rate limits and server-side failures.
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+_TRANSIENT_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "TransportError"}
+logger = logging.getLogger(__name__)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    status_code = getattr(exc, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # openai and httpx network errors, matched by name so neither package has to be importable here.
+    return any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+def retry_after_seconds(exc: BaseException, *, now: float | None = None) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    raw_value = headers.get("retry-after") if headers is not None else None
+    if not raw_value:
+        return None
+    raw_value = str(raw_value).strip()
+    try:
+        return max(0.0, float(raw_value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(raw_value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    transient_retries: int
+    base_delay: float
+    max_delay: float
+    retry_after_max: float
+    circuit_failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD
+    circuit_reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS
+
+    def backoff(self, retry_index: int) -> float:
+        # Exponential backoff with full jitter, so jobs that failed together do not retry in lockstep.
+        ceiling = min(self.max_delay, self.base_delay * (2**retry_index))
+        return random.uniform(0, ceiling)
+
+
+def resolve_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        transient_retries=env_int("OPENROUTER_TRANSIENT_RETRIES", DEFAULT_TRANSIENT_RETRIES),
+        base_delay=env_float("OPENROUTER_RETRY_BASE_DELAY_SECONDS", DEFAULT_RETRY_BASE_DELAY_SECONDS),
+        max_delay=env_float("OPENROUTER_RETRY_MAX_DELAY_SECONDS", DEFAULT_RETRY_MAX_DELAY_SECONDS),
+        retry_after_max=env_float(
+            "OPENROUTER_RETRY_AFTER_MAX_SECONDS",
+            DEFAULT_RETRY_AFTER_MAX_SECONDS,
+        ),
+        circuit_failure_threshold=env_int(
+            "OPENROUTER_CIRCUIT_FAILURE_THRESHOLD",
+            DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+            minimum=1,
+        ),
+        circuit_reset_seconds=env_float("OPENROUTER_CIRCUIT_RESET_SECONDS", DEFAULT_CIRCUIT_RESET_SECONDS),
+    )
+
+
+class RetryBudget:
+    # Per-call retry bookkeeping: transient failures and missing-image responses have separate allowances.
+    def __init__(self, policy: RetryPolicy, *, missing_image_retries: int) -> None:
+        self.policy = policy
+        self.missing_image_retries = missing_image_retries
+        self.transient_attempts = 0
+        self.missing_image_attempts = 0
+
+    def after_transient_error(self, exc: BaseException) -> float | None:
+        if self.transient_attempts >= self.policy.transient_retries:
+            return None
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None and retry_after > self.policy.retry_after_max:
+            # The provider asked for a longer pause than a visitor should wait; fail now.
+            return None
+        delay = self.policy.backoff(self.transient_attempts)
+        self.transient_attempts += 1
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def after_missing_image(self) -> float | None:
+        if self.missing_image_attempts >= self.missing_image_retries:
+            return None
+        delay = self.policy.backoff(self.missing_image_attempts)
+        self.missing_image_attempts += 1
+        return delay
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, key: str, retry_in: float) -> None:
+        super().__init__(f"OpenRouter model {key} is temporarily unavailable; retry in {math.ceil(retry_in)}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive transient failures; after `reset_seconds` one half-open
+    # probe request is let through, and its outcome closes the circuit or opens it again.
+    def __init__(
+        self,
+        key: str,
+        *,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._state == "closed":
+                return
+            now = self._clock()
+            if self._state == "open":
+                remaining = self._opened_at + self.reset_seconds - now
+                if remaining > 0:
+                    raise CircuitOpenError(self.key, remaining)
+                self._state = "half_open"
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.key, self.reset_seconds)
+            self._probe_in_flight = True
+            logger.info("Circuit for %s half-open; sending probe request", self.key)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != "closed":
+                logger.info("Circuit for %s closed", self.key)
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    logger.warning("Circuit for %s opened after %d failure(s)", self.key, self._failures)
+                self._state = "open"
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        # The call ended without an outcome (e.g. cancelled); let another caller probe.
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    # One breaker per model, shared by every job runner and request thread in the process.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, key: str, policy: RetryPolicy) -> CircuitBreaker:
+        # A breaker keeps the thresholds it was created with.
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    key,
+                    failure_threshold=policy.circuit_failure_threshold,
+                    reset_seconds=policy.circuit_reset_seconds,
+                )
+                self._breakers[key] = breaker
+            return breaker
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
@@ -1,11 +1,15 @@
+from typing import Any
+
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from app.auth import require_admin
+from app.catalog_cache import get_catalog_cache
 from app.db import get_db
 from app.models import Prompt, Room
-from app.routers.media import save_prompt_icon, save_prompt_preview
+from app.routers.media import release_prompt_media, retain_prompt_media, save_prompt_icon, save_prompt_preview
+from app.runtime_config import get_runtime_config, reload_runtime_config
 from app.schemas import PromptCreate, PromptOut, RoomCreate, RoomModelUpdate, RoomOut, RoomUpdate
 
 router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
@@ -33,6 +37,7 @@ def create_room(payload: RoomCreate, db: Session = Depends(get_db)) -> Room:
     db.add(room)
     db.commit()
     db.refresh(room)
+    get_catalog_cache().invalidate_rooms()
     return room
 
 
@@ -47,9 +52,16 @@ def update_room(room_id: int, payload: RoomUpdate, db: Session = Depends(get_db)
     room.name = payload.name
     room.model_name = payload.model_name
     room.is_active = payload.is_active
+    if "fallback_models" in payload.model_fields_set:
+        room.fallback_models = payload.fallback_models or []
+    if "slo_p95_seconds" in payload.model_fields_set:
+        room.slo_p95_seconds = payload.slo_p95_seconds
+    if "slo_error_rate" in payload.model_fields_set:
+        room.slo_error_rate = payload.slo_error_rate
     db.add(room)
     db.commit()
     db.refresh(room)
+    get_catalog_cache().invalidate_rooms()
     return room
 
 
@@ -57,9 +69,12 @@ def update_room(room_id: int, payload: RoomUpdate, db: Session = Depends(get_db)
 def update_room_model(room_id: int, payload: RoomModelUpdate, db: Session = Depends(get_db)) -> Room:
     room = _get_room_or_404(db, room_id)
     room.model_name = payload.model_name
+    if payload.fallback_models is not None:
+        room.fallback_models = payload.fallback_models
     db.add(room)
     db.commit()
     db.refresh(room)
+    get_catalog_cache().invalidate_rooms()
     return room
 
 
@@ -74,8 +89,10 @@ def create_room_prompt(room_id: int, payload: PromptCreate, db: Session = Depend
     _get_room_or_404(db, room_id)
     prompt = Prompt(**payload.model_dump(), room_id=room_id)
     db.add(prompt)
+    retain_prompt_media(db, prompt)
     db.commit()
     db.refresh(prompt)
+    get_catalog_cache().invalidate_prompts(room_id)
     return prompt
 
 
@@ -86,8 +103,10 @@ def delete_room_prompt(room_id: int, prompt_id: int, db: Session = Depends(get_d
     if prompt is None or prompt.room_id != room_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="prompt not found")
 
+    release_prompt_media(db, prompt)
     db.delete(prompt)
     db.commit()
+    get_catalog_cache().invalidate_prompts(room_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -101,3 +120,14 @@ async def upload_room_prompt_preview(room_id: int, file: UploadFile, db: Session
 async def upload_room_prompt_icon(room_id: int, file: UploadFile, db: Session = Depends(get_db)) -> dict[str, str]:
     _get_room_or_404(db, room_id)
     return {"url": await save_prompt_icon(file, room_id=room_id)}
+
+
+@router.get("/runtime-config")
+def read_runtime_config() -> dict[str, Any]:
+    return get_runtime_config().as_dict()
+
+
+@router.post("/runtime-config/reload")
+def reload_runtime_config_endpoint() -> dict[str, Any]:
+    # Only this worker process reloads; send SIGHUP to each worker to reload them all.
+    return reload_runtime_config(reread_env_file=True).as_dict()
@@ -1,42 +1,62 @@
-import logging
-from pathlib import Path
-
-from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Request, UploadFile, status
-from fastapi.responses import FileResponse, Response
+import asyncio
+import json
+import mimetypes
+import time
+from collections.abc import AsyncIterator
+from pathlib import PurePosixPath
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from app.catalog_cache import RoomSnapshot
 from app.db import SessionLocal, get_db
+from app.event_bus import Subscription, event_bus, gallery_topic, job_topic
+from app.generation_limiter import check_admission
+from app.http_cache import matches_if_none_match, not_modified, set_validators, strong_etag
+from app.job_queue import notify_job_queued
 from app.job_service import (
+    DEFAULT_GALLERY_PAGE_SIZE,
+    MAX_GALLERY_PAGE_SIZE,
+    GalleryCursor,
     create_processing_job,
+    gallery_version,
     get_completed_job_by_qr_hash,
     get_completed_job_or_404,
     get_job_by_qr_hash,
     get_job_or_404,
     get_or_create_default_room,
     get_room_by_slug,
+    get_room_prompt,
+    get_room_result_key,
     list_gallery_results,
-    run_generation_sync,
 )
-from app.models import Prompt
-from app.qr_service import build_qr_png
+from app.image_derivatives import DERIVATIVE_MAX_SIDES, derivative_media_type, ensure_derivative
+from app.image_executor import run_image_task
+from app.models import Prompt, Room
+from app.qr_service import QR_MEDIA_TYPES, build_qr_png, build_qr_svg, get_qr_cache
 from app.schemas import GalleryImageOut, JobCreated, JobStatusOut
+from app.storage import get_storage, resolve_accel_redirect_prefix
+from app.uploads import LimitedReader, UploadTooLarge, resolve_upload_max_bytes, upload_too_large_error
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
 room_router = APIRouter(prefix="/api/rooms/{room_slug}/jobs", tags=["jobs"])
 public_router = APIRouter(prefix="/qr", tags=["qr"])
-logger = logging.getLogger(__name__)
+EVENT_STREAM_KEEPALIVE_SECONDS = 15.0
+GALLERY_STREAM_RESYNC_SECONDS = 60.0
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+QR_CACHE_CONTROL = DERIVATIVE_CACHE_CONTROL
+_TERMINAL_JOB_STATUSES = {"completed", "error"}
 
 
 def _build_qr_target_url(request: Request, qr_hash: str) -> str:
     return str(request.base_url).rstrip("/") + f"/qr/{qr_hash}"
 
 
-def _run_generation_in_background(job_id: int) -> None:
-    try:
-        with SessionLocal() as db:
-            run_generation_sync(db, job_id)
-    except Exception:
-        logger.exception("Background generation crashed for job %s", job_id)
+def _format_sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
 
 
 def _to_job_status(job: object, *, room_slug: str | None = None) -> JobStatusOut:
@@ -53,6 +73,7 @@ def _to_job_status(job: object, *, room_slug: str | None = None) -> JobStatusOut
             result_url=download_url,
             download_url=download_url,
             qr_url=qr_url,
+            preview_url=f"{download_url}?variant=medium",
             error_message=job.error_message,
         )
     return JobStatusOut(id=job.id, status=job.status, error_message=job.error_message)
@@ -71,24 +92,41 @@ async def _create_job_for_room(
     room_slug: str,
     prompt_id: int,
     photo: UploadFile,
-    background_tasks: BackgroundTasks,
 ) -> JobCreated:
     room = _resolve_room_or_404(db, room_slug)
-    prompt = db.get(Prompt, prompt_id)
-    if prompt is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="prompt not found")
-    if prompt.room_id != room.id:
+    if get_room_prompt(db, room.id, prompt_id) is None:
+        # The miss already loaded the row into this session; it only tells a missing prompt from another room's.
+        if db.get(Prompt, prompt_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="prompt not found")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="prompt does not belong to room")
 
-    payload = await photo.read()
-    job = create_processing_job(db, prompt_id=prompt_id, room_id=room.id, source_bytes=payload)
-    background_tasks.add_task(_run_generation_in_background, job.id)
+    rejection = check_admission(db, room_id=room.id)
+    if rejection is not None:
+        raise HTTPException(
+            status_code=rejection.status_code,
+            detail=rejection.detail,
+            headers={"Retry-After": str(rejection.retry_after_seconds)},
+        )
+
+    max_bytes = resolve_upload_max_bytes()
+    if photo.size is not None and photo.size > max_bytes:
+        raise upload_too_large_error(max_bytes)
+    try:
+        job = await run_in_threadpool(
+            create_processing_job,
+            db,
+            prompt_id=prompt_id,
+            room_id=room.id,
+            source=LimitedReader(photo.file, max_bytes),
+        )
+    except UploadTooLarge as exc:
+        raise upload_too_large_error(max_bytes) from exc
+    notify_job_queued()
     return JobCreated(id=job.id, status=job.status)
 
 
 @router.post("", status_code=status.HTTP_202_ACCEPTED, response_model=JobCreated)
 async def create_job(
-    background_tasks: BackgroundTasks,
     photo: UploadFile,
     prompt_id: int = Form(...),
     db: Session = Depends(get_db),
@@ -99,14 +137,12 @@ async def create_job(
         room_slug=default_room.slug,
         prompt_id=prompt_id,
         photo=photo,
-        background_tasks=background_tasks,
     )
 
 
 @room_router.post("", status_code=status.HTTP_202_ACCEPTED, response_model=JobCreated)
 async def create_job_for_room(
     room_slug: str,
-    background_tasks: BackgroundTasks,
     photo: UploadFile,
     prompt_id: int = Form(...),
     db: Session = Depends(get_db),
@@ -116,22 +152,193 @@ async def create_job_for_room(
         room_slug=room_slug,
         prompt_id=prompt_id,
         photo=photo,
-        background_tasks=background_tasks,
     )
 
 
+def _gallery_page(
+    db: Session,
+    room: RoomSnapshot,
+    request: Request,
+    response: Response,
+    *,
+    before: str | None,
+    limit: int,
+) -> list[GalleryImageOut] | Response:
+    cursor = None
+    if before is not None:
+        cursor = GalleryCursor.parse(before)
+        if cursor is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid gallery cursor")
+    # Answered from one aggregate query when the kiosk already has this page.
+    etag = strong_etag("gallery", room.id, room.slug, cursor, limit, gallery_version(db, room))
+    if matches_if_none_match(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    rows, next_cursor = list_gallery_results(db, room, before=cursor, limit=limit)
+    if next_cursor is not None:
+        # Cursor for the next page: pass it back as `?before=`.
+        response.headers["X-Next-Before"] = next_cursor.encode()
+    return [GalleryImageOut(**row) for row in rows]
+
+
 @router.get("/gallery", response_model=list[GalleryImageOut])
-def get_gallery_images(db: Session = Depends(get_db)) -> list[GalleryImageOut]:
+def get_gallery_images(
+    request: Request,
+    response: Response,
+    before: str | None = Query(default=None),
+    limit: int = Query(default=DEFAULT_GALLERY_PAGE_SIZE, ge=1, le=MAX_GALLERY_PAGE_SIZE),
+    db: Session = Depends(get_db),
+) -> list[GalleryImageOut] | Response:
     default_room = get_or_create_default_room(db)
-    rows = list_gallery_results(default_room.slug)
-    return [GalleryImageOut(**row) for row in rows]
+    return _gallery_page(db, default_room, request, response, before=before, limit=limit)
 
 
 @room_router.get("/gallery", response_model=list[GalleryImageOut])
-def get_gallery_images_for_room(room_slug: str, db: Session = Depends(get_db)) -> list[GalleryImageOut]:
+def get_gallery_images_for_room(
+    room_slug: str,
+    request: Request,
+    response: Response,
+    before: str | None = Query(default=None),
+    limit: int = Query(default=DEFAULT_GALLERY_PAGE_SIZE, ge=1, le=MAX_GALLERY_PAGE_SIZE),
+    db: Session = Depends(get_db),
+) -> list[GalleryImageOut] | Response:
     room = _resolve_room_or_404(db, room_slug)
-    rows = list_gallery_results(room.slug)
-    return [GalleryImageOut(**row) for row in rows]
+    return _gallery_page(db, room, request, response, before=before, limit=limit)
+
+
+def _load_room_gallery(room_slug: str) -> list[dict]:
+    with SessionLocal() as db:
+        room = _resolve_room_or_404(db, room_slug)
+        rows, _ = list_gallery_results(db, room)
+        return [GalleryImageOut(**row).model_dump() for row in rows]
+
+
+async def _gallery_event_stream(
+    request: Request,
+    subscription: Subscription,
+    *,
+    room_slug: str,
+    snapshot: list[dict],
+) -> AsyncIterator[str]:
+    try:
+        yield "retry: 3000\n\n"
+        yield _format_sse("snapshot", {"items": snapshot})
+        synced_at = time.monotonic()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+            except TimeoutError:
+                if await request.is_disconnected():
+                    return
+                if time.monotonic() - synced_at < GALLERY_STREAM_RESYNC_SECONDS:
+                    yield ": keepalive\n\n"
+                    continue
+                # Periodic resync covers results written or pruned by other processes.
+                try:
+                    items = await run_in_threadpool(_load_room_gallery, room_slug)
+                except HTTPException:
+                    return
+                synced_at = time.monotonic()
+                yield _format_sse("snapshot", {"items": items})
+                continue
+            yield _format_sse(event.kind, event.item)
+    finally:
+        subscription.close()
+
+
+@room_router.get("/gallery/events")
+async def stream_gallery_events_for_room(room_slug: str, request: Request) -> StreamingResponse:
+    subscription = event_bus.subscribe(gallery_topic(room_slug))
+    try:
+        snapshot = await run_in_threadpool(_load_room_gallery, room_slug)
+    except Exception:
+        subscription.close()
+        raise
+
+    return StreamingResponse(
+        _gallery_event_stream(request, subscription, room_slug=room_slug, snapshot=snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _wants_accel_redirect(request: Request) -> bool:
+    # Only a proxy that announces it (nginx sets this header) gets a hand-off instead of the bytes.
+    return request.headers.get("x-sendfile-type", "").lower() == "x-accel-redirect"
+
+
+def _stored_file_response(
+    key: str,
+    request: Request,
+    *,
+    media_type: str | None = None,
+    download_name: str | None = None,
+    cache_control: str | None = None,
+) -> Response:
+    storage = get_storage()
+    local_path = storage.local_path(key)
+    if local_path is None:
+        # Remote object storage serves the bytes; the API only hands out a short-lived link.
+        return RedirectResponse(
+            storage.presign(key, download_name=download_name),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        )
+    accel_prefix = resolve_accel_redirect_prefix()
+    if accel_prefix is not None and _wants_accel_redirect(request):
+        return _accel_redirect_response(
+            accel_prefix + quote(key),
+            media_type=media_type or mimetypes.guess_type(key)[0],
+            download_name=download_name,
+            cache_control=cache_control,
+        )
+    headers = {"Cache-Control": cache_control} if cache_control else None
+    return FileResponse(local_path, media_type=media_type, filename=download_name, headers=headers)
+
+
+def _accel_redirect_response(
+    location: str,
+    *,
+    media_type: str | None,
+    download_name: str | None,
+    cache_control: str | None,
+) -> Response:
+    # nginx serves the file itself (sendfile, ranges, conditional requests); only the headers come from here.
+    headers = {"X-Accel-Redirect": location}
+    if download_name:
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return Response(headers=headers, media_type=media_type)
+
+
+def _derivative_response(result_key: str, variant: str, request: Request) -> Response:
+    if variant not in DERIVATIVE_MAX_SIDES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="unknown image variant")
+    derivative = ensure_derivative(result_key, variant)
+    if derivative is None:
+        # Undecodable result: fall back to the original rather than breaking the tile.
+        return _stored_file_response(result_key, request, cache_control=DERIVATIVE_CACHE_CONTROL)
+    return _stored_file_response(
+        derivative,
+        request,
+        media_type=derivative_media_type(derivative),
+        cache_control=DERIVATIVE_CACHE_CONTROL,
+    )
+
+
+@room_router.get("/gallery/{name}/{variant}")
+def get_gallery_image_derivative(
+    room_slug: str,
+    name: str,
+    variant: str,
+    request: Request,
+    db: Session = Depends(get_db),
+) -> Response:
+    room = _resolve_room_or_404(db, room_slug)
+    result_key = get_room_result_key(room.slug, name)
+    if result_key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="result not found")
+    return _derivative_response(result_key, variant, request)
 
 
 @router.get("/hash/{jpg_hash}", response_model=JobStatusOut)
@@ -170,8 +377,35 @@ def get_job_status_for_room(room_slug: str, job_id: int, db: Session = Depends(g
     return _to_job_status(job, room_slug=room.slug)
 
 
+def _qr_response(request: Request, qr_hash: str, qr_format: str) -> Response:
+    media_type = QR_MEDIA_TYPES.get(qr_format)
+    if media_type is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="unknown qr format")
+    target_url = _build_qr_target_url(request, qr_hash)
+    # The code only depends on its target, so repeat displays are answered without rendering anything.
+    etag = strong_etag("qr", qr_format, target_url)
+    if matches_if_none_match(request, etag):
+        return not_modified(etag, cache_control=QR_CACHE_CONTROL)
+    cache = get_qr_cache()
+    content = cache.get(qr_format, target_url)
+    if content is None:
+        builder = build_qr_png if qr_format == "png" else build_qr_svg
+        content = run_image_task(builder, target_url)
+        cache.put(qr_format, target_url, content)
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": QR_CACHE_CONTROL},
+    )
+
+
 @router.get("/{job_id}/qr")
-def download_qr(job_id: int, request: Request, db: Session = Depends(get_db)) -> Response:
+def download_qr(
+    job_id: int,
+    request: Request,
+    qr_format: str = Query(default="png", alias="format"),
+    db: Session = Depends(get_db),
+) -> Response:
     default_room = get_or_create_default_room(db)
     job = get_completed_job_or_404(db, job_id)
     if job is None or job.room_id != default_room.id:
@@ -179,13 +413,17 @@ def download_qr(job_id: int, request: Request, db: Session = Depends(get_db)) ->
     if not job.qr_hash:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="job qr hash is not ready")
 
-    target_url = _build_qr_target_url(request, job.qr_hash)
-    png_bytes = build_qr_png(target_url)
-    return Response(content=png_bytes, media_type="image/png")
+    return _qr_response(request, job.qr_hash, qr_format)
 
 
 @room_router.get("/{job_id}/qr")
-def download_qr_for_room(job_id: int, room_slug: str, request: Request, db: Session = Depends(get_db)) -> Response:
+def download_qr_for_room(
+    job_id: int,
+    room_slug: str,
+    request: Request,
+    qr_format: str = Query(default="png", alias="format"),
+    db: Session = Depends(get_db),
+) -> Response:
     room = _resolve_room_or_404(db, room_slug)
     job = get_completed_job_or_404(db, job_id)
     if job is None or job.room_id != room.id:
@@ -193,18 +431,82 @@ def download_qr_for_room(job_id: int, room_slug: str, request: Request, db: Sess
     if not job.qr_hash:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="job qr hash is not ready")
 
-    target_url = _build_qr_target_url(request, job.qr_hash)
-    png_bytes = build_qr_png(target_url)
-    return Response(content=png_bytes, media_type="image/png")
+    return _qr_response(request, job.qr_hash, qr_format)
 
 
 @public_router.get("/{qr_hash}")
-def download_result_by_qr_hash(qr_hash: str, db: Session = Depends(get_db)) -> FileResponse:
+def download_result_by_qr_hash(
+    qr_hash: str,
+    request: Request,
+    variant: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+) -> Response:
     job = get_completed_job_by_qr_hash(db, qr_hash)
     if job is None or not job.result_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="qr hash not found")
-    result_path = Path(job.result_path)
-    if not result_path.exists():
+    if not get_storage().exists(job.result_path):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="result not found")
-    suffix = result_path.suffix or ".jpg"
-    return FileResponse(result_path, filename=f"photoframe-{job.id}{suffix}")
+    if variant is not None:
+        return _derivative_response(job.result_path, variant, request)
+    suffix = PurePosixPath(job.result_path).suffix or ".jpg"
+    return _stored_file_response(job.result_path, request, download_name=f"photoframe-{job.id}{suffix}")
+
+
+def _load_room_job_status(room_slug: str, job_id: int) -> JobStatusOut:
+    with SessionLocal() as db:
+        room = _resolve_room_or_404(db, room_slug)
+        job = get_job_or_404(db, job_id)
+        if job is None or job.room_id != room.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job not found")
+        return _to_job_status(job, room_slug=room.slug)
+
+
+async def _job_status_stream(
+    request: Request,
+    subscription: Subscription,
+    *,
+    room_slug: str,
+    job_id: int,
+    snapshot: JobStatusOut,
+) -> AsyncIterator[str]:
+    try:
+        yield "retry: 3000\n\n"
+        yield _format_sse("status", snapshot.model_dump())
+        last_status = snapshot
+        while last_status.status not in _TERMINAL_JOB_STATUSES:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+            except TimeoutError:
+                if await request.is_disconnected():
+                    return
+                # Jobs finished by a separate worker process are not published on this process bus.
+                try:
+                    current_status = await run_in_threadpool(_load_room_job_status, room_slug, job_id)
+                except HTTPException:
+                    return
+                if current_status == last_status:
+                    yield ": keepalive\n\n"
+                    continue
+            else:
+                current_status = _to_job_status(event, room_slug=room_slug)
+            last_status = current_status
+            yield _format_sse("status", current_status.model_dump())
+    finally:
+        subscription.close()
+
+
+@room_router.get("/{job_id}/events")
+async def stream_job_status_for_room(room_slug: str, job_id: int, request: Request) -> StreamingResponse:
+    # Subscribe before reading the snapshot so a transition in between is not lost.
+    subscription = event_bus.subscribe(job_topic(job_id))
+    try:
+        snapshot = await run_in_threadpool(_load_room_job_status, room_slug, job_id)
+    except Exception:
+        subscription.close()
+        raise
+
+    return StreamingResponse(
+        _job_status_stream(request, subscription, room_slug=room_slug, job_id=job_id, snapshot=snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
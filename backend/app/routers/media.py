@@ -1,17 +1,21 @@
-from pathlib import Path
-from uuid import uuid4
+from typing import BinaryIO
 
-from fastapi import APIRouter, UploadFile, status
+from fastapi import APIRouter, HTTPException, UploadFile, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-BACKEND_ROOT = Path(__file__).resolve().parents[2]
-MEDIA_ROOT = BACKEND_ROOT / "storage"
-PREVIEW_DIR = MEDIA_ROOT / "previews"
-ICON_DIR = MEDIA_ROOT / "icons"
+from app.blob_store import BlobStore, parse_blob_url
+from app.db import SessionLocal
+from app.models import Prompt
+from app.storage import get_storage
+from app.uploads import UploadTooLarge, resolve_upload_max_bytes, upload_too_large_error
 
-PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
-ICON_DIR.mkdir(parents=True, exist_ok=True)
+MEDIA_KINDS = ("previews", "icons")
 
 router = APIRouter(prefix="/api/media", tags=["media"])
+# Mounted instead of static files when objects live in remote storage.
+presigned_router = APIRouter(prefix="/media", tags=["media"])
 
 
 def _extension_from_filename(filename: str | None, fallback: str) -> str:
@@ -20,37 +24,69 @@ def _extension_from_filename(filename: str | None, fallback: str) -> str:
     return "." + filename.rsplit(".", 1)[-1].lower()
 
 
-async def _save_upload(file: UploadFile, directory: Path, fallback_ext: str) -> str:
-    directory.mkdir(parents=True, exist_ok=True)
-    extension = _extension_from_filename(file.filename, fallback_ext)
-    filename = f"{uuid4().hex}{extension}"
-    path = directory / filename
-    path.write_bytes(await file.read())
-    return filename
+def _media_store(kind: str, room_id: int | None) -> BlobStore:
+    if room_id is None:
+        return BlobStore(kind, get_storage())
+    return BlobStore(f"{kind}/room-{room_id}", get_storage())
 
 
-def _room_media_subdir(base_dir: Path, room_id: int) -> Path:
-    return base_dir / f"room-{room_id}"
+def media_store_for_namespace(namespace: str) -> BlobStore | None:
+    kind, _, room_part = namespace.partition("/")
+    if kind not in MEDIA_KINDS:
+        return None
+    if room_part and (not room_part.startswith("room-") or not room_part[len("room-") :].isdigit()):
+        return None
+    return BlobStore(namespace, get_storage())
 
 
-async def save_prompt_preview(file: UploadFile, room_id: int | None = None) -> str:
-    if room_id is None:
-        filename = await _save_upload(file, PREVIEW_DIR, ".jpg")
-        return f"/media/previews/{filename}"
+def _store_upload(store: BlobStore, source: BinaryIO, extension: str, max_bytes: int) -> str:
+    # Uploads are not referenced until a prompt points at them; see retain_prompt_media.
+    with SessionLocal() as db:
+        key = store.put_file(db, source, extension, retain=False, max_bytes=max_bytes)
+        db.commit()
+    return store.url(key)
+
 
-    target_dir = _room_media_subdir(PREVIEW_DIR, room_id)
-    filename = await _save_upload(file, target_dir, ".jpg")
-    return f"/media/previews/room-{room_id}/{filename}"
+async def _save_upload(file: UploadFile, store: BlobStore, fallback_ext: str) -> str:
+    extension = _extension_from_filename(file.filename, fallback_ext)
+    max_bytes = resolve_upload_max_bytes()
+    if file.size is not None and file.size > max_bytes:
+        raise upload_too_large_error(max_bytes)
+    try:
+        return await run_in_threadpool(_store_upload, store, file.file, extension, max_bytes)
+    except UploadTooLarge as exc:
+        raise upload_too_large_error(max_bytes) from exc
+
+
+async def save_prompt_preview(file: UploadFile, room_id: int | None = None) -> str:
+    return await _save_upload(file, _media_store("previews", room_id), ".jpg")
 
 
 async def save_prompt_icon(file: UploadFile, room_id: int | None = None) -> str:
-    if room_id is None:
-        filename = await _save_upload(file, ICON_DIR, ".png")
-        return f"/media/icons/{filename}"
+    return await _save_upload(file, _media_store("icons", room_id), ".png")
+
+
+def _prompt_media_blobs(prompt: Prompt) -> list[tuple[BlobStore, str]]:
+    blobs: list[tuple[BlobStore, str]] = []
+    for url in (prompt.preview_image_url, prompt.icon_image_url):
+        parsed = parse_blob_url(url)
+        if parsed is None:
+            continue
+        namespace, key = parsed
+        store = media_store_for_namespace(namespace)
+        if store is not None:
+            blobs.append((store, key))
+    return blobs
+
 
-    target_dir = _room_media_subdir(ICON_DIR, room_id)
-    filename = await _save_upload(file, target_dir, ".png")
-    return f"/media/icons/room-{room_id}/{filename}"
+def retain_prompt_media(db: Session, prompt: Prompt) -> None:
+    for store, key in _prompt_media_blobs(prompt):
+        store.retain(db, key)
+
+
+def release_prompt_media(db: Session, prompt: Prompt) -> None:
+    for store, key in _prompt_media_blobs(prompt):
+        store.release(db, key)
 
 
 @router.post("/prompt-preview", status_code=status.HTTP_201_CREATED)
@@ -61,3 +97,13 @@ async def upload_prompt_preview(file: UploadFile) -> dict[str, str]:
 @router.post("/prompt-icon", status_code=status.HTTP_201_CREATED)
 async def upload_prompt_icon(file: UploadFile) -> dict[str, str]:
     return {"url": await save_prompt_icon(file)}
+
+
+@presigned_router.get("/{key:path}")
+def redirect_to_stored_media(key: str) -> RedirectResponse:
+    # No existence check: the object store answers 404 itself, which saves a round trip per image.
+    try:
+        url = get_storage().presign(key)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="media not found") from exc
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
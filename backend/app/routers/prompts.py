@@ -1,27 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
+from app.catalog_cache import PromptSnapshot, get_catalog_cache
 from app.db import get_db
-from app.job_service import get_or_create_default_room, get_room_by_slug
+from app.http_cache import matches_if_none_match, not_modified, set_validators, strong_etag
+from app.job_service import get_or_create_default_room, get_room_by_slug, get_room_prompts
 from app.models import Prompt
+from app.routers.media import release_prompt_media, retain_prompt_media
 from app.schemas import PromptCreate, PromptOut
 
 router = APIRouter(prefix="/api/prompts", tags=["prompts"])
 room_router = APIRouter(prefix="/api/rooms/{room_slug}/prompts", tags=["prompts"])
 
 
+def _prompt_list_response(
+    request: Request,
+    response: Response,
+    prompts: tuple[PromptSnapshot, ...],
+) -> tuple[PromptSnapshot, ...] | Response:
+    etag = strong_etag("prompts", prompts)
+    if matches_if_none_match(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return prompts
+
+
 @router.get("", response_model=list[PromptOut])
-def list_prompts(db: Session = Depends(get_db)) -> list[Prompt]:
+def list_prompts(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> tuple[PromptSnapshot, ...] | Response:
     default_room = get_or_create_default_room(db)
-    return db.query(Prompt).filter(Prompt.room_id == default_room.id).order_by(Prompt.id.asc()).all()
+    return _prompt_list_response(request, response, get_room_prompts(db, default_room.id))
 
 
 @room_router.get("", response_model=list[PromptOut])
-def list_room_prompts(room_slug: str, db: Session = Depends(get_db)) -> list[Prompt]:
+def list_room_prompts(
+    room_slug: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> tuple[PromptSnapshot, ...] | Response:
     room = get_room_by_slug(db, room_slug, active_only=True)
     if room is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="room not found")
-    return db.query(Prompt).filter(Prompt.room_id == room.id).order_by(Prompt.id.asc()).all()
+    return _prompt_list_response(request, response, get_room_prompts(db, room.id))
 
 
 @router.post("", response_model=PromptOut, status_code=status.HTTP_201_CREATED)
@@ -29,8 +53,10 @@ def create_prompt(payload: PromptCreate, db: Session = Depends(get_db)) -> Promp
     default_room = get_or_create_default_room(db)
     row = Prompt(**payload.model_dump(), room_id=default_room.id)
     db.add(row)
+    retain_prompt_media(db, row)
     db.commit()
     db.refresh(row)
+    get_catalog_cache().invalidate_prompts(default_room.id)
     return row
 
 
@@ -41,6 +67,8 @@ def delete_prompt(prompt_id: int, db: Session = Depends(get_db)) -> Response:
     if row is None or row.room_id != default_room.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prompt not found")
 
+    release_prompt_media(db, row)
     db.delete(row)
     db.commit()
+    get_catalog_cache().invalidate_prompts(default_room.id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
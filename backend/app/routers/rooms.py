@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 
+from app.catalog_cache import RoomSnapshot, get_catalog_cache
 from app.db import get_db
-from app.models import Room
+from app.http_cache import matches_if_none_match, not_modified, set_validators, strong_etag
 from app.schemas import PublicRoomOut
 
 router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
 
 @router.get("", response_model=list[PublicRoomOut])
-def list_public_rooms(db: Session = Depends(get_db)) -> list[Room]:
-    return db.query(Room).filter(Room.is_active.is_(True)).order_by(Room.id.asc()).all()
+def list_public_rooms(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> tuple[RoomSnapshot, ...] | Response:
+    rooms = get_catalog_cache().active_rooms(db)
+    etag = strong_etag("rooms", [(room.id, room.slug, room.name) for room in rooms])
+    if matches_if_none_match(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return rooms
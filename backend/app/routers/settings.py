@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from app.catalog_cache import get_catalog_cache
 from app.db import get_db
 from app.models import ModelSetting
 from app.schemas import ModelSettingIn, ModelSettingOut
@@ -28,6 +29,7 @@ def _get_or_create_setting(db: Session) -> ModelSetting:
         db.add(setting)
         db.commit()
         db.refresh(setting)
+        get_catalog_cache().invalidate_model_setting()
 
     return setting
 
@@ -47,4 +49,5 @@ def set_model(payload: ModelSettingIn, db: Session = Depends(get_db)) -> ModelSe
     db.add(setting)
     db.commit()
     db.refresh(setting)
+    get_catalog_cache().invalidate_model_setting()
     return setting
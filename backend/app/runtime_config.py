@@ -0,0 +1,210 @@
+import importlib.util
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from PIL import features
+
+from app.config import env_flag, env_float, env_int, load_local_env
+from app.request_hedging import HedgePolicy, resolve_hedge_policy
+from app.retry_policy import RetryPolicy, resolve_retry_policy
+
+DEFAULT_PROVIDER_SORT = "throughput"
+DEFAULT_PREFERRED_MAX_LATENCY_SECONDS = 25
+DEFAULT_RESULT_FORMAT = "jpeg"
+# "passthrough" stores provider bytes as-is; the others transcode unless the payload is already in that format.
+RESULT_FORMATS = {"passthrough", "jpeg", "webp", "avif"}
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_RESULT_QUALITY = 80
+DEFAULT_SOURCE_MAX_SIDE = 1280
+DEFAULT_SOURCE_JPEG_QUALITY = 85
+DEFAULT_MISSING_IMAGE_RETRIES = 3
+DEFAULT_RESULT_RETENTION_DAYS = 7
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 32
+DEFAULT_MODEL_SLO_P95_SECONDS = 90.0
+DEFAULT_MODEL_SLO_ERROR_RATE = 0.5
+DEFAULT_MODEL_HEALTH_WINDOW_SECONDS = 300.0
+DEFAULT_MODEL_HEALTH_MIN_SAMPLES = 5
+DEFAULT_CATALOG_CACHE_TTL_SECONDS = 30.0
+DEFAULT_QR_CACHE_MAX_ENTRIES = 512
+DEFAULT_RESULT_CACHE_TTL_SECONDS = 900.0
+DEFAULT_RESULT_CACHE_MAX_ENTRIES = 256
+DEFAULT_MAX_IN_FLIGHT_PER_MODEL = 4
+DEFAULT_MAX_IN_FLIGHT_PER_ROOM = 4
+DEFAULT_MODEL_REQUESTS_PER_MINUTE = 0
+DEFAULT_ROOM_MAX_PENDING = 20
+DEFAULT_MODEL_MAX_PENDING = 60
+logger = logging.getLogger(__name__)
+
+
+def _parse_positive_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    candidate = value.strip()
+    if not candidate:
+        return None
+    try:
+        parsed = int(candidate)
+    except ValueError:
+        return None
+    return parsed if parsed > 0 else None
+
+
+def _resolve_quality(name: str, default: int, *, maximum: int) -> int:
+    return min(env_int(name, default, minimum=1), maximum)
+
+
+def _resolve_result_format() -> str:
+    raw_format = os.getenv("OPENROUTER_RESULT_FORMAT", DEFAULT_RESULT_FORMAT).strip().lower()
+    if raw_format == "jpg":
+        return "jpeg"
+    if raw_format in {"png", "original", "none"}:
+        # "png" predates the policy and always meant "keep what the provider sent".
+        return "passthrough"
+    if raw_format not in RESULT_FORMATS:
+        return DEFAULT_RESULT_FORMAT
+    # Fall back along avif -> webp -> jpeg depending on what this Pillow build can encode.
+    if raw_format == "avif" and not features.check("avif"):
+        raw_format = "webp"
+    if raw_format == "webp" and not features.check("webp"):
+        raw_format = "jpeg"
+    return raw_format
+
+
+def _resolve_default_headers() -> tuple[tuple[str, str], ...]:
+    headers: list[tuple[str, str]] = []
+    http_referer = os.getenv("OPENROUTER_HTTP_REFERER")
+    if http_referer:
+        headers.append(("HTTP-Referer", http_referer))
+    x_title = os.getenv("OPENROUTER_X_TITLE")
+    if x_title:
+        headers.append(("X-Title", x_title))
+    return tuple(headers)
+
+
+def _resolve_http2() -> bool:
+    return env_flag("OPENROUTER_HTTP2", True) and importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    provider_sort: str
+    preferred_max_latency: int | None
+    result_format: str
+    jpeg_quality: int
+    jpeg_progressive: bool
+    jpeg_optimize: bool
+    result_quality: int
+    source_max_side: int
+    source_jpeg_quality: int
+    missing_image_retries: int
+    retry: RetryPolicy
+    hedge: HedgePolicy | None
+    result_retention_days: int
+    api_key: str | None = field(repr=False)
+    default_headers: tuple[tuple[str, str], ...]
+    max_connections: int
+    max_keepalive_connections: int
+    http2: bool
+    model_slo_p95_seconds: float
+    model_slo_error_rate: float
+    model_health_min_samples: int
+    model_health_window_seconds: float
+    catalog_cache_ttl_seconds: float
+    qr_cache_max_entries: int
+    result_cache_ttl_seconds: float
+    result_cache_max_entries: int
+    max_in_flight_per_model: int
+    max_in_flight_per_room: int
+    model_requests_per_minute: int
+    room_max_pending: int
+    model_max_pending: int
+    loaded_at: float
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        # The admin API shows whether a key is configured, never the key itself.
+        data["api_key"] = "***" if self.api_key else None
+        return data
+
+
+def load_runtime_config() -> RuntimeConfig:
+    max_connections = env_int("OPENROUTER_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, minimum=1)
+    return RuntimeConfig(
+        provider_sort=os.getenv("OPENROUTER_PROVIDER_SORT", DEFAULT_PROVIDER_SORT).strip(),
+        preferred_max_latency=_parse_positive_int(
+            os.getenv("OPENROUTER_PREFERRED_MAX_LATENCY", str(DEFAULT_PREFERRED_MAX_LATENCY_SECONDS))
+        ),
+        result_format=_resolve_result_format(),
+        jpeg_quality=_resolve_quality("OPENROUTER_JPEG_QUALITY", DEFAULT_JPEG_QUALITY, maximum=95),
+        jpeg_progressive=env_flag("OPENROUTER_JPEG_PROGRESSIVE", False),
+        jpeg_optimize=env_flag("OPENROUTER_JPEG_OPTIMIZE", True),
+        result_quality=_resolve_quality("OPENROUTER_RESULT_QUALITY", DEFAULT_RESULT_QUALITY, maximum=100),
+        source_max_side=env_int("OPENROUTER_SOURCE_MAX_SIDE", DEFAULT_SOURCE_MAX_SIDE, minimum=1),
+        source_jpeg_quality=_resolve_quality("OPENROUTER_SOURCE_JPEG_QUALITY", DEFAULT_SOURCE_JPEG_QUALITY, maximum=95),
+        missing_image_retries=env_int("OPENROUTER_MISSING_IMAGE_RETRIES", DEFAULT_MISSING_IMAGE_RETRIES),
+        retry=resolve_retry_policy(),
+        hedge=resolve_hedge_policy(),
+        result_retention_days=env_int("RESULT_RETENTION_DAYS", DEFAULT_RESULT_RETENTION_DAYS, minimum=1),
+        api_key=os.getenv("OPENROUTER_API_KEY") or None,
+        default_headers=_resolve_default_headers(),
+        max_connections=max_connections,
+        max_keepalive_connections=min(
+            env_int("OPENROUTER_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS, minimum=1),
+            max_connections,
+        ),
+        http2=_resolve_http2(),
+        model_slo_p95_seconds=env_float("MODEL_SLO_P95_SECONDS", DEFAULT_MODEL_SLO_P95_SECONDS, positive=True),
+        model_slo_error_rate=env_float("MODEL_SLO_ERROR_RATE", DEFAULT_MODEL_SLO_ERROR_RATE, positive=True),
+        model_health_min_samples=env_int("MODEL_HEALTH_MIN_SAMPLES", DEFAULT_MODEL_HEALTH_MIN_SAMPLES, minimum=1),
+        model_health_window_seconds=env_float(
+            "MODEL_HEALTH_WINDOW_SECONDS",
+            DEFAULT_MODEL_HEALTH_WINDOW_SECONDS,
+            positive=True,
+        ),
+        catalog_cache_ttl_seconds=env_float("CATALOG_CACHE_TTL_SECONDS", DEFAULT_CATALOG_CACHE_TTL_SECONDS),
+        qr_cache_max_entries=env_int("QR_CACHE_MAX_ENTRIES", DEFAULT_QR_CACHE_MAX_ENTRIES),
+        result_cache_ttl_seconds=env_float("RESULT_CACHE_TTL_SECONDS", DEFAULT_RESULT_CACHE_TTL_SECONDS),
+        result_cache_max_entries=env_int("RESULT_CACHE_MAX_ENTRIES", DEFAULT_RESULT_CACHE_MAX_ENTRIES),
+        max_in_flight_per_model=env_int("GENERATION_MAX_IN_FLIGHT_PER_MODEL", DEFAULT_MAX_IN_FLIGHT_PER_MODEL),
+        max_in_flight_per_room=env_int("GENERATION_MAX_IN_FLIGHT_PER_ROOM", DEFAULT_MAX_IN_FLIGHT_PER_ROOM),
+        model_requests_per_minute=env_int("GENERATION_MODEL_REQUESTS_PER_MINUTE", DEFAULT_MODEL_REQUESTS_PER_MINUTE),
+        room_max_pending=env_int("JOB_ROOM_MAX_PENDING", DEFAULT_ROOM_MAX_PENDING),
+        model_max_pending=env_int("JOB_MODEL_MAX_PENDING", DEFAULT_MODEL_MAX_PENDING),
+        loaded_at=time.time(),
+    )
+
+
+_config: RuntimeConfig | None = None
+_config_lock = threading.Lock()
+
+
+def get_runtime_config() -> RuntimeConfig:
+    # Parsed once and swapped whole on reload, so readers never see a half-updated configuration.
+    config = _config
+    if config is not None:
+        return config
+    with _config_lock:
+        if _config is None:
+            return _store(load_runtime_config())
+        return _config
+
+
+def _store(config: RuntimeConfig) -> RuntimeConfig:
+    global _config
+    _config = config
+    return config
+
+
+def reload_runtime_config(*, reread_env_file: bool = False) -> RuntimeConfig:
+    # Values already set in the process environment keep precedence over backend/.env, as at startup.
+    with _config_lock:
+        if reread_env_file:
+            load_local_env(override_file_values=True)
+        config = _store(load_runtime_config())
+    logger.info("Runtime configuration reloaded: %s", config.as_dict())
+    return config
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class RoomCreate(BaseModel):
@@ -6,6 +6,9 @@ class RoomCreate(BaseModel):
     name: str
     model_name: str
     is_active: bool = True
+    fallback_models: list[str] = Field(default_factory=list)
+    slo_p95_seconds: float | None = Field(default=None, gt=0)
+    slo_error_rate: float | None = Field(default=None, gt=0, le=1)
 
 
 class RoomOut(RoomCreate):
@@ -27,10 +30,15 @@ class RoomUpdate(BaseModel):
     name: str
     model_name: str
     is_active: bool
+    # Omitted fields keep their stored values, so older admin clients do not wipe a configured chain.
+    fallback_models: list[str] | None = None
+    slo_p95_seconds: float | None = Field(default=None, gt=0)
+    slo_error_rate: float | None = Field(default=None, gt=0, le=1)
 
 
 class RoomModelUpdate(BaseModel):
     model_name: str
+    fallback_models: list[str] | None = None
 
 
 class PromptCreate(BaseModel):
@@ -69,6 +77,7 @@ class JobStatusOut(BaseModel):
     result_url: str | None = None
     download_url: str | None = None
     qr_url: str | None = None
+    preview_url: str | None = None
     error_message: str | None = None
 
 
@@ -76,3 +85,5 @@ class GalleryImageOut(BaseModel):
     name: str
     url: str
     modified_at: float
+    thumbnail_url: str | None = None
+    medium_url: str | None = None
@@ -0,0 +1,271 @@
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+from urllib.parse import quote
+from uuid import uuid4
+
+from app.config import env_int
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_LOCAL_STORAGE_ROOT = BACKEND_ROOT / "storage"
+DEFAULT_PRESIGN_SECONDS = 3600
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+logger = logging.getLogger(__name__)
+
+
+def media_url(key: str) -> str:
+    # Public URL for a stored object; the local backend serves it statically, S3 redirects to a presigned URL.
+    return f"/media/{quote(key)}"
+
+
+def _validate_key(key: str) -> str:
+    path = PurePosixPath(key)
+    if not key or path.is_absolute() or any(part in {"", ".", ".."} for part in key.split("/")):
+        raise ValueError(f"invalid storage key: {key!r}")
+    return key
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def put(self, key: str, content: bytes, *, content_type: str | None = None) -> None: ...
+
+    @abstractmethod
+    def put_file(self, key: str, source: BinaryIO, *, content_type: str | None = None) -> None: ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes: ...
+
+    @abstractmethod
+    def stream(self, key: str, *, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[bytes]: ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def presign(self, key: str, *, expires_in: int | None = None, download_name: str | None = None) -> str: ...
+
+    def put_path(self, key: str, path: Path, *, content_type: str | None = None) -> None:
+        # Takes ownership of the file at path: it is moved or uploaded, then removed.
+        try:
+            with path.open("rb") as handle:
+                self.put_file(key, handle, content_type=content_type)
+        finally:
+            path.unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Path | None:
+        return None
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / _validate_key(key)
+
+    def put(self, key: str, content: bytes, *, content_type: str | None = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial object.
+        temporary = path.with_name(f".{path.name}.{uuid4().hex[:8]}.tmp")
+        temporary.write_bytes(content)
+        temporary.replace(path)
+
+    def put_file(self, key: str, source: BinaryIO, *, content_type: str | None = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{uuid4().hex[:8]}.tmp")
+        try:
+            with temporary.open("wb") as handle:
+                shutil.copyfileobj(source, handle, DEFAULT_STREAM_CHUNK_SIZE)
+            temporary.replace(path)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    def put_path(self, key: str, path: Path, *, content_type: str | None = None) -> None:
+        destination = self._path(key)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # Temporary files are created 0600; stored objects get the usual read permissions.
+        path.chmod(0o644)
+        try:
+            path.replace(destination)
+        except OSError:
+            # Different filesystem: fall back to a chunked copy.
+            super().put_path(key, path, content_type=content_type)
+
+    def get(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+    def stream(self, key: str, *, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        with self._path(key).open("rb") as handle:
+            while chunk := handle.read(chunk_size):
+                yield chunk
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def presign(self, key: str, *, expires_in: int | None = None, download_name: str | None = None) -> str:
+        return media_url(_validate_key(key))
+
+    def local_path(self, key: str) -> Path | None:
+        return self._path(key)
+
+
+class S3Storage(StorageBackend):
+    def __init__(
+        self,
+        *,
+        client,
+        bucket: str,
+        prefix: str = "",
+        presign_seconds: int = DEFAULT_PRESIGN_SECONDS,
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presign_seconds = presign_seconds
+
+    def _object_key(self, key: str) -> str:
+        _validate_key(key)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _translate_error(self, exc: Exception, key: str) -> OSError:
+        # Callers handle storage failures as OSError, the same as local disk errors.
+        code = str(getattr(exc, "response", {}).get("Error", {}).get("Code", ""))
+        if code in {"404", "NoSuchKey", "NotFound"}:
+            return FileNotFoundError(key)
+        return OSError(f"object storage request failed for {key}: {exc}")
+
+    def put(self, key: str, content: bytes, *, content_type: str | None = None) -> None:
+        object_key = self._object_key(key)
+        extra = {"ContentType": content_type} if content_type else {}
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=object_key, Body=content, **extra)
+        except Exception as exc:
+            raise self._translate_error(exc, key) from exc
+
+    def put_file(self, key: str, source: BinaryIO, *, content_type: str | None = None) -> None:
+        object_key = self._object_key(key)
+        extra = {"ContentType": content_type} if content_type else None
+        try:
+            # Multipart upload in bounded parts; the source is never read into memory at once.
+            self.client.upload_fileobj(source, self.bucket, object_key, ExtraArgs=extra)
+        except ValueError:
+            # Invalid input such as an over-limit upload reaches the caller unchanged.
+            raise
+        except Exception as exc:
+            raise self._translate_error(exc, key) from exc
+
+    def get(self, key: str) -> bytes:
+        object_key = self._object_key(key)
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=object_key)["Body"].read()
+        except Exception as exc:
+            raise self._translate_error(exc, key) from exc
+
+    def stream(self, key: str, *, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        object_key = self._object_key(key)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=object_key)
+        except Exception as exc:
+            raise self._translate_error(exc, key) from exc
+        yield from response["Body"].iter_chunks(chunk_size)
+
+    def exists(self, key: str) -> bool:
+        object_key = self._object_key(key)
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=object_key)
+        except Exception as exc:
+            error = self._translate_error(exc, key)
+            if isinstance(error, FileNotFoundError):
+                return False
+            raise error from exc
+        return True
+
+    def delete(self, key: str) -> None:
+        object_key = self._object_key(key)
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=object_key)
+        except Exception as exc:
+            raise self._translate_error(exc, key) from exc
+
+    def presign(self, key: str, *, expires_in: int | None = None, download_name: str | None = None) -> str:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if download_name:
+            params["ResponseContentDisposition"] = f'attachment; filename="{download_name}"'
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params=params,
+            ExpiresIn=expires_in or self.presign_seconds,
+        )
+
+
+def _resolve_presign_seconds() -> int:
+    return env_int("S3_PRESIGN_SECONDS", DEFAULT_PRESIGN_SECONDS, minimum=1)
+
+
+def resolve_accel_redirect_prefix() -> str | None:
+    # Internal nginx location that maps onto LOCAL_STORAGE_ROOT; empty keeps serving files from Python.
+    raw_value = os.getenv("ACCEL_REDIRECT_PREFIX", "").strip()
+    if not raw_value.startswith("/"):
+        return None
+    return raw_value.rstrip("/") + "/"
+
+
+def _build_s3_client():
+    try:
+        import boto3
+    except ImportError as exc:
+        raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (install the `s3` extra)") from exc
+
+    return boto3.client(
+        "s3",
+        endpoint_url=os.getenv("S3_ENDPOINT_URL", "").strip() or None,
+        region_name=os.getenv("S3_REGION", "").strip() or None,
+        aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID", "").strip() or None,
+        aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY", "").strip() or None,
+    )
+
+
+def build_storage() -> StorageBackend:
+    backend = os.getenv("STORAGE_BACKEND", "local").strip().lower()
+    if backend == "s3":
+        bucket = os.getenv("S3_BUCKET", "").strip()
+        if not bucket:
+            raise RuntimeError("S3_BUCKET is required when STORAGE_BACKEND=s3")
+        return S3Storage(
+            client=_build_s3_client(),
+            bucket=bucket,
+            prefix=os.getenv("S3_PREFIX", ""),
+            presign_seconds=_resolve_presign_seconds(),
+        )
+
+    if backend != "local":
+        logger.warning("Unknown STORAGE_BACKEND=%s; using local storage", backend)
+    raw_root = os.getenv("LOCAL_STORAGE_ROOT", "").strip()
+    root = Path(raw_root) if raw_root else DEFAULT_LOCAL_STORAGE_ROOT
+    if not root.is_absolute():
+        root = BACKEND_ROOT / root
+    return LocalStorage(root)
+
+
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+
+    if _storage is None:
+        _storage = build_storage()
+    return _storage
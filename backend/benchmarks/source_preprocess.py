@@ -0,0 +1,81 @@
+"""Compare source preprocessing with and without JPEG draft-mode decoding.
+
+Run from backend/: `uv run python -m benchmarks.source_preprocess [--iterations N]`.
+Each measurement runs in a fresh process so peak RSS reflects only that path.
+"""
+
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+from app.openrouter_client import encode_source_image
+
+MAX_SIDE = 1280
+QUALITY = 85
+SIZES = {"12MP": (4000, 3000), "48MP": (8000, 6000)}
+
+
+def _build_photo(size: tuple[int, int]) -> bytes:
+    # Noise defeats JPEG's best case, closer to a real photo than a flat colour.
+    image = Image.effect_noise(size, 64).convert("RGB")
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+def _full_decode(image_bytes: bytes) -> bytes:
+    # The pre-draft path: decode every pixel, then LANCZOS straight down to the target.
+    with Image.open(BytesIO(image_bytes)) as image:
+        normalized = ImageOps.exif_transpose(image)
+        scale = MAX_SIDE / float(max(normalized.size))
+        target = (round(normalized.size[0] * scale), round(normalized.size[1] * scale))
+        normalized = normalized.resize(target, Image.Resampling.LANCZOS)
+        output = BytesIO()
+        normalized.convert("RGB").save(output, format="JPEG", quality=QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def _draft_decode(image_bytes: bytes) -> bytes:
+    return encode_source_image(image_bytes, max_side=MAX_SIDE, quality=QUALITY).content
+
+
+PATHS = {"full decode": _full_decode, "draft decode": _draft_decode}
+
+
+def _measure(path: str, photo_file: str, iterations: int) -> tuple[float, float]:
+    # Read here rather than passed in: unpickling large arguments would set the RSS high-water mark itself.
+    image_bytes = Path(photo_file).read_bytes()
+    baseline_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.process_time()
+    for _ in range(iterations):
+        PATHS[path](image_bytes)
+    cpu_ms = (time.process_time() - started) * 1000 / iterations
+    peak_mib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kib) / 1024
+    return cpu_ms, peak_mib
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'input':<6} {'path':<13} {'cpu ms/image':>13} {'peak RSS +MiB':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, size in SIZES.items():
+            photo_file = Path(directory) / f"{label}.jpg"
+            photo_file.write_bytes(_build_photo(size))
+            for path in PATHS:
+                with context.Pool(1) as pool:
+                    cpu_ms, peak_mib = pool.apply(_measure, (path, str(photo_file), args.iterations))
+                print(f"{label:<6} {path:<13} {cpu_ms:>13.1f} {peak_mib:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# Set before any app module builds its engine or storage backend, so the suite never writes into
+# backend/photoframe.db or backend/storage. Process environment takes precedence over backend/.env.
+_SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="photoframe-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{(_SCRATCH_DIR / 'photoframe.db').as_posix()}"
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_ROOT"] = str(_SCRATCH_DIR / "storage")
+
+import pytest  # noqa: E402
+
+from app.catalog_cache import CatalogCache  # noqa: E402
+from app.generation_limiter import LatencyTracker  # noqa: E402
+from app.job_queue import stop_worker_pool  # noqa: E402
+from app.qr_service import QrCache  # noqa: E402
+from app.result_cache import ResultCache  # noqa: E402
+from app.retry_policy import CircuitBreakerRegistry  # noqa: E402
+from app.runtime_config import load_runtime_config  # noqa: E402
+from app.storage import LocalStorage  # noqa: E402
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    shutil.rmtree(_SCRATCH_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _stop_job_runner_after_test():
+    # Tests reset the database between runs; an in-flight job from a previous test must not
+    # finish against the next test's rows (ids restart from 1 after each reset).
+    yield
+    stop_worker_pool()
+
+
+@pytest.fixture(autouse=True)
+def _run_image_tasks_in_process(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Test doubles patched into image tasks cannot be pickled into pool workers; test_image_executor covers the pool.
+    monkeypatch.setenv("IMAGE_PROCESS_WORKERS", "0")
+
+
+@pytest.fixture(autouse=True)
+def _isolate_openrouter_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Retries back off without sleeping, and no test inherits a circuit or latencies another test recorded.
+    monkeypatch.setenv("OPENROUTER_RETRY_BASE_DELAY_SECONDS", "0")
+    # Tests that change other settings call reload_runtime_config(); the snapshot is restored afterwards.
+    monkeypatch.setattr("app.runtime_config._config", load_runtime_config())
+    monkeypatch.setattr("app.openrouter_client._circuit_breakers", CircuitBreakerRegistry())
+    monkeypatch.setattr("app.generation_limiter._latency_tracker", LatencyTracker())
+    monkeypatch.setattr("app.generation_limiter._attempt_latency_tracker", LatencyTracker())
+
+
+@pytest.fixture(autouse=True)
+def _isolate_result_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Tests reuse the same photo and prompt; a result cached by one test must not complete another's job.
+    monkeypatch.setattr("app.result_cache._cache", ResultCache())
+
+
+@pytest.fixture(autouse=True)
+def _isolate_catalog_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Tests recreate the schema, so rooms and prompts cached by an earlier test would be stale.
+    monkeypatch.setattr("app.catalog_cache._cache", CatalogCache())
+
+
+@pytest.fixture(autouse=True)
+def _isolate_qr_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Tests that patch the QR builder must see it called, not a code rendered by an earlier test.
+    monkeypatch.setattr("app.qr_service._cache", QrCache())
+
+
+@pytest.fixture
+def local_storage(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> LocalStorage:
+    storage = LocalStorage(tmp_path / "storage")
+    monkeypatch.setattr("app.storage._storage", storage)
+    return storage
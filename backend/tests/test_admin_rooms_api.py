@@ -1,4 +1,3 @@
-from pathlib import Path
 
 from fastapi.testclient import TestClient
 
@@ -72,6 +71,29 @@ def test_admin_rooms_crud_and_model_update_requires_jwt(monkeypatch) -> None:
     assert model_updated.status_code == 200
     assert model_updated.json()["model_name"] == "google/gemini-2.5-flash-image"
 
+    fallbacks_updated = client.put(
+        f"/api/admin/rooms/{room_id}/model",
+        headers=headers,
+        json={"model_name": "google/gemini-2.5-flash-image", "fallback_models": ["openai/gpt-5-image"]},
+    )
+    assert fallbacks_updated.status_code == 200
+    assert fallbacks_updated.json()["fallback_models"] == ["openai/gpt-5-image"]
+
+    renamed = client.put(
+        f"/api/admin/rooms/{room_id}",
+        headers=headers,
+        json={
+            "slug": "room-a",
+            "name": "Room A",
+            "model_name": "google/gemini-2.5-flash-image",
+            "is_active": True,
+            "slo_p95_seconds": 45,
+        },
+    )
+    assert renamed.status_code == 200
+    assert renamed.json()["fallback_models"] == ["openai/gpt-5-image"]
+    assert renamed.json()["slo_p95_seconds"] == 45
+
 
 def test_admin_room_prompt_endpoints_are_scoped(monkeypatch) -> None:
     _reset_db()
@@ -123,18 +145,13 @@ def test_admin_room_prompt_endpoints_are_scoped(monkeypatch) -> None:
     assert deleted.status_code == 204
 
 
-def test_admin_room_media_uploads_are_room_scoped(monkeypatch, tmp_path: Path) -> None:
+def test_admin_room_media_uploads_are_room_scoped(monkeypatch, local_storage) -> None:
     _reset_db()
     username, password = _configure_admin_credentials(monkeypatch)
     client = TestClient(app)
     token = _get_admin_token(client, username, password)
     headers = {"Authorization": f"Bearer {token}"}
 
-    preview_dir = tmp_path / "previews"
-    icon_dir = tmp_path / "icons"
-    monkeypatch.setattr("app.routers.media.PREVIEW_DIR", preview_dir)
-    monkeypatch.setattr("app.routers.media.ICON_DIR", icon_dir)
-
     room = client.post(
         "/api/admin/rooms",
         headers=headers,
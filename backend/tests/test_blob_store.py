@@ -0,0 +1,126 @@
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.blob_store import BlobStore, collect_unreferenced_blobs
+from app.db import Base, SessionLocal, engine
+from app.main import app
+from app.models import StoredBlob
+from app.storage import LocalStorage
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _ref_counts() -> dict[str, int]:
+    with SessionLocal() as db:
+        return {key: count for key, count in db.execute(select(StoredBlob.key, StoredBlob.ref_count))}
+
+
+def test_put_deduplicates_content_and_counts_references(local_storage: LocalStorage) -> None:
+    _reset_db()
+    store = BlobStore("results", local_storage)
+
+    with SessionLocal() as db:
+        first = store.put(db, b"same-bytes", ".JPG")
+        second = store.put(db, b"same-bytes", ".jpg")
+        other = store.put(db, b"other-bytes", ".jpg")
+        db.commit()
+
+    assert first == second != other
+    assert first.endswith(".jpg")
+    digest = first.rsplit("/", 1)[-1].removesuffix(".jpg")
+    assert first == f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    assert local_storage.get(store.storage_key(first)) == b"same-bytes"
+    assert len(list(local_storage.root.rglob("*.jpg"))) == 2
+    assert _ref_counts() == {first: 2, other: 1}
+
+
+def test_put_path_moves_new_blobs_and_drops_duplicates(local_storage: LocalStorage, tmp_path) -> None:
+    _reset_db()
+    store = BlobStore("results", local_storage)
+    first_file = tmp_path / "first.part"
+    first_file.write_bytes(b"spooled-bytes")
+    duplicate_file = tmp_path / "duplicate.part"
+    duplicate_file.write_bytes(b"spooled-bytes")
+
+    with SessionLocal() as db:
+        first = store.put_path(db, first_file, ".png")
+        second = store.put_path(db, duplicate_file, ".png")
+        db.commit()
+
+    assert first == second
+    assert local_storage.get(store.storage_key(first)) == b"spooled-bytes"
+    assert not first_file.exists()
+    assert not duplicate_file.exists()
+    assert _ref_counts() == {first: 2}
+
+
+def test_unreferenced_blobs_are_collected_after_grace_period(local_storage: LocalStorage) -> None:
+    _reset_db()
+    store = BlobStore("results", local_storage)
+
+    with SessionLocal() as db:
+        shared = store.put(db, b"shared", ".jpg")
+        store.retain(db, shared)
+        single = store.put(db, b"single", ".jpg")
+        db.commit()
+        store.release(db, shared)
+        store.release(db, single)
+        db.commit()
+
+        assert collect_unreferenced_blobs(
+            db, resolve_store=lambda namespace: store, released_before=time.time() - 60, batch_size=10
+        ) == []
+        removed = collect_unreferenced_blobs(
+            db, resolve_store=lambda namespace: store, released_before=time.time() + 1, batch_size=10
+        )
+
+    assert removed == [store.storage_key(single)]
+    assert not local_storage.exists(store.storage_key(single))
+    assert local_storage.exists(store.storage_key(shared))
+    assert _ref_counts() == {shared: 1}
+
+
+def test_prompt_media_uploads_share_one_blob_and_are_referenced_by_prompts(local_storage: LocalStorage) -> None:
+    _reset_db()
+    client = TestClient(app)
+
+    uploads = [
+        client.post("/api/media/prompt-preview", files={"file": ("a.jpg", b"preview-bytes", "image/jpeg")})
+        for _ in range(2)
+    ]
+    assert uploads[0].json()["url"] == uploads[1].json()["url"]
+    preview_url = uploads[0].json()["url"]
+    assert len(list((local_storage.root / "previews").rglob("*.jpg"))) == 1
+
+    created = client.post(
+        "/api/prompts",
+        json={
+            "name": "Anime",
+            "description": "Anime",
+            "prompt": "Anime",
+            "preview_image_url": preview_url,
+            "icon_image_url": "/media/icons/legacy.png",
+        },
+    )
+    assert created.status_code == 201
+    assert list(_ref_counts().values()) == [1]
+
+    assert client.delete(f"/api/prompts/{created.json()['id']}").status_code == 204
+    assert list(_ref_counts().values()) == [0]
+
+
+def test_content_addressed_media_is_served_as_immutable() -> None:
+    client = TestClient(app)
+    url = client.post(
+        "/api/media/prompt-icon", files={"file": ("icon.png", b"immutable-icon-bytes", "image/png")}
+    ).json()["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"immutable-icon-bytes"
+    assert "immutable" in response.headers["cache-control"]
@@ -0,0 +1,125 @@
+from fastapi.testclient import TestClient
+
+from app.catalog_cache import CatalogCache, get_catalog_cache
+from app.db import Base, SessionLocal, engine
+from app.job_service import get_room_prompt, get_room_prompts
+from app.main import app
+from app.models import Prompt, Room
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _seed_room(db, slug: str = "lobby") -> Room:
+    room = Room(slug=slug, name="Lobby", model_name="openai/gpt-5-image", is_active=True)
+    db.add(room)
+    db.commit()
+    db.refresh(room)
+    return room
+
+
+def test_room_snapshots_are_served_until_invalidated_or_expired() -> None:
+    _reset_db()
+    clock = _Clock()
+    cache = CatalogCache(ttl_seconds=30, clock=clock)
+    with SessionLocal() as db:
+        room = _seed_room(db)
+        assert cache.room_by_slug(db, "lobby").name == "Lobby"
+
+        room.name = "Renamed"
+        db.commit()
+        assert cache.room_by_slug(db, "lobby").name == "Lobby"
+
+        clock.now = 30
+        assert cache.room_by_slug(db, "lobby").name == "Renamed"
+
+        room.name = "Invalidated"
+        db.commit()
+        cache.invalidate_rooms()
+        assert cache.room_by_slug(db, "lobby").name == "Invalidated"
+        # Unknown slugs are not cached, so a room created later is found at once.
+        assert cache.room_by_slug(db, "later") is None
+        _seed_room(db, "later")
+        assert cache.room_by_slug(db, "later") is not None
+
+
+def test_load_that_races_an_invalidation_is_not_stored() -> None:
+    _reset_db()
+    cache = CatalogCache(ttl_seconds=30)
+    with SessionLocal() as db:
+        room = _seed_room(db)
+        db.add(
+            Prompt(name="Anime", description="", prompt="old", preview_image_url="", icon_image_url="", room_id=room.id)
+        )
+        db.commit()
+
+        original_query = db.query
+
+        def query_then_invalidate(*entities):
+            result = original_query(*entities)
+            cache.invalidate_prompts(room.id)
+            return result
+
+        db.query = query_then_invalidate
+        assert cache.room_prompts(db, room.id)[0].prompt == "old"
+        db.query = original_query
+
+        db.query(Prompt).update({Prompt.prompt: "new"})
+        db.commit()
+        assert cache.room_prompts(db, room.id)[0].prompt == "new"
+
+
+def test_public_prompt_list_reflects_prompt_writes() -> None:
+    _reset_db()
+    client = TestClient(app)
+    assert client.get("/api/prompts").json() == []
+
+    payload = {
+        "name": "Anime",
+        "description": "Soft anime shading",
+        "prompt": "Turn input photo into anime portrait",
+        "preview_image_url": "/media/previews/anime.jpg",
+        "icon_image_url": "/media/icons/anime.png",
+    }
+    created = client.post("/api/prompts", json=payload)
+    assert created.status_code == 201
+    assert [prompt["id"] for prompt in client.get("/api/prompts").json()] == [created.json()["id"]]
+
+    assert client.delete(f"/api/prompts/{created.json()['id']}").status_code == 204
+    assert client.get("/api/prompts").json() == []
+
+
+def test_prompt_missing_from_cached_list_is_read_from_the_database() -> None:
+    _reset_db()
+    with SessionLocal() as db:
+        room = _seed_room(db)
+        other_room = _seed_room(db, "other")
+        assert get_room_prompts(db, room.id) == ()
+
+        # Written by another process: this one's cached list is not invalidated.
+        prompt = Prompt(
+            name="Late",
+            description="Late",
+            prompt="Late prompt",
+            preview_image_url="/media/previews/late.jpg",
+            icon_image_url="/media/icons/late.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        assert get_catalog_cache().room_prompts(db, room.id) == ()
+
+        assert get_room_prompt(db, room.id, prompt.id).prompt == "Late prompt"
+        assert [cached.id for cached in get_room_prompts(db, room.id)] == [prompt.id]
+        assert get_room_prompt(db, other_room.id, prompt.id) is None
+        assert get_room_prompt(db, room.id, prompt.id + 1) is None
@@ -0,0 +1,131 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.db import Base, SessionLocal, engine
+from app.generation_limiter import GenerationGovernor, TokenBucket, get_governor, get_latency_tracker
+from app.main import app
+from app.models import GenerationJob, Prompt, Room
+from app.runtime_config import reload_runtime_config
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _seed_room_with_leased_jobs(job_count: int) -> int:
+    with SessionLocal() as db:
+        room = Room(slug="busy", name="Busy", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        prompt = Prompt(
+            name="Anime",
+            description="Anime",
+            prompt="Anime",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        # Leased far into the future so the job runner leaves them alone.
+        db.add_all(
+            [
+                GenerationJob(
+                    prompt_id=prompt.id,
+                    room_id=room.id,
+                    status="processing",
+                    lease_owner="other-worker",
+                    lease_expires_at=9_999_999_999.0,
+                )
+                for _ in range(job_count)
+            ]
+        )
+        db.commit()
+        return prompt.id
+
+
+def test_token_bucket_delays_requests_beyond_capacity() -> None:
+    now = {"value": 0.0}
+    bucket = TokenBucket(rate_per_second=0.5, capacity=2, clock=lambda: now["value"])
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 2.0
+
+    now["value"] = 10.0
+    assert bucket.reserve() == 0.0
+
+
+def test_governor_caps_in_flight_generations_per_model() -> None:
+    governor = GenerationGovernor(max_in_flight_per_model=2, max_in_flight_per_room=0, model_requests_per_minute=0)
+    state = {"active": 0, "peak": 0}
+
+    async def run_one(room_id: int) -> None:
+        async with governor.slot(model="openai/gpt-5-image", room_id=room_id):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+
+    async def run_all() -> None:
+        await asyncio.gather(*(run_one(room_id) for room_id in range(6)))
+
+    asyncio.run(run_all())
+    assert state["peak"] == 2
+
+
+def test_governor_follows_reloaded_limits(monkeypatch) -> None:
+    monkeypatch.setenv("GENERATION_MAX_IN_FLIGHT_PER_MODEL", "2")
+    reload_runtime_config()
+
+    async def run() -> tuple[GenerationGovernor, GenerationGovernor, GenerationGovernor]:
+        first = get_governor()
+        unchanged = get_governor()
+        monkeypatch.setenv("GENERATION_MAX_IN_FLIGHT_PER_MODEL", "6")
+        reload_runtime_config()
+        return first, unchanged, get_governor()
+
+    first, unchanged, reloaded = asyncio.run(run())
+    assert unchanged is first
+    assert first.max_in_flight_per_model == 2
+    assert reloaded.max_in_flight_per_model == 6
+
+
+def test_room_job_creation_returns_429_when_room_queue_is_full(monkeypatch) -> None:
+    _reset_db()
+    monkeypatch.setenv("JOB_ROOM_MAX_PENDING", "3")
+    reload_runtime_config()
+    prompt_id = _seed_room_with_leased_jobs(3)
+    # The estimate comes from recent successful generations in the shared latency window.
+    get_latency_tracker().record("openai/gpt-5-image", seconds=10, ok=True)
+    get_latency_tracker().record("openai/gpt-5-image", seconds=300, ok=False)
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/rooms/busy/jobs",
+        files={"photo": ("photo.jpg", b"photo-bytes", "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+
+
+def test_job_creation_returns_503_when_model_queue_is_full(monkeypatch) -> None:
+    _reset_db()
+    monkeypatch.setenv("JOB_ROOM_MAX_PENDING", "0")
+    monkeypatch.setenv("JOB_MODEL_MAX_PENDING", "2")
+    reload_runtime_config()
+    prompt_id = _seed_room_with_leased_jobs(2)
+    client = TestClient(app)
+
+    response = client.post(
+        "/api/rooms/busy/jobs",
+        files={"photo": ("photo.jpg", b"photo-bytes", "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
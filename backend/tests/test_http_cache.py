@@ -0,0 +1,118 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.catalog_cache import get_catalog_cache
+from app.db import Base, SessionLocal, engine
+from app.main import app
+from app.models import GenerationJob, Prompt, Room
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _seed_room() -> tuple[int, int]:
+    with SessionLocal() as db:
+        room = Room(slug="room-a", name="Room A", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        db.refresh(room)
+        prompt = Prompt(
+            name="Style A",
+            description="A",
+            prompt="Prompt A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        return room.id, prompt.id
+
+
+def _add_result(local_storage, room_id: int, prompt_id: int, name: str) -> None:
+    result_path = f"results/room-room-a/{name}.jpg"
+    local_storage.put(result_path, b"result")
+    with SessionLocal() as db:
+        db.add(
+            GenerationJob(
+                prompt_id=prompt_id,
+                room_id=room_id,
+                status="completed",
+                qr_hash=name.ljust(16, "0")[:16],
+                result_path=result_path,
+                completed_at=time.time(),
+            )
+        )
+        db.commit()
+
+
+def test_room_list_revalidates_with_etag() -> None:
+    _reset_db()
+    _seed_room()
+    client = TestClient(app)
+
+    first = client.get("/api/rooms")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "public, max-age=5, must-revalidate"
+
+    repeat = client.get("/api/rooms", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+    assert repeat.headers["etag"] == etag
+    assert client.get("/api/rooms", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    with SessionLocal() as db:
+        db.add(Room(slug="room-b", name="Room B", model_name="openai/gpt-5-image", is_active=True))
+        db.commit()
+    get_catalog_cache().invalidate_rooms()
+
+    changed = client.get("/api/rooms", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [room["slug"] for room in changed.json()] == ["room-a", "room-b"]
+
+
+def test_room_prompts_etag_changes_after_prompt_edit() -> None:
+    _reset_db()
+    room_id, prompt_id = _seed_room()
+    client = TestClient(app)
+
+    etag = client.get("/api/rooms/room-a/prompts").headers["etag"]
+    assert client.get("/api/rooms/room-a/prompts", headers={"If-None-Match": etag}).status_code == 304
+
+    with SessionLocal() as db:
+        db.get(Prompt, prompt_id).description = "Updated"
+        db.commit()
+    get_catalog_cache().invalidate_prompts(room_id)
+
+    changed = client.get("/api/rooms/room-a/prompts", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["description"] == "Updated"
+
+
+def test_room_gallery_etag_tracks_new_results(local_storage) -> None:
+    _reset_db()
+    room_id, prompt_id = _seed_room()
+    client = TestClient(app)
+    _add_result(local_storage, room_id, prompt_id, "aaaa")
+
+    first = client.get("/api/rooms/room-a/jobs/gallery")
+    etag = first.headers["etag"]
+    assert len(first.json()) == 1
+
+    repeat = client.get("/api/rooms/room-a/jobs/gallery", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+
+    # Another page of the same gallery is a different representation.
+    other_page = client.get("/api/rooms/room-a/jobs/gallery?limit=1", headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    _add_result(local_storage, room_id, prompt_id, "bbbb")
+    changed = client.get("/api/rooms/room-a/jobs/gallery", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 2
@@ -0,0 +1,95 @@
+import time
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.db import Base, SessionLocal, engine
+from app.image_derivatives import build_derivative, ensure_derivative
+from app.main import app
+from app.models import GenerationJob, Prompt, Room
+from app.storage import LocalStorage
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _png_bytes(size: tuple[int, int]) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", size, color=(200, 40, 40)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_build_derivative_downscales_to_webp() -> None:
+    content = build_derivative(_png_bytes((2000, 1000)), max_side=480, image_format="webp")
+
+    with Image.open(BytesIO(content)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (480, 240)
+
+
+def test_ensure_derivative_caches_in_storage(monkeypatch, local_storage: LocalStorage) -> None:
+    monkeypatch.setenv("IMAGE_DERIVATIVE_FORMAT", "webp")
+    local_storage.put("results/job-1.jpg", _png_bytes((1600, 1600)))
+
+    first = ensure_derivative("results/job-1.jpg", "thumb")
+    assert first == "results/job-1.thumb.webp"
+    modified_at = local_storage.local_path(first).stat().st_mtime_ns
+
+    assert ensure_derivative("results/job-1.jpg", "thumb") == first
+    assert local_storage.local_path(first).stat().st_mtime_ns == modified_at
+    assert ensure_derivative("results/job-1.jpg", "poster") is None
+
+
+def test_gallery_derivative_endpoint_builds_missing_variant(monkeypatch, local_storage: LocalStorage) -> None:
+    _reset_db()
+    monkeypatch.setenv("IMAGE_DERIVATIVE_FORMAT", "webp")
+    local_storage.put("results/room-room-a/job-1.jpg", _png_bytes((2400, 1600)))
+
+    with SessionLocal() as db:
+        room = Room(slug="room-a", name="Room A", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        prompt = Prompt(
+            name="A",
+            description="A",
+            prompt="A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        db.add(
+            GenerationJob(
+                prompt_id=prompt.id,
+                room_id=room.id,
+                status="completed",
+                qr_hash="dddddddddddddddd",
+                result_path="results/room-room-a/job-1.jpg",
+                completed_at=time.time(),
+            )
+        )
+        db.commit()
+
+    client = TestClient(app)
+    [item] = client.get("/api/rooms/room-a/jobs/gallery").json()
+    assert item["thumbnail_url"] == "/api/rooms/room-a/jobs/gallery/job-1.jpg/thumb"
+
+    response = client.get(item["thumbnail_url"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert "immutable" in response.headers["cache-control"]
+    with Image.open(BytesIO(response.content)) as image:
+        assert max(image.size) == 480
+    assert local_storage.exists("results/room-room-a/job-1.thumb.webp")
+
+    preview = client.get("/qr/dddddddddddddddd", params={"variant": "medium"})
+    assert preview.status_code == 200
+    with Image.open(BytesIO(preview.content)) as image:
+        assert max(image.size) == 1280
+
+    assert client.get("/api/rooms/room-a/jobs/gallery/job-1.jpg/poster").status_code == 404
+    assert client.get("/api/rooms/room-a/jobs/gallery/missing.jpg/thumb").status_code == 404
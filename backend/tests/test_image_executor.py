@@ -0,0 +1,36 @@
+import asyncio
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from app.image_executor import run_image_task, run_image_task_async, shutdown_image_executor
+from app.openrouter_client import encode_source_image
+
+
+def _jpeg_bytes(size: tuple[int, int]) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", size, color=(30, 90, 150)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_image_tasks_run_in_worker_processes(monkeypatch) -> None:
+    monkeypatch.setenv("IMAGE_PROCESS_WORKERS", "1")
+    try:
+        assert run_image_task(os.getpid) != os.getpid()
+
+        source = _jpeg_bytes((2400, 1200))
+        prepared = asyncio.run(run_image_task_async(encode_source_image, source, max_side=600, quality=80))
+        assert prepared is not None
+        assert prepared.original_size == (2400, 1200)
+        assert prepared.size == (600, 300)
+    finally:
+        shutdown_image_executor()
+
+
+def test_image_tasks_run_inline_when_pool_is_disabled(monkeypatch) -> None:
+    monkeypatch.setenv("IMAGE_PROCESS_WORKERS", "0")
+
+    assert run_image_task(os.getpid) == os.getpid()
+    source = _jpeg_bytes((300, 200))
+    assert asyncio.run(run_image_task_async(encode_source_image, source, max_side=600, quality=80)) is None
@@ -0,0 +1,34 @@
+from io import BytesIO
+
+from PIL import Image
+
+from app import image_ops
+
+
+def _jpeg(size: tuple[int, int]) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, color=(90, 140, 60)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def test_draft_to_fit_decodes_large_jpeg_at_reduced_scale() -> None:
+    with Image.open(BytesIO(_jpeg((4000, 3000)))) as image:
+        image_ops.draft_to_fit(image, 1280)
+        # libjpeg picks the smallest DCT scale that still covers the target (1/2 here).
+        assert image.size == (2000, 1500)
+        resized = image_ops.resize_to_fit(image, 1280)
+
+    assert resized.size == (1280, 960)
+
+
+def test_draft_to_fit_leaves_small_and_non_jpeg_images_alone() -> None:
+    with Image.open(BytesIO(_jpeg((800, 600)))) as image:
+        image_ops.draft_to_fit(image, 1280)
+        assert image.size == (800, 600)
+
+    png = BytesIO()
+    Image.new("RGB", (4000, 3000)).save(png, format="PNG")
+    with Image.open(png) as image:
+        image_ops.draft_to_fit(image, 1280)
+        assert image.size == (4000, 3000)
+        assert image_ops.resize_to_fit(image, 1280).size == (1280, 960)
@@ -12,6 +12,13 @@ def _reset_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+def _fake_generate_image_returning(content: bytes):
+    async def fake_generate_image(**kwargs) -> bytes:
+        return content
+
+    return fake_generate_image
+
+
 def _create_completed_job(client: TestClient, monkeypatch) -> int:
     created_prompt = client.post(
         "/api/prompts",
@@ -27,8 +34,8 @@ def _create_completed_job(client: TestClient, monkeypatch) -> int:
     prompt_id = created_prompt.json()["id"]
 
     monkeypatch.setattr(
-        "app.openrouter_client.generate_image",
-        lambda **kwargs: b"generated-png-bytes",
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(b"generated-png-bytes"),
     )
 
     created_job = client.post(
@@ -108,3 +115,42 @@ def test_public_qr_hash_endpoint_returns_file(monkeypatch) -> None:
     assert response.content == b"generated-png-bytes"
     assert 'filename="photoframe-' in response.headers.get("content-disposition", "")
     assert response.headers.get("content-disposition", "").endswith('.jpg"')
+
+
+def test_qr_is_rendered_once_and_served_immutable(monkeypatch) -> None:
+    _reset_db()
+    client = TestClient(app)
+    job_id = _create_completed_job(client, monkeypatch)
+
+    calls: list[str] = []
+
+    def fake_build_qr_png(url: str) -> bytes:
+        calls.append(url)
+        return b"fake-png"
+
+    monkeypatch.setattr("app.routers.jobs.build_qr_png", fake_build_qr_png)
+
+    first = client.get(f"/api/jobs/{job_id}/qr")
+    second = client.get(f"/api/jobs/{job_id}/qr")
+    assert first.content == second.content == b"fake-png"
+    assert len(calls) == 1
+    assert first.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert first.headers["etag"] == second.headers["etag"]
+
+    revalidated = client.get(f"/api/jobs/{job_id}/qr", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+def test_qr_svg_variant(monkeypatch) -> None:
+    _reset_db()
+    client = TestClient(app)
+    job_id = _create_completed_job(client, monkeypatch)
+
+    svg = client.get(f"/api/jobs/{job_id}/qr?format=svg")
+    assert svg.status_code == 200
+    assert svg.headers["content-type"] == "image/svg+xml"
+    assert b"<svg" in svg.content
+    assert svg.headers["etag"] != client.get(f"/api/jobs/{job_id}/qr").headers["etag"]
+
+    assert client.get(f"/api/jobs/{job_id}/qr?format=gif").status_code == 404
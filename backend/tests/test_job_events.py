@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.db import Base, SessionLocal, engine
+from app.main import app
+from app.models import GenerationJob, Prompt, Room
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def _seed_room_and_prompt() -> dict[str, int]:
+    with SessionLocal() as db:
+        room_a = Room(slug="room-a", name="Room A", model_name="openai/gpt-5-image", is_active=True)
+        room_b = Room(slug="room-b", name="Room B", model_name="openai/gpt-5-image", is_active=True)
+        db.add_all([room_a, room_b])
+        db.commit()
+        prompt = Prompt(
+            name="Style A",
+            description="A",
+            prompt="Prompt A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room_a.id,
+        )
+        db.add(prompt)
+        db.commit()
+        return {"room_a_id": room_a.id, "prompt_id": prompt.id}
+
+
+def _read_status_events(response) -> list[dict]:
+    events: list[dict] = []
+    for line in response.iter_lines():
+        if line.startswith("data: "):
+            events.append(json.loads(line[len("data: ") :]))
+    return events
+
+
+def test_job_events_stream_sends_snapshot_and_closes_for_finished_job() -> None:
+    _reset_db()
+    ids = _seed_room_and_prompt()
+    with SessionLocal() as db:
+        job = GenerationJob(
+            prompt_id=ids["prompt_id"],
+            room_id=ids["room_a_id"],
+            status="completed",
+            qr_hash="eeeeeeeeeeeeeeee",
+            result_path="/tmp/job-e.jpg",
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+
+    client = TestClient(app)
+    with client.stream("GET", f"/api/rooms/room-a/jobs/{job_id}/events") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _read_status_events(response)
+
+    assert [event["status"] for event in events] == ["completed"]
+    assert events[0]["download_url"] == "/qr/eeeeeeeeeeeeeeee"
+
+
+def test_job_events_stream_pushes_completion_from_job_runner(monkeypatch) -> None:
+    _reset_db()
+    ids = _seed_room_and_prompt()
+
+    async def slow_generate_image(**kwargs) -> bytes:
+        await asyncio.sleep(0.3)
+        return b"generated-image-bytes"
+
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", slow_generate_image)
+
+    client = TestClient(app)
+    created = client.post(
+        "/api/rooms/room-a/jobs",
+        files={"photo": ("photo.jpg", b"source-image", "image/jpeg")},
+        data={"prompt_id": str(ids["prompt_id"])},
+    )
+    assert created.status_code == 202
+    job_id = created.json()["id"]
+
+    with client.stream("GET", f"/api/rooms/room-a/jobs/{job_id}/events") as response:
+        events = _read_status_events(response)
+
+    assert events[-1]["status"] == "completed"
+    assert events[-1]["qr_url"] == f"/api/rooms/room-a/jobs/{job_id}/qr"
+
+
+def test_job_events_stream_enforces_room_ownership() -> None:
+    _reset_db()
+    ids = _seed_room_and_prompt()
+    with SessionLocal() as db:
+        job = GenerationJob(prompt_id=ids["prompt_id"], room_id=ids["room_a_id"], status="processing")
+        db.add(job)
+        db.commit()
+        job_id = job.id
+
+    client = TestClient(app)
+    response = client.get(f"/api/rooms/room-b/jobs/{job_id}/events")
+    assert response.status_code == 404
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_gallery_event_stream_sends_snapshot_then_deltas() -> None:
+    from app.event_bus import event_bus, gallery_topic
+    from app.job_service import GalleryEvent
+    from app.routers.jobs import _gallery_event_stream
+
+    async def scenario() -> list[str]:
+        subscription = event_bus.subscribe(gallery_topic("room-a"))
+        stream = _gallery_event_stream(
+            _ConnectedRequest(),
+            subscription,
+            room_slug="room-a",
+            snapshot=[{"name": "old.jpg", "url": "/media/results/room-a/old.jpg", "modified_at": 1.0}],
+        )
+        chunks = [await anext(stream), await anext(stream)]
+        item = {"name": "new.jpg", "url": "/media/results/room-a/new.jpg", "modified_at": 2.0}
+        event_bus.publish(gallery_topic("room-a"), GalleryEvent(kind="added", item=item))
+        event_bus.publish(gallery_topic("room-b"), GalleryEvent(kind="added", item=item))
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    chunks = asyncio.run(scenario())
+
+    assert chunks[0].startswith("retry:")
+    assert chunks[1].startswith("event: snapshot\n")
+    assert json.loads(chunks[1].split("data: ", 1)[1])["items"][0]["name"] == "old.jpg"
+    assert chunks[2].startswith("event: added\n")
+    assert json.loads(chunks[2].split("data: ", 1)[1])["name"] == "new.jpg"
+
+
+def test_gallery_events_stream_rejects_unknown_room() -> None:
+    _reset_db()
+    _seed_room_and_prompt()
+
+    client = TestClient(app)
+    response = client.get("/api/rooms/missing/jobs/gallery/events")
+    assert response.status_code == 404
@@ -1,14 +1,21 @@
 import os
 import time
-from pathlib import Path
+from io import BytesIO
 
 import pytest
 from fastapi.testclient import TestClient
+from PIL import ExifTags, Image
+from sqlalchemy import select
 
+from app import openrouter_client
 from app.db import Base, SessionLocal, engine
-from app.job_service import DEFAULT_MODEL_NAME, LEGACY_MODEL_NAME, LEGACY_OPENAI_MODEL_NAME
+from app.job_service import DEFAULT_MODEL_NAME, LEGACY_MODEL_NAME, LEGACY_OPENAI_MODEL_NAME, sweep_expired_results
 from app.main import app
-from app.models import GenerationJob
+from app.model_health import model_health
+from app.models import GenerationJob, Room, StoredBlob
+from app.retry_policy import CircuitOpenError
+from app.runtime_config import reload_runtime_config
+from app.storage import LocalStorage
 
 
 def _reset_db() -> None:
@@ -16,6 +23,13 @@ def _reset_db() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+def _fake_generate_image_returning(content: bytes):
+    async def fake_generate_image(**kwargs) -> bytes:
+        return content
+
+    return fake_generate_image
+
+
 def _create_prompt(client: TestClient) -> int:
     payload = {
         "name": "Anime",
@@ -29,26 +43,16 @@ def _create_prompt(client: TestClient) -> int:
     return created.json()["id"]
 
 
-def _patch_storage_dirs(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> tuple[Path, Path]:
-    source_dir = tmp_path / "source"
-    result_dir = tmp_path / "results"
-    source_dir.mkdir(parents=True, exist_ok=True)
-    result_dir.mkdir(parents=True, exist_ok=True)
-    monkeypatch.setattr("app.job_service.SOURCE_DIR", source_dir)
-    monkeypatch.setattr("app.job_service.RESULT_DIR", result_dir)
-    return source_dir, result_dir
-
-
 def test_create_job_and_get_completed_result(monkeypatch) -> None:
     _reset_db()
 
-    def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
+    async def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
         assert model
         assert prompt
         assert image_bytes == b"source-image"
         return b"generated-image-bytes"
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", fake_generate_image)
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -85,7 +89,10 @@ def test_create_job_and_get_completed_result(monkeypatch) -> None:
 def test_create_job_returns_processing_status_immediately(monkeypatch) -> None:
     _reset_db()
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", lambda **kwargs: b"generated-image-bytes")
+    monkeypatch.setattr(
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(b"generated-image-bytes"),
+    )
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -103,11 +110,11 @@ def test_create_job_uses_saved_model_setting(monkeypatch) -> None:
     _reset_db()
     captured: dict[str, str] = {}
 
-    def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
+    async def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
         captured["model"] = model
         return b"generated-image-bytes"
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", fake_generate_image)
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -135,11 +142,11 @@ def test_create_job_falls_back_from_legacy_model(monkeypatch, legacy_model: str)
     _reset_db()
     captured: dict[str, str] = {}
 
-    def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
+    async def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
         captured["model"] = model
         return b"generated-image-bytes"
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", fake_generate_image)
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -162,11 +169,55 @@ def test_create_job_falls_back_from_legacy_model(monkeypatch, legacy_model: str)
     assert captured["model"] == DEFAULT_MODEL_NAME
 
 
-def test_create_job_removes_source_photo_after_processing(monkeypatch, tmp_path: Path) -> None:
+def test_job_falls_back_to_the_next_room_model_when_the_primary_is_unavailable(monkeypatch) -> None:
     _reset_db()
-    source_dir, _ = _patch_storage_dirs(monkeypatch, tmp_path)
+    calls: list[str] = []
+
+    async def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
+        calls.append(model)
+        if model == "primary/model":
+            raise CircuitOpenError(model, 30)
+        return b"generated-image-bytes"
+
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", lambda **kwargs: b"generated-image-bytes")
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
+    with SessionLocal() as db:
+        room = db.query(Room).filter(Room.slug == "main").one()
+        room.model_name = "primary/model"
+        room.fallback_models = ["backup/model"]
+        db.commit()
+
+    created = client.post(
+        "/api/jobs",
+        files={"photo": ("photo.jpg", b"source-image", "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+    assert created.status_code == 202
+    job_id = created.json()["id"]
+
+    for _ in range(30):
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
+            break
+        time.sleep(0.02)
+
+    assert calls == ["primary/model", "backup/model"]
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job is not None
+        assert job.status == "completed"
+        assert job.model_name == "backup/model"
+    assert model_health("primary/model").error_rate == 1.0
+
+
+def test_create_job_removes_source_photo_after_processing(monkeypatch, local_storage: LocalStorage) -> None:
+    _reset_db()
+
+    monkeypatch.setattr(
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(b"generated-image-bytes"),
+    )
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -191,26 +242,75 @@ def test_create_job_removes_source_photo_after_processing(monkeypatch, tmp_path:
         assert job is not None
         assert job.source_path is None
 
-    assert list(source_dir.iterdir()) == []
+    assert list((local_storage.root / "source").iterdir()) == []
 
 
-def test_create_job_removes_results_older_than_retention_days(monkeypatch, tmp_path: Path) -> None:
+def test_source_photo_is_normalized_at_upload(monkeypatch, local_storage: LocalStorage) -> None:
     _reset_db()
-    _, result_dir = _patch_storage_dirs(monkeypatch, tmp_path)
+    monkeypatch.setenv("OPENROUTER_SOURCE_MAX_SIDE", "1280")
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(b"generated-image-bytes"),
+    )
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = 6
+    photo = BytesIO()
+    Image.new("RGB", (3000, 2000), color=(90, 60, 30)).save(photo, format="JPEG", exif=exif)
 
-    monkeypatch.setenv("RESULT_RETENTION_DAYS", "7")
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
+    # Keep the job queued so the stored source can be inspected before the runner deletes it.
+    monkeypatch.setattr("app.routers.jobs.notify_job_queued", lambda: None)
 
-    stale = result_dir / "old-stale.jpg"
-    stale.write_bytes(b"stale")
-    stale_timestamp = time.time() - (8 * 24 * 60 * 60)
-    os.utime(stale, (stale_timestamp, stale_timestamp))
+    def fail_in_memory_encode(*args, **kwargs):
+        raise AssertionError("uploads are decoded from a spooled file, not from bytes")
 
-    fresh = result_dir / "old-fresh.jpg"
-    fresh.write_bytes(b"fresh")
-    fresh_timestamp = time.time() - (2 * 24 * 60 * 60)
-    os.utime(fresh, (fresh_timestamp, fresh_timestamp))
+    monkeypatch.setattr("app.openrouter_client.encode_source_image", fail_in_memory_encode)
+    created = client.post(
+        "/api/jobs",
+        files={"photo": ("photo.jpg", photo.getvalue(), "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+    assert created.status_code == 202
+
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, created.json()["id"])
+        assert job.source_path.startswith("source/")
+        prepared = local_storage.get(job.source_path)
+    with Image.open(BytesIO(prepared)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (853, 1280)
+        assert image.getexif().get(ExifTags.Base.Orientation, 1) == 1
+    assert openrouter_client.is_ready_source(prepared, max_side=1280)
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", lambda **kwargs: b"generated-image-bytes")
+
+def test_oversized_photo_is_rejected_without_creating_a_job(monkeypatch, local_storage: LocalStorage) -> None:
+    _reset_db()
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "1024")
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
+
+    created = client.post(
+        "/api/jobs",
+        files={"photo": ("photo.jpg", b"x" * 4096, "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+    assert created.status_code == 413
+
+    with SessionLocal() as db:
+        assert db.query(GenerationJob).count() == 0
+    assert not (local_storage.root / "source").exists()
+
+
+def test_completed_job_records_result_expiry(monkeypatch, local_storage: LocalStorage) -> None:
+    _reset_db()
+    monkeypatch.setenv("RESULT_RETENTION_DAYS", "7")
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(b"generated-image-bytes"),
+    )
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -233,30 +333,90 @@ def test_create_job_removes_results_older_than_retention_days(monkeypatch, tmp_p
     with SessionLocal() as db:
         job = db.get(GenerationJob, job_id)
         assert job is not None
-        assert job.result_path is not None
-        newest_result_path = Path(job.result_path)
+        assert job.completed_at is not None
+        assert job.expires_at == pytest.approx(job.completed_at + 7 * 24 * 60 * 60)
+        assert job.result_size == len(b"generated-image-bytes")
+
 
-    result_files = list(result_dir.iterdir())
-    result_names = {path.name for path in result_files}
-    assert "old-stale.jpg" not in result_names
-    assert "old-fresh.jpg" in result_names
-    assert newest_result_path.exists()
+def test_completed_job_result_suffix_follows_generated_bytes(monkeypatch, local_storage: LocalStorage) -> None:
+    _reset_db()
+    generated = BytesIO()
+    Image.new("RGBA", (8, 8), color=(10, 20, 30, 128)).save(generated, format="PNG")
+    monkeypatch.setattr(
+        "app.openrouter_client.generate_image_async",
+        _fake_generate_image_returning(generated.getvalue()),
+    )
 
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
 
-def test_create_job_keeps_all_recent_results_within_retention_days(monkeypatch, tmp_path: Path) -> None:
+    created = client.post(
+        "/api/jobs",
+        files={"photo": ("photo.jpg", b"source-image", "image/jpeg")},
+        data={"prompt_id": str(prompt_id)},
+    )
+    assert created.status_code == 202
+    job_id = created.json()["id"]
+
+    for _ in range(30):
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
+            break
+        time.sleep(0.02)
+
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job is not None
+        assert job.result_path is not None
+        assert job.result_path.endswith(".png")
+        assert job.result_media_type == "image/png"
+
+
+def test_resubmitted_photo_reuses_the_cached_result(monkeypatch, local_storage: LocalStorage) -> None:
     _reset_db()
-    _, result_dir = _patch_storage_dirs(monkeypatch, tmp_path)
+    calls: list[str] = []
 
-    monkeypatch.setenv("RESULT_RETENTION_DAYS", "7")
+    async def fake_generate_image(*, model: str, prompt: str, image_bytes: bytes) -> bytes:
+        calls.append(model)
+        return b"generated-image-bytes"
 
-    now = time.time()
-    for idx in range(12):
-        existing = result_dir / f"recent-{idx:02d}.jpg"
-        existing.write_bytes(f"recent-{idx}".encode("utf-8"))
-        timestamp = now - (12 - idx) * 60
-        os.utime(existing, (timestamp, timestamp))
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
+
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
+
+    job_ids: list[int] = []
+    for _ in range(2):
+        created = client.post(
+            "/api/jobs",
+            files={"photo": ("photo.jpg", b"source-image", "image/jpeg")},
+            data={"prompt_id": str(prompt_id)},
+        )
+        assert created.status_code == 202
+        job_ids.append(created.json()["id"])
+        for _ in range(30):
+            if client.get(f"/api/jobs/{job_ids[-1]}").json()["status"] == "completed":
+                break
+            time.sleep(0.02)
+
+    assert len(calls) == 1
+    with SessionLocal() as db:
+        first, second = (db.get(GenerationJob, job_id) for job_id in job_ids)
+        assert first.status == second.status == "completed"
+        assert second.result_path == first.result_path
+        assert second.qr_hash and second.qr_hash != first.qr_hash
+        assert db.execute(select(StoredBlob.ref_count)).scalar_one() == 2
+
+
+def test_spooled_result_is_moved_into_storage(monkeypatch, local_storage: LocalStorage, tmp_path) -> None:
+    _reset_db()
+    spooled = tmp_path / "generated.part"
+    Image.new("RGB", (8, 8), color=(10, 20, 30)).save(spooled, format="WEBP")
 
-    monkeypatch.setattr("app.openrouter_client.generate_image", lambda **kwargs: b"generated-image-bytes")
+    async def fake_generate_image(**kwargs) -> openrouter_client.GeneratedImage:
+        return openrouter_client.GeneratedImage(path=spooled, size=spooled.stat().st_size, image_format="webp")
+
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
+    expected = spooled.read_bytes()
 
     client = TestClient(app)
     prompt_id = _create_prompt(client)
@@ -270,9 +430,7 @@ def test_create_job_keeps_all_recent_results_within_retention_days(monkeypatch,
     job_id = created.json()["id"]
 
     for _ in range(30):
-        status = client.get(f"/api/jobs/{job_id}")
-        assert status.status_code == 200
-        if status.json()["status"] == "completed":
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
             break
         time.sleep(0.02)
 
@@ -280,55 +438,147 @@ def test_create_job_keeps_all_recent_results_within_retention_days(monkeypatch,
         job = db.get(GenerationJob, job_id)
         assert job is not None
         assert job.result_path is not None
-        newest_result_path = Path(job.result_path)
+        assert job.result_path.endswith(".webp")
+        assert job.result_size == len(expected)
+    assert local_storage.get(job.result_path) == expected
+    assert not spooled.exists()
 
-    result_files = list(result_dir.iterdir())
-    assert len(result_files) == 13
-    result_names = {path.name for path in result_files}
-    assert newest_result_path.exists()
-    for idx in range(12):
-        assert f"recent-{idx:02d}.jpg" in result_names
 
-
-def test_gallery_endpoint_lists_result_files_newest_first(monkeypatch, tmp_path: Path) -> None:
+def test_retention_sweep_removes_expired_results_in_batches(monkeypatch, local_storage: LocalStorage) -> None:
     _reset_db()
-    _, result_dir = _patch_storage_dirs(monkeypatch, tmp_path)
+    monkeypatch.setenv("RESULT_RETENTION_DAYS", "7")
+    reload_runtime_config()
     client = TestClient(app)
+    prompt_id = _create_prompt(client)
+
+    now = time.time()
+    day = 24 * 60 * 60
+    files = {
+        name: f"results/room-main/{name}.jpg"
+        for name in ("stale", "legacy", "fresh", "untimed-file", "untimed-created", "untimed-recent")
+    }
+    for key in files.values():
+        local_storage.put(key, b"result")
+    os.utime(local_storage.local_path(files["untimed-file"]), (now - 9 * day, now - 9 * day))
+    # Without a local file the job's created_at is the only age left.
+    local_storage.delete(files["untimed-created"])
+
+    with SessionLocal() as db:
+        room = db.query(Room).filter(Room.slug == "main").one()
+        jobs = {
+            "stale": GenerationJob(completed_at=now - 8 * day, expires_at=now - day, qr_hash="5555555555555555"),
+            # Completed before expiry tracking: expiry is derived from completed_at.
+            "legacy": GenerationJob(completed_at=now - 8 * day, expires_at=None),
+            "fresh": GenerationJob(completed_at=now - 2 * day, expires_at=now + 5 * day),
+            # Never backfilled: expiry falls back to the file's mtime, then to created_at.
+            "untimed-file": GenerationJob(completed_at=None, expires_at=None),
+            "untimed-created": GenerationJob(completed_at=None, expires_at=None, created_at=now - 10 * day),
+            "untimed-recent": GenerationJob(completed_at=None, expires_at=None, created_at=now - 10 * day),
+        }
+        for name, job in jobs.items():
+            job.prompt_id = prompt_id
+            job.room_id = room.id
+            job.status = "completed"
+            job.result_path = files[name]
+        db.add_all(jobs.values())
+        db.commit()
+        job_ids = {name: job.id for name, job in jobs.items()}
 
-    room_dir = result_dir / "room-main"
-    room_dir.mkdir(parents=True, exist_ok=True)
+    with SessionLocal() as db:
+        assert sweep_expired_results(db, now=now, batch_size=1) == 4
+
+    assert not local_storage.exists(files["stale"])
+    assert not local_storage.exists(files["legacy"])
+    assert local_storage.exists(files["fresh"])
+    with SessionLocal() as db:
+        assert db.get(GenerationJob, job_ids["stale"]).result_path is None
+        assert db.get(GenerationJob, job_ids["legacy"]).result_path is None
+        assert db.get(GenerationJob, job_ids["fresh"]).result_path == files["fresh"]
+        assert db.get(GenerationJob, job_ids["untimed-file"]).result_path is None
+        assert db.get(GenerationJob, job_ids["untimed-created"]).result_path is None
+        # A recent file outweighs an old created_at.
+        assert db.get(GenerationJob, job_ids["untimed-recent"]).result_path == files["untimed-recent"]
+
+    assert client.get("/qr/5555555555555555").status_code == 404
 
-    newest = room_dir / "newest.jpg"
-    newest.write_bytes(b"new")
-    oldest = room_dir / "oldest.png"
-    oldest.write_bytes(b"old")
-    skipped = room_dir / "note.txt"
-    skipped.write_text("skip me", encoding="utf-8")
+
+def _seed_completed_results(prompt_id: int, results: dict[str, float]) -> None:
+    with SessionLocal() as db:
+        room = db.query(Room).filter(Room.slug == "main").one()
+        db.add_all(
+            [
+                GenerationJob(
+                    prompt_id=prompt_id,
+                    room_id=room.id,
+                    status="completed",
+                    result_path=f"results/room-main/{name}",
+                    completed_at=completed_at,
+                )
+                for name, completed_at in results.items()
+            ]
+        )
+        db.add(GenerationJob(prompt_id=prompt_id, room_id=room.id, status="processing"))
+        db.commit()
+
+
+def test_gallery_endpoint_lists_completed_results_newest_first() -> None:
+    _reset_db()
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
 
     now = time.time()
-    os.utime(oldest, (now - 100, now - 100))
-    os.utime(newest, (now - 10, now - 10))
+    _seed_completed_results(
+        prompt_id,
+        {"oldest.png": now - 100, "newest.jpg": now - 10, "expired.jpg": now - 30 * 24 * 60 * 60},
+    )
 
     response = client.get("/api/jobs/gallery")
     assert response.status_code == 200
+    assert "X-Next-Before" not in response.headers
 
     body = response.json()
     assert [item["name"] for item in body] == ["newest.jpg", "oldest.png"]
     assert body[0]["url"] == "/media/results/room-main/newest.jpg"
     assert body[1]["url"] == "/media/results/room-main/oldest.png"
+    assert body[0]["modified_at"] == pytest.approx(now - 10)
 
 
-def test_gallery_endpoint_includes_other_image_extensions(monkeypatch, tmp_path: Path) -> None:
+def test_gallery_endpoint_paginates_with_before_cursor() -> None:
     _reset_db()
-    _, result_dir = _patch_storage_dirs(monkeypatch, tmp_path)
     client = TestClient(app)
+    prompt_id = _create_prompt(client)
+
+    now = time.time()
+    _seed_completed_results(prompt_id, {f"job-{index}.jpg": now - index for index in range(5)})
 
-    room_dir = result_dir / "room-main"
-    room_dir.mkdir(parents=True, exist_ok=True)
+    first_page = client.get("/api/jobs/gallery", params={"limit": 2})
+    assert first_page.status_code == 200
+    assert [item["name"] for item in first_page.json()] == ["job-0.jpg", "job-1.jpg"]
 
-    gif_file = room_dir / "photo.gif"
-    gif_file.write_bytes(b"GIF89a")
+    cursor = first_page.headers["X-Next-Before"]
+    second_page = client.get("/api/jobs/gallery", params={"limit": 2, "before": cursor})
+    assert [item["name"] for item in second_page.json()] == ["job-2.jpg", "job-3.jpg"]
 
-    response = client.get("/api/jobs/gallery")
-    assert response.status_code == 200
-    assert [item["name"] for item in response.json()] == ["photo.gif"]
+    last_page = client.get("/api/jobs/gallery", params={"limit": 2, "before": second_page.headers["X-Next-Before"]})
+    assert [item["name"] for item in last_page.json()] == ["job-4.jpg"]
+    assert "X-Next-Before" not in last_page.headers
+
+    assert client.get("/api/jobs/gallery", params={"limit": 0}).status_code == 422
+    assert client.get("/api/jobs/gallery", params={"before": "yesterday"}).status_code == 400
+
+
+def test_gallery_cursor_does_not_skip_results_completed_at_the_same_time() -> None:
+    _reset_db()
+    client = TestClient(app)
+    prompt_id = _create_prompt(client)
+
+    completed_at = time.time() - 5
+    _seed_completed_results(prompt_id, {f"tie-{index}.jpg": completed_at for index in range(3)})
+
+    first_page = client.get("/api/jobs/gallery", params={"limit": 2})
+    cursor = first_page.headers["X-Next-Before"]
+    assert cursor.endswith(":2")
+    second_page = client.get("/api/jobs/gallery", params={"limit": 2, "before": cursor})
+
+    names = [item["name"] for item in first_page.json() + second_page.json()]
+    assert sorted(names) == ["tie-0.jpg", "tie-1.jpg", "tie-2.jpg"]
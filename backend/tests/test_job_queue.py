@@ -0,0 +1,154 @@
+import asyncio
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, SessionLocal, engine
+from app.job_queue import claim_next_job, renew_job_lease
+from app.job_service import run_generation_async
+from app.models import GenerationJob, Prompt, Room
+from app.storage import LocalStorage
+
+
+def _session_factory(tmp_path: Path):
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+def _seed_jobs(session_factory, count: int) -> list[int]:
+    with session_factory() as db:
+        room = Room(slug="main", name="Main", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        prompt = Prompt(
+            name="Anime",
+            description="Anime",
+            prompt="Anime",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        jobs = [GenerationJob(prompt_id=prompt.id, room_id=room.id, status="processing") for _ in range(count)]
+        db.add_all(jobs)
+        db.commit()
+        return [job.id for job in jobs]
+
+
+def test_claim_next_job_leases_each_job_once(tmp_path: Path) -> None:
+    session_factory = _session_factory(tmp_path)
+    job_ids = _seed_jobs(session_factory, 2)
+
+    with session_factory() as db:
+        first = claim_next_job(db, worker_id="w1", lease_seconds=60, max_attempts=3)
+        second = claim_next_job(db, worker_id="w2", lease_seconds=60, max_attempts=3)
+        third = claim_next_job(db, worker_id="w3", lease_seconds=60, max_attempts=3)
+
+        assert [first, second] == job_ids
+        assert third is None
+
+        job = db.get(GenerationJob, first)
+        assert job is not None
+        assert job.lease_owner == "w1"
+        assert job.attempts == 1
+        assert job.lease_expires_at is not None and job.lease_expires_at > time.time()
+
+
+def test_claim_next_job_reclaims_expired_lease(tmp_path: Path) -> None:
+    session_factory = _session_factory(tmp_path)
+    [job_id] = _seed_jobs(session_factory, 1)
+
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        job.lease_owner = "crashed-worker"
+        job.lease_expires_at = time.time() - 1
+        job.attempts = 1
+        db.commit()
+
+        claimed = claim_next_job(db, worker_id="w1", lease_seconds=60, max_attempts=3)
+
+        assert claimed == job_id
+        db.refresh(job)
+        assert job.lease_owner == "w1"
+        assert job.attempts == 2
+
+
+def test_claim_next_job_skips_completed_jobs(tmp_path: Path) -> None:
+    session_factory = _session_factory(tmp_path)
+    [job_id] = _seed_jobs(session_factory, 1)
+
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        job.status = "completed"
+        db.commit()
+
+        assert claim_next_job(db, worker_id="w1", lease_seconds=60, max_attempts=3) is None
+
+
+def test_claim_next_job_gives_up_after_max_attempts(tmp_path: Path) -> None:
+    session_factory = _session_factory(tmp_path)
+    [job_id] = _seed_jobs(session_factory, 1)
+
+    with session_factory() as db:
+        job = db.get(GenerationJob, job_id)
+        job.attempts = 3
+        db.commit()
+
+        assert claim_next_job(db, worker_id="w1", lease_seconds=60, max_attempts=3) is None
+        db.refresh(job)
+        assert job.status == "error"
+        assert "3 attempts" in (job.error_message or "")
+
+
+def test_renew_job_lease_only_extends_a_held_lease(tmp_path: Path) -> None:
+    session_factory = _session_factory(tmp_path)
+    [job_id] = _seed_jobs(session_factory, 1)
+
+    with session_factory() as db:
+        assert claim_next_job(db, worker_id="w1", lease_seconds=1, max_attempts=3) == job_id
+        assert renew_job_lease(db, job_id=job_id, worker_id="w1", lease_seconds=60) is True
+        job = db.get(GenerationJob, job_id)
+        db.refresh(job)
+        assert job.lease_expires_at > time.time() + 30
+
+        # The lease lapses and another worker takes the job over.
+        job.lease_expires_at = time.time() - 1
+        db.commit()
+        assert claim_next_job(db, worker_id="w2", lease_seconds=60, max_attempts=3) == job_id
+        assert renew_job_lease(db, job_id=job_id, worker_id="w1", lease_seconds=60) is False
+
+
+def test_result_from_a_lost_lease_is_discarded(monkeypatch, local_storage: LocalStorage) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    [job_id] = _seed_jobs(SessionLocal, 1)
+    local_storage.put("source/job.jpg", b"source-image")
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        job.source_path = "source/job.jpg"
+        job.lease_owner = "w2"
+        job.lease_expires_at = time.time() + 60
+        db.commit()
+
+    async def fake_generate_image(**kwargs) -> bytes:
+        return b"generated-image"
+
+    monkeypatch.setattr("app.openrouter_client.generate_image_async", fake_generate_image)
+
+    asyncio.run(run_generation_async(job_id, lease_owner="w1"))
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job.status == "processing"
+        assert job.result_path is None
+    # The source stays for the worker that now owns the job.
+    assert local_storage.exists("source/job.jpg")
+
+    asyncio.run(run_generation_async(job_id, lease_owner="w2"))
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        assert job.status == "completed"
+        assert job.result_path is not None
@@ -21,3 +21,31 @@ def test_upload_prompt_icon_image() -> None:
     assert response.status_code == 201
     body = response.json()
     assert body["url"].startswith("/media/icons/")
+
+
+def test_oversized_media_upload_is_rejected(monkeypatch, local_storage) -> None:
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "1024")
+    client = TestClient(app)
+
+    files = {"file": ("preview.jpg", b"x" * 2048, "image/jpeg")}
+    response = client.post("/api/media/prompt-preview", files=files)
+    assert response.status_code == 413
+    assert not list(local_storage.root.rglob("*.jpg"))
+
+
+def test_upload_body_over_limit_is_cut_off_while_streaming(monkeypatch) -> None:
+    monkeypatch.setenv("UPLOAD_MAX_BYTES", "1024")
+    client = TestClient(app)
+
+    def chunks():
+        yield b"--boundary\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n\r\n"
+        for _ in range(32):
+            yield b"x" * 8192
+
+    response = client.post(
+        "/api/media/prompt-preview",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"},
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "upload exceeds 1024 bytes"
@@ -0,0 +1,49 @@
+from app.generation_limiter import LatencyTracker
+from app.model_health import ModelSlo, is_within_slo, model_health, order_models, resolve_model_slo
+from app.runtime_config import reload_runtime_config
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_degraded_models_move_to_the_back_of_the_chain() -> None:
+    tracker = LatencyTracker(clock=_Clock())
+    slo = ModelSlo(max_p95_seconds=30, max_error_rate=0.5)
+    for _ in range(5):
+        tracker.record("slow/model", seconds=60, ok=True)
+        tracker.record("failing/model", seconds=1, ok=False)
+        tracker.record("fast/model", seconds=5, ok=True)
+
+    assert model_health("slow/model", tracker).p95_seconds == 60
+    assert model_health("failing/model", tracker).error_rate == 1.0
+    chain = ["slow/model", "failing/model", "fast/model", "new/model"]
+    expected = ["fast/model", "new/model", "slow/model", "failing/model"]
+    assert order_models(chain, slo, min_samples=5, tracker=tracker) == expected
+    # Too few samples to judge keeps the configured order.
+    assert order_models(chain, slo, min_samples=6, tracker=tracker) == chain
+
+
+def test_model_health_forgets_outcomes_outside_the_window() -> None:
+    clock = _Clock()
+    tracker = LatencyTracker(window_seconds=60, clock=clock)
+    slo = ModelSlo(max_p95_seconds=30, max_error_rate=0.5)
+    tracker.record("primary/model", seconds=1, ok=False)
+    assert not is_within_slo("primary/model", slo, min_samples=1, tracker=tracker)
+
+    clock.now = 61
+    assert model_health("primary/model", tracker).samples == 0
+    assert is_within_slo("primary/model", slo, min_samples=1, tracker=tracker)
+
+
+def test_room_slo_overrides_environment_defaults(monkeypatch) -> None:
+    monkeypatch.setenv("MODEL_SLO_P95_SECONDS", "120")
+    monkeypatch.setenv("MODEL_SLO_ERROR_RATE", "not-a-number")
+    reload_runtime_config()
+
+    assert resolve_model_slo() == ModelSlo(max_p95_seconds=120, max_error_rate=0.5)
+    assert resolve_model_slo(max_p95_seconds=20, max_error_rate=0.1) == ModelSlo(max_p95_seconds=20, max_error_rate=0.1)
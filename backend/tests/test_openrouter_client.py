@@ -1,84 +1,129 @@
+import asyncio
 import base64
+import json
+from collections.abc import Callable
+from contextlib import asynccontextmanager
 from io import BytesIO
+from pathlib import Path
 
 import pytest
-from PIL import Image
+from PIL import Image, features
 
 from app import openrouter_client
+from app.generation_limiter import get_attempt_latency_tracker, get_latency_tracker
+from app.image_ops import detect_image_format
+from app.runtime_config import reload_runtime_config
 
+ONE_PIXEL_PNG_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMCAO2iR4sAAAAASUVORK5CYII="
 
-class _FakeResponse:
-    def __init__(self, payload: dict) -> None:
-        self._payload = payload
-
-    def model_dump(self) -> dict:
-        return self._payload
 
+class _FakeStatusError(Exception):
+    def __init__(self, status_code: int, body: dict) -> None:
+        super().__init__("request failed")
+        self.status_code = status_code
+        self.body = body
 
-class _FakeCompletionsAPI:
-    def __init__(self, calls: list[dict], payload: dict | None = None, error: Exception | None = None) -> None:
-        self._calls = calls
-        self._payload = payload or {}
-        self._error = error
 
-    def create(self, **kwargs):
-        self._calls.append(kwargs)
-        if self._error:
-            raise self._error
-        return _FakeResponse(self._payload)
+class _FakeStreamedResponse:
+    def __init__(self, body: bytes, chunk_size: int) -> None:
+        self._body = body
+        self._chunk_size = chunk_size
 
+    async def iter_bytes(self):
+        for start in range(0, len(self._body), self._chunk_size):
+            yield self._body[start : start + self._chunk_size]
 
-class _FakeOpenAIClient:
-    def __init__(self, calls: list[dict], payload: dict | None = None, error: Exception | None = None) -> None:
-        self.chat = type("ChatAPI", (), {"completions": _FakeCompletionsAPI(calls, payload=payload, error=error)})()
 
+class _FakeStreamingCompletionsAPI:
+    def __init__(self, calls: list[dict], respond: Callable[[dict], dict | Exception], chunk_size: int) -> None:
+        self._calls = calls
+        self._respond = respond
+        self._chunk_size = chunk_size
 
-class _FakeStatusError(Exception):
-    def __init__(self, status_code: int, body: dict) -> None:
-        super().__init__("request failed")
-        self.status_code = status_code
-        self.body = body
+    @asynccontextmanager
+    async def create(self, **kwargs):
+        self._calls.append(kwargs)
+        outcome = self._respond(kwargs)
+        if isinstance(outcome, Exception):
+            raise outcome
+        # Escaped slashes, as some JSON encoders emit them.
+        yield _FakeStreamedResponse(json.dumps(outcome).replace("/", "\\/").encode(), self._chunk_size)
+
+
+class _FakeAsyncCompletionsAPI:
+    # `payload` is one response, a sequence of responses (the last one repeats), or a callable per request.
+    def __init__(
+        self,
+        calls: list[dict],
+        payload: dict | list[dict] | Callable[[dict], dict | Exception],
+        chunk_size: int = 7,
+    ) -> None:
+        if callable(payload):
+            respond = payload
+        else:
+            payloads = payload if isinstance(payload, list) else [payload]
+
+            def respond(kwargs: dict) -> dict:
+                return payloads[min(len(calls), len(payloads)) - 1]
+
+        self.with_streaming_response = _FakeStreamingCompletionsAPI(calls, respond, chunk_size)
+
+
+def _fake_async_openai(
+    calls: list[dict],
+    payload: dict | list[dict] | Callable[[dict], dict | Exception],
+    *,
+    init_calls: list[dict] | None = None,
+):
+    class _FakeAsyncOpenAI:
+        def __init__(self, **kwargs) -> None:
+            if init_calls is not None:
+                init_calls.append(kwargs)
+            self._http_client = kwargs.get("http_client")
+            self.chat = type("ChatAPI", (), {"completions": _FakeAsyncCompletionsAPI(calls, payload)})()
+
+        async def close(self) -> None:
+            if self._http_client is not None:
+                await self._http_client.aclose()
+
+    return _FakeAsyncOpenAI
+
+
+def _image_payload(content: bytes | str, *, key: str = "image_url") -> dict:
+    encoded = content if isinstance(content, str) else base64.b64encode(content).decode("utf-8")
+    return {"choices": [{"message": {"images": [{key: {"url": f"data:image/png;base64,{encoded}"}}]}}]}
+
+
+def _generate(
+    *,
+    model: str = "openai/gpt-image-1",
+    prompt: str = "Draw this in oil painting",
+    image_bytes: bytes = b"source-image",
+) -> bytes:
+    async def run() -> openrouter_client.GeneratedImage:
+        try:
+            return await openrouter_client.generate_image_async(model=model, prompt=prompt, image_bytes=image_bytes)
+        finally:
+            await openrouter_client.close_async_client()
+
+    generated = asyncio.run(run())
+    try:
+        return generated.path.read_bytes()
+    finally:
+        generated.path.unlink(missing_ok=True)
 
 
 def test_generate_image_recovers_when_openai_was_missing_during_module_import(monkeypatch) -> None:
     init_calls: list[dict] = []
     create_calls: list[dict] = []
-    encoded = base64.b64encode(b"generated-after-retry").decode("utf-8")
-
-    def fake_openai(**kwargs):
-        init_calls.append(kwargs)
-        return _FakeOpenAIClient(
-            create_calls,
-            payload={
-                "choices": [
-                    {
-                        "message": {
-                            "images": [
-                                {
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{encoded}"
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
+    fake_openai = _fake_async_openai(create_calls, _image_payload(b"generated-after-retry"), init_calls=init_calls)
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", None)
-    monkeypatch.setattr(
-        "app.openrouter_client._load_openai_client_class",
-        lambda: fake_openai,
-        raising=False,
-    )
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", None)
+    monkeypatch.setattr("app.openrouter_client._load_async_openai_client_class", lambda: fake_openai)
 
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in watercolor style",
-        image_bytes=b"source-image",
-    )
+    result = _generate(prompt="Draw this in watercolor style")
 
     assert result == b"generated-after-retry"
     assert len(init_calls) == 1
@@ -88,40 +133,18 @@ def test_generate_image_recovers_when_openai_was_missing_during_module_import(mo
 def test_generate_image_uses_openai_sdk_client_with_openrouter_base_url(monkeypatch) -> None:
     init_calls: list[dict] = []
     create_calls: list[dict] = []
-    encoded = base64.b64encode(b"generated-image").decode("utf-8")
-
-    def fake_openai(**kwargs):
-        init_calls.append(kwargs)
-        return _FakeOpenAIClient(
-            create_calls,
-            payload={
-                "choices": [
-                    {
-                        "message": {
-                            "images": [
-                                {
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{encoded}"
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
     monkeypatch.setenv("OPENROUTER_HTTP_REFERER", "https://photoframe.local")
     monkeypatch.setenv("OPENROUTER_X_TITLE", "AI Photoframe")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
-
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in watercolor style",
-        image_bytes=b"source-image",
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI",
+        _fake_async_openai(create_calls, _image_payload(b"generated-image"), init_calls=init_calls),
     )
 
+    result = _generate(prompt="Draw this in watercolor style")
+
     assert result == b"generated-image"
     assert len(init_calls) == 1
     assert len(create_calls) == 1
@@ -131,6 +154,7 @@ def test_generate_image_uses_openai_sdk_client_with_openrouter_base_url(monkeypa
     assert init_call["base_url"] == openrouter_client.OPENROUTER_BASE_URL
     assert init_call["default_headers"]["HTTP-Referer"] == "https://photoframe.local"
     assert init_call["default_headers"]["X-Title"] == "AI Photoframe"
+    assert init_call["max_retries"] == 0
 
     create_call = create_calls[0]
     assert create_call["model"] == "openai/gpt-image-1"
@@ -146,115 +170,99 @@ def test_generate_image_uses_openai_sdk_client_with_openrouter_base_url(monkeypa
 
 
 def test_generate_image_supports_camel_case_image_url(monkeypatch) -> None:
-    encoded = base64.b64encode(b"generated-camel").decode("utf-8")
-
-    def fake_openai(**kwargs):
-        return _FakeOpenAIClient(
-            [],
-            payload={
-                "choices": [
-                    {
-                        "message": {
-                            "images": [
-                                {
-                                    "imageUrl": {
-                                        "url": f"data:image/png;base64,{encoded}"
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
-
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
-
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in oil painting",
-        image_bytes=b"source-image",
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI",
+        _fake_async_openai([], _image_payload(b"generated-camel", key="imageUrl")),
     )
 
-    assert result == b"generated-camel"
+    assert _generate() == b"generated-camel"
 
 
 def test_generate_image_converts_png_payload_to_jpeg(monkeypatch) -> None:
-    one_pixel_png_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMCAO2iR4sAAAAASUVORK5CYII="
-
-    def fake_openai(**kwargs):
-        return _FakeOpenAIClient(
-            [],
-            payload={
-                "choices": [
-                    {
-                        "message": {
-                            "images": [
-                                {
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{one_pixel_png_b64}"
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
-
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
     monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "jpeg")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _fake_async_openai([], _image_payload(ONE_PIXEL_PNG_B64)))
 
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in oil painting",
-        image_bytes=b"source-image",
-    )
+    result = _generate()
 
     assert result.startswith(b"\xff\xd8\xff")
     assert not result.startswith(b"\x89PNG")
 
 
+def _png_with_alpha() -> bytes:
+    output = BytesIO()
+    Image.new("RGBA", (16, 16), color=(200, 40, 40, 128)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _spooled(content: bytes, tmp_path: Path) -> openrouter_client.GeneratedImage:
+    path = tmp_path / f"generated-{len(list(tmp_path.iterdir()))}.part"
+    path.write_bytes(content)
+    return openrouter_client.GeneratedImage(path=path, size=len(content), image_format=detect_image_format(content))
+
+
+def _transform(generated: openrouter_client.GeneratedImage) -> openrouter_client.GeneratedImage:
+    return asyncio.run(openrouter_client._transform_output_file_async(generated))
+
+
+def test_transform_output_passthrough_keeps_provider_bytes(monkeypatch, tmp_path: Path) -> None:
+    generated = _spooled(_png_with_alpha(), tmp_path)
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "passthrough")
+    reload_runtime_config()
+
+    assert _transform(generated) is generated
+
+
+@pytest.mark.parametrize(("result_format", "expected_format"), [("webp", "WEBP"), ("avif", "AVIF")])
+def test_transform_output_transcodes_to_modern_formats(
+    monkeypatch, tmp_path: Path, result_format, expected_format
+) -> None:
+    if not features.check(result_format):
+        pytest.skip(f"Pillow built without {result_format}")
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", result_format)
+    reload_runtime_config()
+
+    converted = _transform(_spooled(_png_with_alpha(), tmp_path))
+
+    with Image.open(converted.path) as image:
+        assert image.format == expected_format
+        assert image.mode == "RGBA"
+    # Already in the target format: no second encode.
+    assert _transform(converted) is converted
+    converted.path.unlink()
+
+
+def test_transform_output_writes_progressive_jpeg_when_enabled(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "jpeg")
+    monkeypatch.setenv("OPENROUTER_JPEG_PROGRESSIVE", "true")
+    reload_runtime_config()
+
+    converted = _transform(_spooled(_png_with_alpha(), tmp_path))
+
+    with Image.open(converted.path) as image:
+        assert image.format == "JPEG"
+        assert image.info.get("progressive") == 1
+    converted.path.unlink()
+
+
 def test_generate_image_resizes_large_input_before_request(monkeypatch) -> None:
     calls: list[dict] = []
-    one_pixel_png_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMCAO2iR4sAAAAASUVORK5CYII="
-
     source = BytesIO()
     Image.new("RGB", (2800, 1900), color=(120, 160, 200)).save(source, format="JPEG", quality=95)
     large_input = source.getvalue()
 
-    def fake_openai(**kwargs):
-        return _FakeOpenAIClient(
-            calls,
-            payload={
-                "choices": [
-                    {
-                        "message": {
-                            "images": [
-                                {
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{one_pixel_png_b64}"
-                                    }
-                                }
-                            ]
-                        }
-                    }
-                ]
-            },
-        )
-
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
     monkeypatch.setenv("OPENROUTER_SOURCE_MAX_SIDE", "1280")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
-
-    openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Resize before upstream call",
-        image_bytes=large_input,
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI", _fake_async_openai(calls, _image_payload(ONE_PIXEL_PNG_B64))
     )
 
+    _generate(prompt="Resize before upstream call", image_bytes=large_input)
+
     assert len(calls) == 1
     sent_data_url = calls[0]["messages"][0]["content"][1]["image_url"]["url"]
     sent_payload = base64.b64decode(sent_data_url.split(",", 1)[1])
@@ -263,131 +271,61 @@ def test_generate_image_resizes_large_input_before_request(monkeypatch) -> None:
 
 
 def test_generate_image_raises_if_response_has_no_images(monkeypatch) -> None:
-    def fake_openai(**kwargs):
-        return _FakeOpenAIClient([], payload={"choices": [{"message": {}}]})
-
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _fake_async_openai([], {"choices": [{"message": {}}]}))
 
     with pytest.raises(RuntimeError, match="OpenRouter response does not contain image data"):
-        openrouter_client.generate_image(
-            model="openai/gpt-image-1",
-            prompt="Draw this in oil painting",
-            image_bytes=b"source-image",
-        )
+        _generate()
 
 
 def test_generate_image_retries_until_response_has_images(monkeypatch) -> None:
     create_calls: list[dict] = []
-    encoded = base64.b64encode(b"generated-after-empty-response").decode("utf-8")
-    call_count = {"value": 0}
-
-    def fake_openai(**kwargs):
-        class _FakeCompletions:
-            def create(self, **request_kwargs):
-                create_calls.append(request_kwargs)
-                call_count["value"] += 1
-                if call_count["value"] < 3:
-                    return _FakeResponse({"choices": [{"message": {}}]})
-                return _FakeResponse(
-                    {
-                        "choices": [
-                            {
-                                "message": {
-                                    "images": [
-                                        {
-                                            "image_url": {
-                                                "url": f"data:image/png;base64,{encoded}"
-                                            }
-                                        }
-                                    ]
-                                }
-                            }
-                        ]
-                    }
-                )
-
-        return type("Client", (), {"chat": type("Chat", (), {"completions": _FakeCompletions()})()})()
+    empty = {"choices": [{"message": {}}]}
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
     monkeypatch.setenv("OPENROUTER_MISSING_IMAGE_RETRIES", "3")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
-
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in oil painting",
-        image_bytes=b"source-image",
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI",
+        _fake_async_openai(create_calls, [empty, empty, _image_payload(b"generated-after-empty-response")]),
     )
 
+    result = _generate()
+
     assert result == b"generated-after-empty-response"
     assert len(create_calls) == 3
+    # Hedging reads one sample per upstream request; the end-to-end series is left to the job service.
+    attempts = get_attempt_latency_tracker().outcomes("openai/gpt-image-1")
+    assert [ok for _, ok in attempts] == [False, False, True]
+    assert get_latency_tracker().outcomes("openai/gpt-image-1") == []
 
 
 def test_generate_image_includes_error_details_on_bad_request(monkeypatch) -> None:
-    error = _FakeStatusError(
-        404,
-        {
-            "error": {
-                "message": "No endpoints found for openai/gpt-image-1."
-            }
-        },
-    )
-
-    def fake_openai(**kwargs):
-        return _FakeOpenAIClient([], error=error)
+    error = _FakeStatusError(404, {"error": {"message": "No endpoints found for openai/gpt-image-1."}})
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _fake_async_openai([], lambda kwargs: error))
 
     with pytest.raises(RuntimeError, match="No endpoints found for openai/gpt-image-1"):
-        openrouter_client.generate_image(
-            model="openai/gpt-image-1",
-            prompt="Draw this in oil painting",
-            image_bytes=b"source-image",
-        )
+        _generate()
 
 
 def test_generate_image_retries_on_missing_image_error_message(monkeypatch) -> None:
     create_calls: list[dict] = []
-    encoded = base64.b64encode(b"generated-after-missing-image-error").decode("utf-8")
-    call_count = {"value": 0}
-
-    def fake_openai(**kwargs):
-        class _FakeCompletions:
-            def create(self, **request_kwargs):
-                create_calls.append(request_kwargs)
-                call_count["value"] += 1
-                if call_count["value"] == 1:
-                    raise _FakeStatusError(502, {"error": {"message": "response does not contain image"}})
-                return _FakeResponse(
-                    {
-                        "choices": [
-                            {
-                                "message": {
-                                    "images": [
-                                        {
-                                            "image_url": {
-                                                "url": f"data:image/png;base64,{encoded}"
-                                            }
-                                        }
-                                    ]
-                                }
-                            }
-                        ]
-                    }
-                )
 
-        return type("Client", (), {"chat": type("Chat", (), {"completions": _FakeCompletions()})()})()
+    def respond(kwargs: dict) -> dict | Exception:
+        if len(create_calls) == 1:
+            return _FakeStatusError(502, {"error": {"message": "response does not contain image"}})
+        return _image_payload(b"generated-after-missing-image-error")
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
     monkeypatch.setenv("OPENROUTER_MISSING_IMAGE_RETRIES", "2")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", fake_openai)
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _fake_async_openai(create_calls, respond))
 
-    result = openrouter_client.generate_image(
-        model="openai/gpt-image-1",
-        prompt="Draw this in oil painting",
-        image_bytes=b"source-image",
-    )
+    result = _generate()
 
     assert result == b"generated-after-missing-image-error"
     assert len(create_calls) == 2
@@ -395,7 +333,8 @@ def test_generate_image_retries_on_missing_image_error_message(monkeypatch) -> N
 
 def test_generate_image_reports_runtime_interpreter_when_openai_is_missing(monkeypatch) -> None:
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
-    monkeypatch.setattr("app.openrouter_client.OpenAI", None)
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", None)
 
     def fail_import(name: str):
         raise ModuleNotFoundError("No module named 'openai'")
@@ -403,8 +342,134 @@ def test_generate_image_reports_runtime_interpreter_when_openai_is_missing(monke
     monkeypatch.setattr("app.openrouter_client.importlib.import_module", fail_import)
 
     with pytest.raises(RuntimeError, match="runtime interpreter"):
-        openrouter_client.generate_image(
-            model="openai/gpt-image-1",
-            prompt="Draw this in oil painting",
-            image_bytes=b"source-image",
-        )
+        _generate()
+
+
+def test_generate_image_async_reuses_pooled_client_across_calls(monkeypatch) -> None:
+    init_calls: list[dict] = []
+    create_calls: list[dict] = []
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_MAX_CONNECTIONS", "10")
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "png")
+    reload_runtime_config()
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI",
+        _fake_async_openai(create_calls, _image_payload(b"generated-async"), init_calls=init_calls),
+    )
+
+    async def run_twice() -> list[openrouter_client.GeneratedImage]:
+        try:
+            return [
+                await openrouter_client.generate_image_async(
+                    model="openai/gpt-5-image",
+                    prompt="Draw this in watercolor style",
+                    image_bytes=b"source-image",
+                )
+                for _ in range(2)
+            ]
+        finally:
+            await openrouter_client.close_async_client()
+
+    results = asyncio.run(run_twice())
+
+    assert [result.path.read_bytes() for result in results] == [b"generated-async", b"generated-async"]
+    for result in results:
+        result.path.unlink()
+    assert len(init_calls) == 1
+    assert len(create_calls) == 2
+    assert init_calls[0]["base_url"] == openrouter_client.OPENROUTER_BASE_URL
+    assert init_calls[0]["http_client"] is not None
+    assert create_calls[0]["extra_body"]["modalities"] == ["image", "text"]
+
+
+def test_replacing_the_async_client_closes_the_old_one(monkeypatch) -> None:
+    init_calls: list[dict] = []
+    monkeypatch.setattr(
+        "app.openrouter_client.AsyncOpenAI",
+        _fake_async_openai([], _image_payload(b"unused"), init_calls=init_calls),
+    )
+
+    async def rotate_key() -> None:
+        try:
+            monkeypatch.setenv("OPENROUTER_API_KEY", "old-key")
+            reload_runtime_config()
+            old_client = openrouter_client._get_async_client()
+            monkeypatch.setenv("OPENROUTER_API_KEY", "new-key")
+            reload_runtime_config()
+            assert openrouter_client._get_async_client() is not old_client
+            await asyncio.sleep(0)
+        finally:
+            await openrouter_client.close_async_client()
+
+    asyncio.run(rotate_key())
+
+    assert [call["api_key"] for call in init_calls] == ["old-key", "new-key"]
+    assert init_calls[0]["http_client"].is_closed
+
+
+def test_generate_image_async_streams_result_to_a_spool_file(monkeypatch, tmp_path) -> None:
+    create_calls: list[dict] = []
+    generated = _png_with_alpha()
+    encoded = base64.b64encode(generated).decode("utf-8")
+    payloads = [
+        {"choices": [{"message": {"content": "no image this time"}}]},
+        {"choices": [{"message": {"images": [{"imageUrl": {"url": f"data:image/png;base64,{encoded}"}}]}}]},
+    ]
+
+    class _FakeAsyncOpenAI:
+        def __init__(self, **kwargs) -> None:
+            self.chat = type("ChatAPI", (), {"completions": _FakeAsyncCompletionsAPI(create_calls, payloads, 5)})()
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "passthrough")
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _FakeAsyncOpenAI)
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    async def run() -> openrouter_client.GeneratedImage:
+        try:
+            return await openrouter_client.generate_image_async(
+                model="openai/gpt-5-image",
+                prompt="Draw this in watercolor style",
+                image_bytes=b"source-image",
+            )
+        finally:
+            await openrouter_client.close_async_client()
+
+    result = asyncio.run(run())
+
+    assert len(create_calls) == 2
+    assert result.image_format == "png"
+    assert result.size == len(generated)
+    assert result.path.read_bytes() == generated
+    # The spool file from the attempt without an image is not left behind.
+    assert list(tmp_path.iterdir()) == [result.path]
+
+
+def test_generate_image_retries_transient_errors_then_opens_the_circuit(monkeypatch) -> None:
+    calls: list[dict] = []
+    outcomes: list[Exception | None] = [_FakeStatusError(503, {"error": {"message": "upstream overloaded"}}), None]
+
+    def respond(kwargs: dict) -> dict | Exception:
+        outcome = outcomes.pop(0) if outcomes else _FakeStatusError(503, {"error": {"message": "down"}})
+        return outcome if outcome is not None else _image_payload(b"generated-after-503")
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "passthrough")
+    monkeypatch.setenv("OPENROUTER_TRANSIENT_RETRIES", "1")
+    monkeypatch.setenv("OPENROUTER_CIRCUIT_FAILURE_THRESHOLD", "2")
+    reload_runtime_config()
+    monkeypatch.setattr("app.openrouter_client.AsyncOpenAI", _fake_async_openai(calls, respond))
+
+    result = _generate(model="openai/gpt-5-image", prompt="Retry", image_bytes=b"source")
+
+    assert result == b"generated-after-503"
+    assert len(calls) == 2
+
+    with pytest.raises(RuntimeError, match=r"\(503\)"):
+        _generate(model="openai/gpt-5-image", prompt="Retry", image_bytes=b"source")
+    assert len(calls) == 4
+    # Two consecutive transient failures opened the circuit: the next call fails without a request.
+    with pytest.raises(RuntimeError, match="temporarily unavailable"):
+        _generate(model="openai/gpt-5-image", prompt="Retry", image_bytes=b"source")
+    assert len(calls) == 4
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.generation_limiter import LatencyTracker
+from app.request_hedging import HedgePolicy, resolve_hedge_policy, run_hedged
+
+
+def test_latency_tracker_reports_percentile_once_warmed_up() -> None:
+    tracker = LatencyTracker()
+    for seconds in range(1, 11):
+        tracker.record("model-a", seconds=float(seconds), ok=True)
+    # Failed generations count towards model health, not towards the hedge delay.
+    tracker.record("model-a", seconds=500.0, ok=False)
+
+    assert tracker.percentile("model-a", 90, min_samples=20) is None
+    assert tracker.percentile("model-a", 90, min_samples=10) == 9.0
+    assert tracker.percentile("model-b", 90, min_samples=1) is None
+
+    policy = HedgePolicy(percentile=50, min_samples=5, initial_delay=30.0, min_delay=6.0, provider_sort=None)
+    assert policy.delay_for(tracker.percentile("model-a", 50, min_samples=5)) == 6.0
+    assert policy.delay_for(tracker.percentile("model-b", 50, min_samples=5)) == 30.0
+
+
+def test_hedging_is_opt_in(monkeypatch) -> None:
+    assert resolve_hedge_policy() is None
+
+    monkeypatch.setenv("OPENROUTER_HEDGE_ENABLED", "true")
+    monkeypatch.setenv("OPENROUTER_HEDGE_PROVIDER_SORT", "latency")
+    policy = resolve_hedge_policy()
+
+    assert policy is not None
+    assert policy.provider_sort == "latency"
+
+
+def test_fast_primary_is_not_hedged() -> None:
+    started: list[int] = []
+
+    async def start(index: int) -> str:
+        started.append(index)
+        return f"result-{index}"
+
+    result = asyncio.run(run_hedged(start, delay=1.0, discard=lambda value: None))
+
+    assert result == "result-0"
+    assert started == [0]
+
+
+def test_slow_primary_loses_to_hedge_and_is_cancelled() -> None:
+    cancelled: list[int] = []
+
+    async def start(index: int) -> str:
+        try:
+            await asyncio.sleep(5.0 if index == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return f"result-{index}"
+
+    result = asyncio.run(run_hedged(start, delay=0.02, discard=lambda value: None))
+
+    assert result == "result-1"
+    assert cancelled == [0]
+
+
+def test_hedge_waits_for_the_other_request_when_one_fails() -> None:
+    async def start(index: int) -> str:
+        if index == 1:
+            raise RuntimeError("provider error")
+        await asyncio.sleep(0.05)
+        return "result-0"
+
+    assert asyncio.run(run_hedged(start, delay=0.01, discard=lambda value: None)) == "result-0"
+
+
+def test_hedge_raises_when_every_request_fails() -> None:
+    async def start(index: int) -> str:
+        await asyncio.sleep(0.03 if index == 0 else 0.0)
+        raise RuntimeError(f"failure-{index}")
+
+    with pytest.raises(RuntimeError, match="failure-0"):
+        asyncio.run(run_hedged(start, delay=0.01, discard=lambda value: None))
@@ -0,0 +1,47 @@
+from app.result_cache import CachedResult, ResultCache, result_cache_key
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _result(name: str) -> CachedResult:
+    return CachedResult(result_key=f"results/{name}", size=1, model="openai/gpt-5-image")
+
+
+def test_result_cache_key_separates_prompts_and_models() -> None:
+    key = result_cache_key("digest", "anime", "openai/gpt-5-image")
+
+    assert key == result_cache_key("digest", "anime", "openai/gpt-5-image")
+    assert key != result_cache_key("digest", "anime", "google/gemini-2.5-flash-image")
+    assert key != result_cache_key("digest", "watercolor", "openai/gpt-5-image")
+    assert key != result_cache_key("other", "anime", "openai/gpt-5-image")
+
+
+def test_result_cache_expires_entries_and_evicts_least_recently_used() -> None:
+    clock = _Clock()
+    cache = ResultCache(ttl_seconds=60, max_entries=2, clock=clock)
+    cache.put("a", _result("a"))
+    cache.put("b", _result("b"))
+    assert cache.get("a") == _result("a")
+
+    cache.put("c", _result("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") == _result("a")
+
+    clock.now = 60
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_is_disabled_by_zero_ttl() -> None:
+    cache = ResultCache(ttl_seconds=0)
+    cache.put("a", _result("a"))
+
+    assert not cache.enabled
+    assert cache.get("a") is None
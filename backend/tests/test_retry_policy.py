@@ -0,0 +1,89 @@
+import pytest
+
+from app.retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    is_transient_error,
+    retry_after_seconds,
+)
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict[str, str] | None = None) -> None:
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_transient_errors_are_classified_by_status_and_type() -> None:
+    assert is_transient_error(_StatusError(429))
+    assert is_transient_error(_StatusError(503))
+    assert not is_transient_error(_StatusError(400))
+    assert is_transient_error(TimeoutError())
+    assert not is_transient_error(ValueError("bad payload"))
+
+
+def test_retry_after_header_accepts_seconds_and_http_dates() -> None:
+    assert retry_after_seconds(_StatusError(429, {"retry-after": "7"})) == 7.0
+    dated = _StatusError(503, {"retry-after": "Wed, 21 Oct 2026 07:28:10 GMT"})
+    assert retry_after_seconds(dated, now=1792567690.0 - 30) == pytest.approx(30.0)
+    assert retry_after_seconds(_StatusError(503)) is None
+
+
+def test_retry_budget_backs_off_and_honours_retry_after() -> None:
+    budget = RetryBudget(
+        RetryPolicy(transient_retries=2, base_delay=1.0, max_delay=4.0, retry_after_max=60.0),
+        missing_image_retries=1,
+    )
+
+    first = budget.after_transient_error(_StatusError(503))
+    second = budget.after_transient_error(_StatusError(429, {"retry-after": "12"}))
+
+    assert first is not None and 0 <= first <= 1.0
+    assert second == 12.0
+    assert budget.after_transient_error(_StatusError(503)) is None
+    assert budget.after_missing_image() is not None
+    assert budget.after_missing_image() is None
+
+    impatient = RetryBudget(
+        RetryPolicy(transient_retries=2, base_delay=1.0, max_delay=4.0, retry_after_max=60.0),
+        missing_image_retries=0,
+    )
+    assert impatient.after_transient_error(_StatusError(429, {"retry-after": "600"})) is None
+
+
+def test_circuit_opens_fails_fast_and_recovers_through_a_single_probe() -> None:
+    clock = _FakeClock()
+    breaker = CircuitBreaker("model-a", failure_threshold=2, reset_seconds=30.0, clock=clock)
+
+    breaker.acquire()
+    breaker.record_failure()
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    clock.now += 31
+    breaker.acquire()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 31
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.acquire()
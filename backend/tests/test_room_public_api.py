@@ -1,4 +1,4 @@
-from pathlib import Path
+import time
 
 from fastapi.testclient import TestClient
 
@@ -80,22 +80,13 @@ def test_room_job_creation_rejects_prompt_from_another_room() -> None:
     assert response.json()["detail"] == "prompt does not belong to room"
 
 
-def test_room_gallery_endpoint_returns_only_room_results(monkeypatch, tmp_path: Path) -> None:
+def test_room_gallery_endpoint_returns_only_room_results(local_storage) -> None:
     _reset_db()
     ids = _seed_rooms_and_prompts()
-    result_root = tmp_path / "results"
-    monkeypatch.setattr("app.job_service.RESULT_DIR", result_root)
     client = TestClient(app)
 
-    room_a_dir = result_root / "room-room-a"
-    room_b_dir = result_root / "room-room-b"
-    room_a_dir.mkdir(parents=True, exist_ok=True)
-    room_b_dir.mkdir(parents=True, exist_ok=True)
-
-    file_a = room_a_dir / "job-a.jpg"
-    file_b = room_b_dir / "job-b.jpg"
-    file_a.write_bytes(b"a")
-    file_b.write_bytes(b"b")
+    local_storage.put("results/room-room-a/job-a.jpg", b"a")
+    local_storage.put("results/room-room-b/job-b.jpg", b"b")
 
     with SessionLocal() as db:
         db.add_all(
@@ -105,14 +96,16 @@ def test_room_gallery_endpoint_returns_only_room_results(monkeypatch, tmp_path:
                     room_id=ids["room_a_id"],
                     status="completed",
                     qr_hash="aaaaaaaaaaaaaaaa",
-                    result_path=str(file_a),
+                    result_path="results/room-room-a/job-a.jpg",
+                    completed_at=time.time(),
                 ),
                 GenerationJob(
                     prompt_id=ids["prompt_b_id"],
                     room_id=ids["room_b_id"],
                     status="completed",
                     qr_hash="bbbbbbbbbbbbbbbb",
-                    result_path=str(file_b),
+                    result_path="results/room-room-b/job-b.jpg",
+                    completed_at=time.time(),
                 ),
             ]
         )
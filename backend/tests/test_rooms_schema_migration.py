@@ -1,6 +1,8 @@
 from pathlib import Path
 
-from sqlalchemy import inspect
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 
@@ -69,3 +71,145 @@ def test_default_room_is_created_on_startup(monkeypatch, tmp_path: Path) -> None
         default_room = db.query(models_module.Room).filter(models_module.Room.slug == "main").first()
         assert default_room is not None
         assert default_room.is_active is True
+
+
+def test_gallery_index_exists_after_startup(monkeypatch, tmp_path: Path) -> None:
+    db_module, _ = _load_fresh_backend_modules(monkeypatch, tmp_path)
+    inspector = inspect(db_module.engine)
+    assert any(index["name"] == "ix_generation_jobs_room_gallery" for index in inspector.get_indexes("generation_jobs"))
+
+
+def test_gallery_migration_backfills_completed_results_once(monkeypatch, tmp_path: Path) -> None:
+    backend_dir = Path(__file__).resolve().parents[1]
+    config = Config(str(backend_dir / "alembic.ini"))
+    config.set_main_option("script_location", str(backend_dir / "alembic"))
+    database_url = f"sqlite:///{tmp_path / 'gallery-migration.db'}"
+    monkeypatch.delenv("TEST_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_URL", database_url)
+
+    command.upgrade(config, "20261017_01_job_queue_lease")
+    result_file = tmp_path / "job-1.jpg"
+    result_file.write_bytes(b"result")
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO generation_jobs (prompt_id, room_id, status, result_path) "
+                    "VALUES (1, 1, 'completed', :result_path)"
+                ),
+                {"result_path": str(result_file)},
+            )
+
+        command.upgrade(config, "20261017_02_gallery_index")
+
+        with engine.connect() as connection:
+            completed_at, result_size = connection.execute(
+                text("SELECT completed_at, result_size FROM generation_jobs")
+            ).one()
+    finally:
+        engine.dispose()
+    assert completed_at == result_file.stat().st_mtime
+    assert result_size == len(b"result")
+
+
+def test_gallery_migration_resolves_storage_keys(monkeypatch, tmp_path: Path, local_storage) -> None:
+    backend_dir = Path(__file__).resolve().parents[1]
+    config = Config(str(backend_dir / "alembic.ini"))
+    config.set_main_option("script_location", str(backend_dir / "alembic"))
+    database_url = f"sqlite:///{tmp_path / 'gallery-migration.db'}"
+    monkeypatch.delenv("TEST_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_URL", database_url)
+
+    command.upgrade(config, "20261017_01_job_queue_lease")
+    local_storage.put("results/room-main/job-1.jpg", b"result")
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO generation_jobs (prompt_id, room_id, status, result_path) "
+                    "VALUES (1, 1, 'completed', 'results/room-main/job-1.jpg')"
+                )
+            )
+
+        command.upgrade(config, "20261017_02_gallery_index")
+
+        with engine.connect() as connection:
+            completed_at, result_size = connection.execute(
+                text("SELECT completed_at, result_size FROM generation_jobs")
+            ).one()
+    finally:
+        engine.dispose()
+    assert completed_at == local_storage.local_path("results/room-main/job-1.jpg").stat().st_mtime
+    assert result_size == len(b"result")
+
+
+def test_startup_backfills_completed_results(monkeypatch, tmp_path: Path, local_storage) -> None:
+    db_module, models_module = _load_fresh_backend_modules(monkeypatch, tmp_path)
+    local_storage.put("results/room-main/job-1.jpg", b"keyed")
+    absolute_file = tmp_path / "job-2.jpg"
+    absolute_file.write_bytes(b"absolute")
+
+    with db_module.engine.begin() as connection:
+        for result_path in ("results/room-main/job-1.jpg", str(absolute_file), "results/room-main/missing.jpg"):
+            connection.execute(
+                text(
+                    "INSERT INTO generation_jobs (prompt_id, room_id, status, attempts, result_path) "
+                    "VALUES (1, 1, 'completed', 0, :result_path)"
+                ),
+                {"result_path": result_path},
+            )
+
+    db_module.init_db()
+    db_module.init_db()
+
+    with db_module.SessionLocal() as db:
+        jobs = db.query(models_module.GenerationJob).order_by(models_module.GenerationJob.id).all()
+    assert jobs[0].completed_at == local_storage.local_path("results/room-main/job-1.jpg").stat().st_mtime
+    assert jobs[0].result_size == len(b"keyed")
+    assert jobs[1].completed_at == absolute_file.stat().st_mtime
+    assert jobs[1].result_size == len(b"absolute")
+    assert jobs[2].completed_at is None
+
+
+def test_legacy_absolute_storage_paths_become_storage_keys(monkeypatch, tmp_path: Path) -> None:
+    db_module, models_module = _load_fresh_backend_modules(monkeypatch, tmp_path)
+    legacy_root = db_module._LEGACY_STORAGE_ROOT
+
+    with db_module.SessionLocal() as db:
+        prompt = models_module.Prompt(
+            name="A",
+            description="A",
+            prompt="A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=1,
+        )
+        db.add(prompt)
+        db.commit()
+        db.add_all(
+            [
+                models_module.GenerationJob(
+                    prompt_id=prompt.id,
+                    room_id=1,
+                    status="completed",
+                    result_path=str(legacy_root / "results" / "room-main" / "job-1.jpg"),
+                    completed_at=1.0,
+                ),
+                models_module.GenerationJob(
+                    prompt_id=prompt.id,
+                    room_id=1,
+                    status="processing",
+                    source_path=str(legacy_root / "source" / "job-2.jpg"),
+                ),
+            ]
+        )
+        db.commit()
+
+    db_module.init_db()
+
+    with db_module.SessionLocal() as db:
+        jobs = db.query(models_module.GenerationJob).order_by(models_module.GenerationJob.id).all()
+        assert jobs[0].result_path == "results/room-main/job-1.jpg"
+        assert jobs[1].source_path == "source/job-2.jpg"
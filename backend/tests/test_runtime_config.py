@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app import config as config_module
+from app.catalog_cache import get_catalog_cache
+from app.config import load_local_env
+from app.main import app
+from app.qr_service import get_qr_cache
+from app.runtime_config import get_runtime_config, reload_runtime_config
+
+
+def test_runtime_config_is_a_snapshot_until_reloaded(monkeypatch) -> None:
+    monkeypatch.setenv("OPENROUTER_RESULT_FORMAT", "passthrough")
+    monkeypatch.setenv("RESULT_RETENTION_DAYS", "3")
+    before = get_runtime_config()
+    assert before.result_format == "jpeg"
+
+    reloaded = reload_runtime_config()
+
+    assert get_runtime_config() is reloaded
+    assert reloaded.result_format == "passthrough"
+    assert reloaded.result_retention_days == 3
+    assert reloaded.as_dict()["retry"]["base_delay"] == 0
+
+
+def test_runtime_config_masks_the_api_key_and_drives_cache_limits(monkeypatch) -> None:
+    monkeypatch.setenv("OPENROUTER_API_KEY", "secret-key")
+    monkeypatch.setenv("OPENROUTER_MAX_CONNECTIONS", "8")
+    monkeypatch.setenv("OPENROUTER_MAX_KEEPALIVE_CONNECTIONS", "16")
+    monkeypatch.setenv("CATALOG_CACHE_TTL_SECONDS", "-1")
+    monkeypatch.setenv("QR_CACHE_MAX_ENTRIES", "3")
+
+    reloaded = reload_runtime_config()
+
+    assert reloaded.api_key == "secret-key"
+    assert reloaded.as_dict()["api_key"] == "***"
+    assert "secret-key" not in repr(reloaded)
+    assert reloaded.max_keepalive_connections == 8
+    assert get_catalog_cache().ttl_seconds == 30
+    assert get_qr_cache().max_entries == 3
+
+
+def test_env_file_reload_updates_file_values_but_not_process_environment(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(config_module, "_env_file_keys", set())
+    # Registered with monkeypatch first so the value loaded from the file is removed after the test.
+    monkeypatch.setenv("OPENROUTER_JPEG_QUALITY", "")
+    monkeypatch.delenv("OPENROUTER_JPEG_QUALITY")
+    monkeypatch.setenv("OPENROUTER_RESULT_QUALITY", "70")
+    env_path = tmp_path / ".env"
+    env_path.write_text("OPENROUTER_JPEG_QUALITY=60\nOPENROUTER_RESULT_QUALITY=50\n", encoding="utf-8")
+    load_local_env(env_path)
+
+    env_path.write_text("OPENROUTER_JPEG_QUALITY=75\nOPENROUTER_RESULT_QUALITY=50\n", encoding="utf-8")
+    load_local_env(env_path, override_file_values=True)
+
+    reloaded = reload_runtime_config()
+    assert reloaded.jpeg_quality == 75
+    assert reloaded.result_quality == 70
+
+
+def test_admin_can_inspect_and_reload_runtime_config(monkeypatch) -> None:
+    from app.auth import password_context, settings
+
+    monkeypatch.setattr(settings, "admin_username", "admin")
+    monkeypatch.setattr(settings, "admin_password", "")
+    monkeypatch.setattr(settings, "admin_password_hash", password_context.hash("super-secret-password"))
+    monkeypatch.setattr(settings, "jwt_secret", "test-jwt-secret-with-at-least-32-bytes")
+    client = TestClient(app)
+    assert client.get("/api/admin/runtime-config").status_code == 401
+
+    login = client.post("/api/admin/auth/login", json={"username": "admin", "password": "super-secret-password"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    current = client.get("/api/admin/runtime-config", headers=headers)
+    assert current.status_code == 200
+    assert current.json()["result_format"] == "jpeg"
+
+    monkeypatch.setenv("OPENROUTER_SOURCE_MAX_SIDE", "1024")
+    reloaded = client.post("/api/admin/runtime-config/reload", headers=headers)
+    assert reloaded.status_code == 200
+    assert reloaded.json()["source_max_side"] == 1024
+    assert get_runtime_config().source_max_side == 1024
@@ -0,0 +1,160 @@
+import time
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.db import Base, SessionLocal, engine
+from app.main import app
+from app.models import GenerationJob, Prompt, Room
+from app.storage import S3Storage
+from app.uploads import UPLOAD_CHUNK_SIZE, LimitedReader, UploadTooLarge
+
+
+def _reset_db() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def s3_storage(monkeypatch: pytest.MonkeyPatch) -> S3Storage:
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="photoframe")
+        storage = S3Storage(client=client, bucket="photoframe", prefix="prod")
+        monkeypatch.setattr("app.storage._storage", storage)
+        yield storage
+
+
+@pytest.mark.parametrize("backend", ["local_storage", "s3_storage"])
+def test_storage_backends_share_one_contract(request: pytest.FixtureRequest, backend: str) -> None:
+    storage = request.getfixturevalue(backend)
+
+    assert storage.exists("results/ab/cd/blob.jpg") is False
+    storage.put("results/ab/cd/blob.jpg", b"x" * 10, content_type="image/jpeg")
+    assert storage.exists("results/ab/cd/blob.jpg") is True
+    assert storage.get("results/ab/cd/blob.jpg") == b"x" * 10
+    assert b"".join(storage.stream("results/ab/cd/blob.jpg", chunk_size=3)) == b"x" * 10
+
+    storage.put_file("source/job-1.jpg", BytesIO(b"y" * 10), content_type="image/jpeg")
+    assert storage.get("source/job-1.jpg") == b"y" * 10
+    with pytest.raises(UploadTooLarge):
+        storage.put_file("source/job-2.jpg", LimitedReader(BytesIO(b"y" * 10), 4))
+    assert storage.exists("source/job-2.jpg") is False
+
+    storage.delete("results/ab/cd/blob.jpg")
+    storage.delete("results/ab/cd/blob.jpg")
+    assert storage.exists("results/ab/cd/blob.jpg") is False
+    with pytest.raises(FileNotFoundError):
+        storage.get("results/ab/cd/blob.jpg")
+    with pytest.raises(ValueError):
+        storage.put("../escape.jpg", b"x")
+
+
+def test_limited_reader_reads_in_chunks_by_default() -> None:
+    reader = LimitedReader(BytesIO(b"y" * (UPLOAD_CHUNK_SIZE + 10)), UPLOAD_CHUNK_SIZE * 2)
+
+    assert len(reader.read()) == UPLOAD_CHUNK_SIZE
+    assert len(reader.read(-1)) == 10
+    assert reader.read() == b""
+
+
+def test_s3_presigned_url_carries_download_name(s3_storage: S3Storage) -> None:
+    url = s3_storage.presign("results/job.jpg", expires_in=60, download_name="photoframe-1.jpg")
+
+    assert "/prod/results/job.jpg" in url
+    assert "Expires=" in url or "X-Amz-Expires=60" in url
+    assert "photoframe-1.jpg" in url
+
+
+def test_results_in_object_storage_are_served_by_redirect(monkeypatch, s3_storage: S3Storage) -> None:
+    _reset_db()
+    monkeypatch.setenv("IMAGE_DERIVATIVE_FORMAT", "webp")
+    output = BytesIO()
+    Image.new("RGB", (1600, 900), color=(10, 120, 200)).save(output, format="JPEG")
+    s3_storage.put("results/room-main/job-1.jpg", output.getvalue())
+
+    with SessionLocal() as db:
+        room = Room(slug="main", name="Main", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        prompt = Prompt(
+            name="A",
+            description="A",
+            prompt="A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        db.add(
+            GenerationJob(
+                prompt_id=prompt.id,
+                room_id=room.id,
+                status="completed",
+                qr_hash="ffffffffffffffff",
+                result_path="results/room-main/job-1.jpg",
+                completed_at=time.time(),
+            )
+        )
+        db.commit()
+
+    client = TestClient(app)
+    download = client.get("/qr/ffffffffffffffff", follow_redirects=False)
+    assert download.status_code == 307
+    assert "/prod/results/room-main/job-1.jpg" in download.headers["location"]
+
+    thumb = client.get("/api/rooms/main/jobs/gallery/job-1.jpg/thumb", follow_redirects=False)
+    assert thumb.status_code == 307
+    assert s3_storage.exists("results/room-main/job-1.thumb.webp")
+
+
+def test_local_results_are_handed_to_nginx_when_it_asks(monkeypatch, local_storage) -> None:
+    _reset_db()
+    monkeypatch.setenv("ACCEL_REDIRECT_PREFIX", "/_storage")
+    local_storage.put("results/room-main/job 1.jpg", b"result-bytes")
+
+    with SessionLocal() as db:
+        room = Room(slug="main", name="Main", model_name="openai/gpt-5-image", is_active=True)
+        db.add(room)
+        db.commit()
+        prompt = Prompt(
+            name="A",
+            description="A",
+            prompt="A",
+            preview_image_url="/media/previews/a.jpg",
+            icon_image_url="/media/icons/a.png",
+            room_id=room.id,
+        )
+        db.add(prompt)
+        db.commit()
+        job = GenerationJob(
+            prompt_id=prompt.id,
+            room_id=room.id,
+            status="completed",
+            qr_hash="eeeeeeeeeeeeeeee",
+            result_path="results/room-main/job 1.jpg",
+            completed_at=time.time(),
+        )
+        db.add(job)
+        db.commit()
+        job_id = job.id
+
+    client = TestClient(app)
+    offloaded = client.get("/qr/eeeeeeeeeeeeeeee", headers={"X-Sendfile-Type": "X-Accel-Redirect"})
+    assert offloaded.status_code == 200
+    assert offloaded.content == b""
+    assert offloaded.headers["x-accel-redirect"] == "/_storage/results/room-main/job%201.jpg"
+    assert offloaded.headers["content-type"] == "image/jpeg"
+    assert offloaded.headers["content-disposition"] == f'attachment; filename="photoframe-{job_id}.jpg"'
+
+    # Direct hits on the backend (no proxy header) still get the bytes.
+    direct = client.get("/qr/eeeeeeeeeeeeeeee")
+    assert direct.content == b"result-bytes"
+    assert "x-accel-redirect" not in direct.headers
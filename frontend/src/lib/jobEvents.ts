@@ -0,0 +1,69 @@
+import type { GalleryImage, JobStatus } from "../types";
+import { buildRoomApiPath, normalizeRoomSlug } from "./roomRouting";
+
+const API_BASE = (import.meta.env.VITE_API_BASE_URL || "").replace(/\/$/, "");
+const TERMINAL_STATUSES = new Set(["completed", "error"]);
+
+export function supportsJobEvents(jobRef: string): boolean {
+  return typeof EventSource !== "undefined" && /^\d+$/.test(jobRef);
+}
+
+export function subscribeRoomJobEvents(
+  roomSlug: string,
+  jobId: string,
+  onStatus: (status: JobStatus) => void,
+  onError: () => void
+): () => void {
+  const path = buildRoomApiPath(normalizeRoomSlug(roomSlug), `/jobs/${encodeURIComponent(jobId)}/events`);
+  const source = new EventSource(`${API_BASE}${path}`);
+
+  source.addEventListener("status", (event) => {
+    const status = JSON.parse((event as MessageEvent<string>).data) as JobStatus;
+    if (TERMINAL_STATUSES.has(status.status)) {
+      source.close();
+    }
+    onStatus(status);
+  });
+  source.onerror = () => {
+    source.close();
+    onError();
+  };
+
+  return () => source.close();
+}
+
+export function supportsGalleryEvents(): boolean {
+  return typeof EventSource !== "undefined";
+}
+
+type GalleryEventHandlers = {
+  onSnapshot: (images: GalleryImage[]) => void;
+  onAdded: (image: GalleryImage) => void;
+  onRemoved: (image: GalleryImage) => void;
+};
+
+export function subscribeRoomGalleryEvents(
+  roomSlug: string,
+  handlers: GalleryEventHandlers,
+  onError: () => void
+): () => void {
+  const path = buildRoomApiPath(normalizeRoomSlug(roomSlug), "/jobs/gallery/events");
+  const source = new EventSource(`${API_BASE}${path}`);
+
+  source.addEventListener("snapshot", (event) => {
+    const payload = JSON.parse((event as MessageEvent<string>).data) as { items: GalleryImage[] };
+    handlers.onSnapshot(payload.items);
+  });
+  source.addEventListener("added", (event) => {
+    handlers.onAdded(JSON.parse((event as MessageEvent<string>).data) as GalleryImage);
+  });
+  source.addEventListener("removed", (event) => {
+    handlers.onRemoved(JSON.parse((event as MessageEvent<string>).data) as GalleryImage);
+  });
+  source.onerror = () => {
+    source.close();
+    onError();
+  };
+
+  return () => source.close();
+}
@@ -230,3 +230,63 @@ test("reshuffles photos on cycle boundary without duplicating cards", async () =
   expect(listGalleryResultsMock).toHaveBeenCalledWith("room-a");
   randomSpy.mockRestore();
 });
+
+test("applies gallery stream deltas without polling when EventSource is available", async () => {
+  const sources: FakeEventSource[] = [];
+
+  class FakeEventSource {
+    url: string;
+    onerror: (() => void) | null = null;
+    closed = false;
+    private listeners: Record<string, (event: MessageEvent<string>) => void> = {};
+
+    constructor(url: string) {
+      this.url = url;
+      sources.push(this);
+    }
+
+    addEventListener(type: string, listener: (event: MessageEvent<string>) => void) {
+      this.listeners[type] = listener;
+    }
+
+    emit(type: string, payload: unknown) {
+      this.listeners[type]?.(new MessageEvent(type, { data: JSON.stringify(payload) }));
+    }
+
+    close() {
+      this.closed = true;
+    }
+  }
+
+  vi.stubGlobal("EventSource", FakeEventSource);
+
+  const { unmount } = render(<GalleryPage roomSlug="room-a" />);
+
+  expect(sources).toHaveLength(1);
+  expect(sources[0].url).toBe("/api/rooms/room-a/jobs/gallery/events");
+
+  act(() => {
+    sources[0].emit("snapshot", {
+      items: [{ name: "first.jpg", url: "/media/results/room-a/first.jpg", modified_at: 10 }]
+    });
+  });
+  expect(screen.getAllByAltText("first.jpg")).toHaveLength(1);
+
+  act(() => {
+    sources[0].emit("added", { name: "second.jpg", url: "/media/results/room-a/second.jpg", modified_at: 20 });
+  });
+  expect(screen.getAllByAltText("second.jpg")).toHaveLength(1);
+
+  act(() => {
+    sources[0].emit("removed", { name: "first.jpg", url: "/media/results/room-a/first.jpg", modified_at: 10 });
+  });
+  expect(screen.queryByAltText("first.jpg")).not.toBeInTheDocument();
+
+  await act(async () => {
+    await vi.advanceTimersByTimeAsync(5000);
+  });
+  expect(listGalleryResultsMock).not.toHaveBeenCalled();
+
+  unmount();
+  expect(sources[0].closed).toBe(true);
+});
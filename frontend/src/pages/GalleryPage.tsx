@@ -1,17 +1,29 @@
 import React, { useEffect, useRef, useState } from "react";
 
 import { listRoomGalleryResults } from "../lib/api";
+import { subscribeRoomGalleryEvents, supportsGalleryEvents } from "../lib/jobEvents";
 import { normalizeRoomSlug } from "../lib/roomRouting";
 import type { GalleryImage } from "../types";
 
 const POLL_INTERVAL_MS = 5000;
 const AUTO_SCROLL_PIXELS_PER_SECOND = 24;
+// Must match DERIVATIVE_MAX_SIDES in backend/app/image_derivatives.py.
+const THUMBNAIL_WIDTH = 480;
+const MEDIUM_WIDTH = 1280;
+const GALLERY_IMAGE_SIZES = "(max-width: 560px) 100vw, (max-width: 1024px) 33vw, 25vw";
 const CARD_SIZE_VARIANTS = ["square", "portrait", "landscape", "tall", "wide"] as const;
 
 function getCardSizeVariant(index: number): (typeof CARD_SIZE_VARIANTS)[number] {
   return CARD_SIZE_VARIANTS[index % CARD_SIZE_VARIANTS.length];
 }
 
+function getImageSrcSet(image: GalleryImage): string | undefined {
+  if (!image.thumbnail_url || !image.medium_url) {
+    return undefined;
+  }
+  return `${image.thumbnail_url} ${THUMBNAIL_WIDTH}w, ${image.medium_url} ${MEDIUM_WIDTH}w`;
+}
+
 function getImageKey(image: GalleryImage): string {
   return image.url;
 }
@@ -85,6 +97,8 @@ export function GalleryPage({ roomSlug }: Props) {
 
   useEffect(() => {
     let active = true;
+    let timer: number | undefined;
+    let unsubscribe: (() => void) | undefined;
 
     async function load() {
       try {
@@ -103,13 +117,45 @@ export function GalleryPage({ roomSlug }: Props) {
       }
     }
 
-    void load();
-    const timer = window.setInterval(() => {
+    function startPolling() {
       void load();
-    }, POLL_INTERVAL_MS);
+      timer = window.setInterval(() => {
+        void load();
+      }, POLL_INTERVAL_MS);
+    }
+
+    let streamedImages: GalleryImage[] = [];
+    function applyImages(update: (current: GalleryImage[]) => GalleryImage[]) {
+      const next = update(streamedImages);
+      streamedImages = next;
+      setImages(next);
+      setDisplayImages((current) => syncDisplayImages(current, next));
+      setError("");
+    }
+
+    if (supportsGalleryEvents()) {
+      unsubscribe = subscribeRoomGalleryEvents(
+        resolvedRoomSlug,
+        {
+          onSnapshot: (rows) => applyImages(() => rows),
+          onAdded: (image) =>
+            applyImages((current) => [image, ...current.filter((row) => getImageKey(row) !== getImageKey(image))]),
+          onRemoved: (image) =>
+            applyImages((current) => current.filter((row) => getImageKey(row) !== getImageKey(image)))
+        },
+        () => {
+          if (active) {
+            startPolling();
+          }
+        }
+      );
+    } else {
+      startPolling();
+    }
 
     return () => {
       active = false;
+      unsubscribe?.();
       window.clearInterval(timer);
     };
   }, [resolvedRoomSlug]);
@@ -177,7 +223,14 @@ export function GalleryPage({ roomSlug }: Props) {
                     key={`${image.url}-${index}`}
                     className={`gallery-card gallery-card--${getCardSizeVariant(index)}`}
                   >
-                    <img src={image.url} alt={image.name} loading="lazy" />
+                    <img
+                      src={image.medium_url ?? image.url}
+                      srcSet={getImageSrcSet(image)}
+                      sizes={GALLERY_IMAGE_SIZES}
+                      alt={image.name}
+                      loading="lazy"
+                      decoding="async"
+                    />
                   </figure>
                 );
               })}
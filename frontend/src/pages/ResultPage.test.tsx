@@ -1,5 +1,5 @@
 import React from "react";
-import { render, screen } from "@testing-library/react";
+import { act, render, screen } from "@testing-library/react";
 import { vi } from "vitest";
 
 import { ResultPage } from "./ResultPage";
@@ -45,3 +45,57 @@ test("shows smooth indeterminate progress bar while image is processing", async
   const progress = document.querySelector(".result-loading-bar__progress--indeterminate");
   expect(progress).toBeInTheDocument();
 });
+
+test("receives job completion from the server event stream instead of polling", async () => {
+  const sources: FakeEventSource[] = [];
+
+  class FakeEventSource {
+    url: string;
+    onerror: (() => void) | null = null;
+    closed = false;
+    private listeners: Record<string, (event: MessageEvent<string>) => void> = {};
+
+    constructor(url: string) {
+      this.url = url;
+      sources.push(this);
+    }
+
+    addEventListener(type: string, listener: (event: MessageEvent<string>) => void) {
+      this.listeners[type] = listener;
+    }
+
+    emit(type: string, payload: unknown) {
+      this.listeners[type]?.(new MessageEvent(type, { data: JSON.stringify(payload) }));
+    }
+
+    close() {
+      this.closed = true;
+    }
+  }
+
+  getJobStatusMock.mockReset();
+  vi.stubGlobal("EventSource", FakeEventSource);
+
+  try {
+    render(<ResultPage roomSlug="room-a" jpgHash="77" />);
+
+    expect(sources).toHaveLength(1);
+    expect(sources[0].url).toBe("/api/rooms/room-a/jobs/77/events");
+
+    act(() => {
+      sources[0].emit("status", {
+        id: 77,
+        status: "completed",
+        result_url: "/qr/abc123",
+        download_url: "/qr/abc123",
+        qr_url: "/api/rooms/room-a/jobs/77/qr"
+      });
+    });
+
+    expect(await screen.findByAltText(/generated photo/i)).toBeInTheDocument();
+    expect(sources[0].closed).toBe(true);
+    expect(getJobStatusMock).not.toHaveBeenCalled();
+  } finally {
+    vi.unstubAllGlobals();
+  }
+});
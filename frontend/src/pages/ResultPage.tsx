@@ -1,6 +1,7 @@
 import React, { useEffect, useMemo, useState } from "react";
 
 import { getRoomJobStatus } from "../lib/api";
+import { subscribeRoomJobEvents, supportsJobEvents } from "../lib/jobEvents";
 import { normalizeRoomSlug } from "../lib/roomRouting";
 import type { JobStatus } from "../types";
 
@@ -34,6 +35,8 @@ export function ResultPage({ roomSlug, jpgHash: providedJpgHash }: Props) {
     }
 
     let cancelled = false;
+    let timer: number | undefined;
+    let unsubscribe: (() => void) | undefined;
 
     async function poll() {
       try {
@@ -50,12 +53,35 @@ export function ResultPage({ roomSlug, jpgHash: providedJpgHash }: Props) {
       }
     }
 
-    poll();
-    const timer = window.setInterval(poll, 1500);
+    function startPolling() {
+      if (cancelled || timer !== undefined) {
+        return;
+      }
+      poll();
+      timer = window.setInterval(poll, 1500);
+    }
+
+    if (supportsJobEvents(jpgHash)) {
+      unsubscribe = subscribeRoomJobEvents(
+        resolvedRoomSlug,
+        jpgHash,
+        (status) => {
+          if (!cancelled) {
+            setJob(status);
+          }
+        },
+        startPolling
+      );
+    } else {
+      startPolling();
+    }
 
     return () => {
       cancelled = true;
-      window.clearInterval(timer);
+      unsubscribe?.();
+      if (timer !== undefined) {
+        window.clearInterval(timer);
+      }
     };
   }, [jpgHash, resolvedRoomSlug]);
 
@@ -80,7 +106,7 @@ export function ResultPage({ roomSlug, jpgHash: providedJpgHash }: Props) {
             <h1>Результат</h1>
             <p className="result-subtitle">Ваше изображение готово. Сохраните его на телефон через QR-код.</p>
             <div className="result-media">
-              <img className="result-photo" src={job.result_url} alt="generated photo" />
+              <img className="result-photo" src={job.preview_url ?? job.result_url} alt="generated photo" />
             </div>
           </section>
 
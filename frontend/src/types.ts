@@ -37,6 +37,7 @@ export type JobStatus = {
   result_url?: string | null;
   download_url?: string | null;
   qr_url?: string | null;
+  preview_url?: string | null;
   error_message?: string | null;
 };
 
@@ -61,4 +62,6 @@ export type GalleryImage = {
   name: string;
   url: string;
   modified_at: number;
+  thumbnail_url?: string | null;
+  medium_url?: string | null;
 };